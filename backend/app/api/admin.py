@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+import asyncio
+
+from app.core.config import settings
+from app.core.profiler import folded, sample_stacks
+from app.core.security import require_admin
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+# Un solo profile a la vez por worker
+_profile_lock = asyncio.Lock()
+
+
+@router.get("/traces")
+async def recent_traces(request: Request, limit: int = Query(20, ge=1, le=1000)):
+    """
+    Most recent request traces (newest first)
+    """
+    if not settings.TRACING_ENABLED:
+        raise HTTPException(status_code=404, detail="Tracing disabled")
+    return {"traces": request.app.state.traces.recent(limit)}
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(5, gt=0),
+    interval_ms: float = Query(5, ge=1, le=1000),
+):
+    """
+    Sample every thread of this worker for `seconds` and return folded
+    stacks (flamegraph.pl / speedscope input)
+    """
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling disabled")
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    async with _profile_lock:
+        stacks = await asyncio.to_thread(
+            sample_stacks, min(seconds, settings.PROFILING_MAX_SECONDS), interval_ms
+        )
+    return PlainTextResponse(folded(stacks))
@@ -0,0 +1,228 @@
+from fastapi import APIRouter, HTTPException, Depends, File, Form, UploadFile
+from fastapi.responses import Response
+from pydantic import BaseModel, Field, ValidationError
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+import json
+import numpy as np
+from app.services.admission import Overloaded
+from app.models.schemas import LineTask, MachineShiftOEE, OEELogConfig, ProcessStep
+from app.services.calculator import (
+    LEAD_TIME_RECOMMENDATIONS,
+    OEE_RECOMMENDATIONS,
+    LeanCalculator,
+    OEEInput,
+)
+from app.services.line_balancing import balance_line
+from app.services.oee_engine import compute_oee_from_events
+from app.core.bulkhead import Bulkheads
+from app.core.config import settings
+from app.core.dependencies import get_bulkheads
+from app.api.routes import overloaded_error
+
+# Calculator endpoints: own bulkhead (threads, limits, queue), isolated from chat.
+# Also served alone by app.calculator_main (own worker, loop and connection limit).
+router = APIRouter()
+
+# Stateless
+calculator = LeanCalculator()
+
+MAX_ROWS = settings.CALCULATOR_BATCH_MAX_ROWS
+
+class TaktTimeRequest(BaseModel):
+    available_time_minutes: float
+    customer_demand_units: int
+
+# Batch requests: columnar arrays, one entry per row (machine × shift, line...)
+class OEEBatchRequest(BaseModel):
+    availability: List[float] = Field(..., max_length=MAX_ROWS)
+    performance: List[float] = Field(..., max_length=MAX_ROWS)
+    quality: List[float] = Field(..., max_length=MAX_ROWS)
+
+class TaktTimeBatchRequest(BaseModel):
+    available_time_minutes: List[float] = Field(..., max_length=MAX_ROWS)
+    customer_demand_units: List[int] = Field(..., max_length=MAX_ROWS)
+
+class LeadTimeBatchRequest(BaseModel):
+    step_counts: List[int] = Field(..., max_length=MAX_ROWS, description="Steps per process")
+    cycle_time: List[float] = Field(..., max_length=MAX_ROWS, description="All steps, process by process")
+    wait_time: Optional[List[float]] = Field(default=None, max_length=MAX_ROWS)
+
+# Process graph: steps with predecessor edges (parallel branches, merge points)
+class ProcessGraphRequest(BaseModel):
+    steps: List[ProcessStep] = Field(..., min_length=1, max_length=MAX_ROWS)
+
+# Line balancing: takt given directly or derived like /calculate/takt-time
+class LineBalanceRequest(BaseModel):
+    tasks: List[LineTask] = Field(..., min_length=1, max_length=settings.LINE_BALANCE_MAX_TASKS)
+    takt_time_seconds: Optional[float] = Field(default=None, gt=0)
+    available_time_minutes: Optional[float] = Field(default=None, gt=0)
+    customer_demand_units: Optional[int] = Field(default=None, gt=0)
+    method: Literal["rpw", "lcr"] = "rpw"
+    improve_iterations: int = Field(default=0, ge=0, le=settings.LINE_BALANCE_MAX_ITERATIONS)
+
+def _encode_batch(result: Dict[str, np.ndarray], legend: Sequence[Tuple[str, str]] = ()) -> bytes:
+    """
+    Columnar JSON body; bit i of ``recommendation_codes`` is ``recommendation_legend[i]``
+    """
+    body = {name: column.tolist() for name, column in result.items()}
+    if legend:
+        body["recommendation_legend"] = [{"code": code, "text": text} for code, text in legend]
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode()
+
+async def _run_batch(bulkheads: Bulkheads, compute) -> Response:
+    # Compute + JSON encoding both run on the calculator pool's threads
+    try:
+        body = await bulkheads.calculator.run(compute)
+        return Response(body, media_type="application/json")
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/calculate/oee")
+async def calculate_oee(input: OEEInput, bulkheads: Bulkheads = Depends(get_bulkheads)):
+    """
+    Calculate Overall Equipment Effectiveness (OEE)
+    """
+    try:
+        result = await bulkheads.calculator.run(calculator.calculate_oee, input)
+        return result
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/calculate/takt-time")
+async def calculate_takt_time(input: TaktTimeRequest, bulkheads: Bulkheads = Depends(get_bulkheads)):
+    """
+    Calculate Takt Time
+    """
+    try:
+        result = await bulkheads.calculator.run(
+            calculator.calculate_takt_time,
+            input.available_time_minutes,
+            input.customer_demand_units
+        )
+        return result
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/calculate/lead-time")
+async def calculate_lead_time(process_steps: List[dict], bulkheads: Bulkheads = Depends(get_bulkheads)):
+    """
+    Calculate Lead Time from process steps
+    """
+    try:
+        result = await bulkheads.calculator.run(calculator.calculate_lead_time, process_steps)
+        return result
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/calculate/lead-time/critical-path")
+async def calculate_critical_path(input: ProcessGraphRequest, bulkheads: Bulkheads = Depends(get_bulkheads)):
+    """
+    Calculate Lead Time along the critical path of a process graph
+    """
+    try:
+        return await bulkheads.calculator.run(calculator.calculate_critical_path, input.steps)
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/calculate/line-balance")
+async def calculate_line_balance(input: LineBalanceRequest, bulkheads: Bulkheads = Depends(get_bulkheads)):
+    """
+    Balance an assembly line against takt time (Yamazumi station loads)
+    """
+    takt = input.takt_time_seconds
+    if takt is None:
+        if input.available_time_minutes is None or input.customer_demand_units is None:
+            raise HTTPException(
+                status_code=422,
+                detail="Provide takt_time_seconds or available_time_minutes and customer_demand_units",
+            )
+        takt = input.available_time_minutes * 60 / input.customer_demand_units
+
+    try:
+        return await bulkheads.calculator.run(
+            balance_line, input.tasks, takt, input.method, input.improve_iterations,
+            0, settings.LINE_BALANCE_TIME_BUDGET_SECONDS,
+        )
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Batch endpoints: columnar arrays in, columnar arrays out, one NumPy pass
+@router.post("/calculate/oee/batch")
+async def calculate_oee_batch(input: OEEBatchRequest, bulkheads: Bulkheads = Depends(get_bulkheads)):
+    """
+    Calculate OEE for many lines at once (same results as /calculate/oee)
+    """
+    return await _run_batch(bulkheads, lambda: _encode_batch(
+        calculator.calculate_oee_batch(input.availability, input.performance, input.quality),
+        OEE_RECOMMENDATIONS,
+    ))
+
+@router.post("/calculate/takt-time/batch")
+async def calculate_takt_time_batch(input: TaktTimeBatchRequest, bulkheads: Bulkheads = Depends(get_bulkheads)):
+    """
+    Calculate Takt Time for many lines at once (same results as /calculate/takt-time)
+    """
+    return await _run_batch(bulkheads, lambda: _encode_batch(
+        calculator.calculate_takt_time_batch(input.available_time_minutes, input.customer_demand_units),
+    ))
+
+@router.post("/calculate/lead-time/batch")
+async def calculate_lead_time_batch(input: LeadTimeBatchRequest, bulkheads: Bulkheads = Depends(get_bulkheads)):
+    """
+    Calculate Lead Time for many processes at once (same results as /calculate/lead-time)
+    """
+    return await _run_batch(bulkheads, lambda: _encode_batch(
+        calculator.calculate_lead_time_batch(input.step_counts, input.cycle_time, input.wait_time),
+        LEAD_TIME_RECOMMENDATIONS,
+    ))
+
+# OEE from raw machine event logs (CSV or Parquet upload, streamed in chunks)
+@router.post("/calculate/oee/events", response_model=List[MachineShiftOEE])
+async def calculate_oee_from_events(
+    file: UploadFile = File(..., description="machine,timestamp,state[,good,scrap]"),
+    config: str = Form(..., description="OEELogConfig as JSON"),
+    bulkheads: Bulkheads = Depends(get_bulkheads),
+):
+    """
+    Calculate OEE per machine and shift from run/stop/setup events
+    """
+    try:
+        log_config = OEELogConfig.model_validate_json(config)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    fmt = "parquet" if (file.filename or "").lower().endswith((".parquet", ".pq")) else "csv"
+
+    try:
+        # The upload is spooled to disk; the engine reads it chunk by chunk
+        return await bulkheads.calculator.run(
+            compute_oee_from_events,
+            file.file,
+            log_config,
+            fmt,
+            settings.OEE_EVENTS_CHUNK_ROWS,
+            timeout_s=settings.OEE_EVENTS_TIMEOUT_SECONDS,
+        )
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
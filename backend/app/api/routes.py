@@ -1,15 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
+import json
+from app.services.admission import Overloaded
 from app.services.rag_service import RAGService
-from app.services.calculator import LeanCalculator, OEEInput
-from app.core.config import settings
+from app.core.bulkhead import Bulkheads
+from app.core.dependencies import get_bulkheads, get_rag_service
+from app.core.metrics import CHAT_REQUESTS
 
 router = APIRouter()
 
-# Initialize services
-rag_service = RAGService()
-calculator = LeanCalculator()
+# Heavy services live in the lifespan container (app.core.dependencies)
 
 # Request/Response Models
 class ChatRequest(BaseModel):
@@ -19,63 +21,116 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     answer: str
     sources: List[dict] = []
-
-class TaktTimeRequest(BaseModel):
-    available_time_minutes: float
-    customer_demand_units: int
+    retrieval: dict = {}
 
 # Chat endpoint
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(
+    request: ChatRequest,
+    http_response: Response,
+    rag_service: RAGService = Depends(get_rag_service),
+    bulkheads: Bulkheads = Depends(get_bulkheads),
+):
     """
     Main chat endpoint - answers Lean Manufacturing questions using RAG
     """
     try:
-        response = await rag_service.answer_with_context(request.message)
+        async with bulkheads.chat.slot():
+            response = await rag_service.answer_with_context(request.message, request.session_id)
+        cache = response.pop("cache", {})
+        http_response.headers["X-Cache"] = "HIT" if cache.get("hit") else "MISS"
+        if cache.get("hit"):
+            http_response.headers["X-Cache-Similarity"] = str(cache["similarity"])
+        CHAT_REQUESTS.labels("chat", "ok").inc()
         return ChatResponse(**response)
+    except Overloaded as e:
+        CHAT_REQUESTS.labels("chat", "shed").inc()
+        raise overloaded_error(e)
     except Exception as e:
+        CHAT_REQUESTS.labels("chat", "error").inc()
         raise HTTPException(status_code=500, detail=str(e))
 
-# Calculator endpoints
-@router.post("/calculate/oee")
-async def calculate_oee(input: OEEInput):
-    """
-    Calculate Overall Equipment Effectiveness (OEE)
-    """
-    try:
-        result = calculator.calculate_oee(input)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def overloaded_error(e: Overloaded) -> HTTPException:
+    return HTTPException(
+        status_code=e.status_code,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-@router.post("/calculate/takt-time")
-async def calculate_takt_time(input: TaktTimeRequest):
+class ClosingStreamingResponse(StreamingResponse):
     """
-    Calculate Takt Time
+    StreamingResponse that closes its body generator when the response ends.
+    Starlette leaves it suspended on client disconnect, so its ``finally``
+    (slot release, upstream close) would only run at garbage collection.
     """
-    try:
-        result = calculator.calculate_takt_time(
-            input.available_time_minutes,
-            input.customer_demand_units
-        )
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/calculate/lead-time")
-async def calculate_lead_time(process_steps: List[dict]):
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    rag_service: RAGService = Depends(get_rag_service),
+    bulkheads: Bulkheads = Depends(get_bulkheads),
+):
     """
-    Calculate Lead Time from process steps
+    Streaming chat over Server-Sent Events: `sources` first, then one `token`
+    event per LLM delta, then `done` with time-to-first-token and total latency
     """
+    answers = rag_service.stream_answer(request.message, request.session_id)
+    # First event before the 200: admission control can still answer 429/503
     try:
-        result = calculator.calculate_lead_time(process_steps)
-        return result
+        release = await bulkheads.chat.acquire()  # held until the stream ends
+    except Overloaded as e:
+        CHAT_REQUESTS.labels("chat_stream", "shed").inc()
+        raise overloaded_error(e)
+    try:
+        first = await answers.__anext__()
+    except Overloaded as e:
+        release()
+        CHAT_REQUESTS.labels("chat_stream", "shed").inc()
+        raise overloaded_error(e)
     except Exception as e:
+        release()
+        CHAT_REQUESTS.labels("chat_stream", "error").inc()
         raise HTTPException(status_code=500, detail=str(e))
 
+    async def events():
+        try:
+            yield _sse(*first)
+            async for event, data in answers:
+                yield _sse(event, data)
+            CHAT_REQUESTS.labels("chat_stream", "ok").inc()
+        except Overloaded as e:
+            # Ya se envió el 200: el 503 + Retry-After viaja como evento
+            CHAT_REQUESTS.labels("chat_stream", "shed").inc()
+            yield _sse("error", {"detail": str(e), "status": e.status_code, "retry_after": e.retry_after})
+        except Exception as e:
+            CHAT_REQUESTS.labels("chat_stream", "error").inc()
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            # Client gone mid-stream: close the generator now, releasing its
+            # LLM admission slot and the upstream stream (not at GC time)
+            try:
+                await answers.aclose()
+            finally:
+                release()
+
+    return ClosingStreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # Knowledge base endpoints
 @router.get("/knowledge/stats")
-async def get_knowledge_stats():
+async def get_knowledge_stats(rag_service: RAGService = Depends(get_rag_service)):
     """
     Get statistics about the knowledge base
     """
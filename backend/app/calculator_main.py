@@ -0,0 +1,44 @@
+# Calculator-only app: the process-level bulkhead.
+#
+#   uvicorn app.calculator_main:app --port 8001 --limit-concurrency 256
+#
+# Same /api/calculate/* routes as app.main, but no RAG/LLM services, so its
+# worker, event loop and connection limit are never shared with /chat.
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.api import calculator
+from app.core.bulkhead import create_bulkheads
+from app.core.config import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    app.state.bulkheads.close()
+
+
+app = FastAPI(
+    title="Lean AI Assistant - Calculators",
+    version="0.1.0",
+    lifespan=lifespan,
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=settings.CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.state.bulkheads = create_bulkheads(settings)
+
+app.include_router(calculator.router, prefix="/api", tags=["calculator"])
+
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "bulkheads": app.state.bulkheads.stats(), "version": "0.1.0"}
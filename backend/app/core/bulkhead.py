@@ -0,0 +1,208 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional, TypeVar
+import asyncio
+import math
+
+from app.core.metrics import BULKHEAD_IN_FLIGHT, BULKHEAD_QUEUE_DEPTH, BULKHEAD_REJECTED
+from app.services.admission import Overloaded
+
+T = TypeVar("T")
+
+
+class Bulkhead:
+    """
+    Resource pool for one class of routes: its own concurrency limit,
+    bounded wait queue, queue timeout, request timeout and (optionally)
+    its own worker threads.
+
+    A pool that saturates sheds its own requests (429 queue full, 503 queue
+    timeout, 504 request timeout) without touching the other pools.
+    ``max_concurrent <= 0`` disables the pool (no limits, work runs inline).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_queue: int = 0,
+        queue_timeout_s: float = 1.0,
+        timeout_s: float = 30.0,
+        threads: int = 0,
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.timeout_s = timeout_s
+
+        self.threads = threads
+        self.enabled = max_concurrent > 0
+        self._semaphore = asyncio.Semaphore(max(max_concurrent, 1))
+        self._executor: Optional[ThreadPoolExecutor] = None  # created on first run()
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "queue_timeout": 0, "timeout": 0}
+
+        self._in_flight_gauge = BULKHEAD_IN_FLIGHT.labels(name)
+        self._queue_gauge = BULKHEAD_QUEUE_DEPTH.labels(name)
+
+    def _reject(self, reason: str, status_code: int) -> Overloaded:
+        self.rejected[reason] += 1
+        BULKHEAD_REJECTED.labels(self.name, reason).inc()
+        return Overloaded(
+            reason,
+            status_code,
+            retry_after=max(1, math.ceil(self.queue_timeout_s)),
+            resource=self.name,
+        )
+
+    async def _acquire(self) -> None:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()  # free slot: no suspension
+        else:
+            if self.waiting >= self.max_queue:
+                raise self._reject("queue_full", 429)
+            self.waiting += 1
+            self._queue_gauge.inc()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout_s)
+            except asyncio.TimeoutError:
+                raise self._reject("queue_timeout", 503) from None
+            finally:
+                self.waiting -= 1
+                self._queue_gauge.dec()
+
+        self.in_flight += 1
+        self._in_flight_gauge.inc()
+
+    def _release(self, *_) -> None:
+        self.in_flight -= 1
+        self.completed += 1
+        self._in_flight_gauge.dec()
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold one slot for the body of an async handler, cancelled after
+        ``timeout_s`` (504).
+        """
+        if not self.enabled:
+            yield
+            return
+
+        await self._acquire()
+        deadline = asyncio.timeout(self.timeout_s)
+        try:
+            async with deadline:
+                yield
+        except TimeoutError:
+            if deadline.expired():
+                raise self._reject("timeout", 504) from None
+            raise
+        finally:
+            self._release()
+
+    async def acquire(self) -> Callable[[], None]:
+        """
+        Take a slot to be released later by the caller (streamed responses
+        that outlive the handler). Returns the release callback.
+        """
+        if not self.enabled:
+            return lambda: None
+        await self._acquire()
+        return self._release
+
+    async def run(self, fn: Callable[..., T], *args, timeout_s: Optional[float] = None) -> T:
+        """
+        Run blocking ``fn(*args)`` on this pool's threads (``timeout_s``
+        overrides the pool timeout for known long jobs).
+
+        On timeout the caller gets a 504 right away, but the slot stays
+        taken until the thread actually finishes, so a stuck pool can never
+        run more than ``max_concurrent`` jobs at once.
+        """
+        if not self.enabled:
+            return fn(*args)
+
+        await self._acquire()
+        try:
+            if not self.threads:
+                result = fn(*args)
+                self._release()
+                return result
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.threads, thread_name_prefix=f"bulkhead-{self.name}"
+                )
+            future = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        except BaseException:
+            self._release()
+            raise
+
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout_s or self.timeout_s)
+        except asyncio.TimeoutError:
+            raise self._reject("timeout", 504) from None
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": dict(self.rejected),
+        }
+
+
+class Bulkheads:
+    """
+    One pool per route class: LLM-bound chat vs. pure-arithmetic calculators.
+    """
+
+    def __init__(self, chat: Bulkhead, calculator: Bulkhead):
+        self.chat = chat
+        self.calculator = calculator
+
+    def close(self) -> None:
+        self.chat.close()
+        self.calculator.close()
+
+    def stats(self) -> Dict:
+        return {"chat": self.chat.stats(), "calculator": self.calculator.stats()}
+
+
+def create_bulkheads(settings, enabled: Optional[bool] = None) -> Bulkheads:
+    """
+    Build both pools from settings (``enabled=False``: no isolation, for benchmarks).
+    """
+    if enabled is None:
+        enabled = settings.BULKHEADS_ENABLED
+    return Bulkheads(
+        chat=Bulkhead(
+            "chat",
+            max_concurrent=settings.CHAT_POOL_MAX_CONCURRENT if enabled else 0,
+            max_queue=settings.CHAT_POOL_MAX_QUEUE,
+            queue_timeout_s=settings.CHAT_POOL_QUEUE_TIMEOUT_SECONDS,
+            timeout_s=settings.CHAT_POOL_TIMEOUT_SECONDS,
+        ),
+        calculator=Bulkhead(
+            "calculator",
+            max_concurrent=settings.CALCULATOR_POOL_THREADS if enabled else 0,
+            max_queue=settings.CALCULATOR_POOL_MAX_QUEUE,
+            queue_timeout_s=settings.CALCULATOR_POOL_QUEUE_TIMEOUT_SECONDS,
+            timeout_s=settings.CALCULATOR_POOL_TIMEOUT_SECONDS,
+            threads=settings.CALCULATOR_POOL_THREADS,
+        ),
+    )
@@ -14,27 +14,113 @@ class Settings(BaseSettings):
     # LLM Settings
     LLM_PROVIDER: str = "openai"  # openai or anthropic
     LLM_MODEL: str = "gpt-4.1-mini"
+    ANTHROPIC_MODEL: str = "claude-3-5-sonnet-20241022"
     LLM_TEMPERATURE: float = 0.7
     LLM_MAX_TOKENS: int = 2000
+    LLM_TIMEOUT_SECONDS: float = 25  # plazo total por respuesta (incluye hedge)
+
+    # Admission control: límite de peticiones concurrentes al LLM
+    LLM_MAX_CONCURRENT: int = 16
+    LLM_MAX_QUEUE: int = 64  # en espera; más allá -> 429 inmediato
+    CHAT_DEADLINE_SECONDS: float = 25  # si no da tiempo a responder -> 503 inmediato
+
+    # Bulkheads: pools separados por tipo de ruta (chat vs calculadoras)
+    BULKHEADS_ENABLED: bool = True
+    CHAT_POOL_MAX_CONCURRENT: int = 32  # peticiones /chat completas (no solo la llamada LLM)
+    CHAT_POOL_MAX_QUEUE: int = 64
+    CHAT_POOL_QUEUE_TIMEOUT_SECONDS: float = 2
+    CHAT_POOL_TIMEOUT_SECONDS: float = 30
+    CALCULATOR_POOL_THREADS: int = 4  # hilos propios = concurrencia máxima
+    CALCULATOR_POOL_MAX_QUEUE: int = 256
+    CALCULATOR_POOL_QUEUE_TIMEOUT_SECONDS: float = 1
+    CALCULATOR_POOL_TIMEOUT_SECONDS: float = 15  # un batch de 1M filas tarda ~5 s (sobre todo JSON)
+    CALCULATOR_BATCH_MAX_ROWS: int = 1_000_000  # filas por petición en /calculate/*/batch
+    OEE_EVENTS_CHUNK_ROWS: int = 250_000  # filas por chunk al leer logs de eventos (memoria acotada)
+    OEE_EVENTS_TIMEOUT_SECONDS: float = 300  # /calculate/oee/events: meses de eventos a 1 Hz
+    LINE_BALANCE_MAX_TASKS: int = 20_000  # RPW guarda el cierre transitivo: n² bits (50 MB)
+    LINE_BALANCE_MAX_ITERATIONS: int = 1_000  # reinicios de la búsqueda de mejora por petición
+    LINE_BALANCE_TIME_BUDGET_SECONDS: float = 5  # la búsqueda de mejora para aquí (< CALCULATOR_POOL_TIMEOUT)
+
+    # Hedging + circuit breakers por proveedor
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_PROVIDER: str = ""  # "" = mismo proveedor; openai or anthropic
+    LLM_HEDGE_PERCENTILE: float = 0.95  # lanza la 2ª petición pasado el p95 observado
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # por debajo se usa LLM_HEDGE_INITIAL_DELAY_S
+    LLM_HEDGE_INITIAL_DELAY_S: float = 8.0
+    LLM_HEDGE_MIN_DELAY_S: float = 0.5  # nunca antes de esto (evita duplicar todo)
+    LLM_LATENCY_WINDOW: int = 200  # últimas llamadas en el histograma
+    LLM_BREAKER_FAILURES: int = 5  # fallos seguidos que abren el circuito
+    LLM_BREAKER_RESET_SECONDS: float = 30
     
     # Vector Database (Qdrant)
     QDRANT_HOST: str = os.getenv("QDRANT_HOST", "localhost")
     QDRANT_PORT: int = int(os.getenv("QDRANT_PORT", "6333"))
     QDRANT_COLLECTION_NAME: str = "lean_knowledge"
+
+    # Retrieval backend: "qdrant" (remoto) o "local" (índice memmap embebido)
+    VECTOR_BACKEND: str = "qdrant"
+    LOCAL_INDEX_PATH: str = "data/processed/local_index"
+
+    # Compact vectors: primera pasada sobre códigos, rescoring con float32
+    VECTOR_QUANTIZATION: str = "none"  # none, int8 or binary
+    VECTOR_PCA_DIM: int = 0  # 0 = sin PCA (solo índice local)
+    VECTOR_RESCORE_OVERSAMPLING: float = 4.0
     
     # Embeddings
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "sentence-transformers"  # sentence-transformers or onnx
+    EMBEDDING_ONNX_PATH: str = "data/models/all-MiniLM-L6-v2-onnx"
+    EMBEDDING_ONNX_QUANTIZED: bool = True  # model_int8.onnx (int8 dinámico)
+    EMBEDDING_ONNX_THREADS: int = 0  # 0 = por defecto de ONNX Runtime
     EMBEDDING_DIMENSION: int = 384
+    EMBEDDING_EXECUTOR_THREADS: int = 2  # hilos dedicados a encode() (CPU-bound)
+    EMBEDDING_BATCH_MAX_SIZE: int = 32  # micro-batching de consultas concurrentes
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10000  # LRU de embeddings de consultas
+    EMBEDDING_CACHE_MAX_BYTES: int = 0  # 0 = sin límite de bytes
+    EMBEDDING_CACHE_TTL_SECONDS: float = 0  # 0 = sin expiración
     
     # RAG Settings
-    RAG_TOP_K: int = 5
+    RAG_TOP_K: int = 5  # máximo; el k efectivo se adapta a los scores
+    RAG_MIN_SIMILARITY: float = 0.25  # coseno mínimo para entrar en el prompt
+    RAG_RELATIVE_CUTOFF: float = 0.75  # score >= 75% del mejor
+    RAG_MAX_SCORE_GAP: float = 0.15  # caída entre scores consecutivos que corta k (codo)
     RAG_CHUNK_SIZE: int = 1000
     RAG_CHUNK_OVERLAP: int = 200
+    RAG_CONTEXT_TOKEN_BUDGET: int = 1500  # tokens máximos de contexto en el prompt
+    RAG_MMR_LAMBDA: float = 0.7  # 1 = solo relevancia, 0 = solo diversidad
+    RAG_MMR_DUPLICATE_THRESHOLD: float = 0.95  # coseno a partir del cual un chunk es redundante
+
+    # Lexical (BM25) retrieval + hybrid fusion
+    LEXICAL_ENABLED: bool = True
+    LEXICAL_FAST_PATH_MIN_CONFIDENCE: float = 0.6  # score BM25 normalizado (0-1)
+    LEXICAL_FAST_PATH_MAX_TERMS: int = 3  # solo consultas cortas tipo "SMED", "TPM"
+    RRF_K: int = 60
     
     # Redis Cache
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
     REDIS_DB: int = 0
+
+    # Semantic answer cache (delante de answer_with_context)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_BACKEND: str = "redis"  # redis or memory
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92  # similitud coseno mínima
+    SEMANTIC_CACHE_TTL_SECONDS: int = 86400
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1000
+    SEMANTIC_CACHE_REFRESH_SECONDS: float = 30  # cada cuánto se comprueba si cambió la colección
+
+    # Session memory: últimos turnos literales + resumen incremental del resto
+    SESSION_MEMORY_ENABLED: bool = True
+    SESSION_BACKEND: str = "redis"  # redis or memory
+    SESSION_MAX_TURNS: int = 3  # turnos (pregunta + respuesta) literales en el prompt
+    SESSION_MESSAGE_MAX_CHARS: int = 1500  # recorte por mensaje guardado
+    SESSION_SUMMARY_MAX_TOKENS: int = 200
+    SESSION_SUMMARY_MAX_CHARS: int = 1200
+    SESSION_TTL_SECONDS: int = 86400
+
+    # Single-flight: preguntas idénticas simultáneas comparten una sola llamada
+    SINGLE_FLIGHT_ENABLED: bool = True
     
     # Database
     DATABASE_URL: str = os.getenv(
@@ -54,6 +140,13 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # Diagnóstico (admin): trazas por petición y profiler de muestreo
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")  # vacío = /admin deshabilitado
+    TRACING_ENABLED: bool = False  # X-Debug-Trace: 1 + X-Admin-Token
+    TRACE_BUFFER_SIZE: int = 100
+    PROFILING_ENABLED: bool = False
+    PROFILING_MAX_SECONDS: float = 30
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,98 @@
+from typing import Dict
+import logging
+import os
+import resource
+import time
+
+from fastapi import Request
+
+from app.core.bulkhead import Bulkheads
+from app.core.config import settings
+from app.services.admission import create_admission_controller
+from app.services.llm_service import LLMService
+from app.services.rag_service import RAGService, create_vector_client
+from app.services.semantic_cache import create_semantic_cache
+from app.services.session_memory import create_session_memory
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_mb() -> float:
+    """
+    Current resident memory of this process (peak RSS where /proc is missing).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 1e6, 1)
+    except (OSError, ValueError):
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class ServiceContainer:
+    """
+    One set of heavy services per worker: LLM client, vector client,
+    semantic cache, session memory and the RAG service (embedder,
+    executor, caches).
+
+    Created in the FastAPI lifespan handler and handed to routes via Depends.
+    """
+
+    def __init__(self):
+        self.llm_service = LLMService()
+        self.vector_client = create_vector_client()
+        self.semantic_cache = create_semantic_cache(settings)
+        self.admission = create_admission_controller(settings)
+        self.session_memory = create_session_memory(settings, self.llm_service, self.admission)
+        self.rag_service = RAGService(
+            qdrant=self.vector_client,
+            llm_service=self.llm_service,
+            semantic_cache=self.semantic_cache,
+            session_memory=self.session_memory,
+            admission=self.admission,
+        )
+        self.startup_stats: Dict = {}
+
+    async def startup(self) -> None:
+        """
+        Preload embeddings + vector DB connection + BM25 index.
+        Esto evita primera respuesta lenta en producción.
+        """
+        start = time.perf_counter()
+        rss_before = _rss_mb()
+        try:
+            await self.rag_service.embed_query("warmup")
+            await self.rag_service.get_knowledge_stats()
+            await self.rag_service.build_lexical_index()
+            print("🔥 RAG warm-up completado")
+        except Exception as e:
+            print("⚠️ Warm-up parcial:", e)
+
+        self.startup_stats = {
+            "pid": os.getpid(),
+            "startup_s": round(time.perf_counter() - start, 2),
+            "rss_mb_before": rss_before,
+            "rss_mb": _rss_mb(),
+        }
+        logger.info("Worker startup: %s", self.startup_stats)
+
+    async def shutdown(self) -> None:
+        """
+        Close executors and Qdrant/Redis connections.
+        """
+        await self.rag_service.close()
+
+    def stats(self) -> Dict:
+        return {**self.startup_stats, "rss_mb_now": _rss_mb()}
+
+
+def get_services(request: Request) -> ServiceContainer:
+    return request.app.state.services
+
+
+def get_rag_service(request: Request) -> RAGService:
+    return request.app.state.services.rag_service
+
+
+def get_bulkheads(request: Request) -> Bulkheads:
+    return request.app.state.bulkheads
@@ -0,0 +1,147 @@
+# Prometheus metrics for the chat pipeline.
+#
+# Label children are resolved once here, so hot paths only pay for a
+# perf_counter pair and one histogram observe(). With several uvicorn
+# workers set PROMETHEUS_MULTIPROC_DIR so /metrics aggregates all of them.
+# Stage timings double as trace spans for requests that opted into tracing.
+from contextlib import contextmanager
+from typing import Dict
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from app.core.tracing import record_span
+
+# Buckets de 5 ms a 30 s: cubren desde un hit de caché hasta el timeout del LLM
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+
+STAGES = (
+    "semantic_cache",
+    "embed",
+    "lexical_search",
+    "dense_search",
+    "context_build",
+    "llm",
+    "first_token",  # solo /chat/stream
+    "total",
+)
+
+STAGE_SECONDS = Histogram(
+    "lean_rag_stage_seconds",
+    "Latency of each chat pipeline stage",
+    ["stage"],
+    buckets=_BUCKETS,
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "lean_llm_request_seconds",
+    "Latency of completed LLM provider calls",
+    ["provider"],
+    buckets=_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "lean_llm_tokens",
+    "LLM tokens by kind (prompt, cached_prompt, cache_write, completion)",
+    ["provider", "kind"],
+)
+LLM_OUTCOMES = Counter(
+    "lean_llm_outcomes",
+    "LLM answers by outcome (success, timeout, error)",
+    ["outcome"],
+)
+LLM_HEDGES = Counter(
+    "lean_llm_hedges",
+    "Second LLM requests by reason (hedge, fallback) and winner",
+    ["event"],
+)
+LLM_IN_FLIGHT = Gauge(
+    "lean_llm_in_flight",
+    "Requests holding an LLM admission slot",
+    multiprocess_mode="livesum",
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "lean_llm_queue_depth",
+    "Requests waiting for an LLM admission slot",
+    multiprocess_mode="livesum",
+)
+LLM_SHED = Counter(
+    "lean_llm_shed",
+    "Requests rejected by admission control, by reason",
+    ["reason"],
+)
+BULKHEAD_IN_FLIGHT = Gauge(
+    "lean_bulkhead_in_flight",
+    "Requests holding a slot in each route pool (chat, calculator)",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+BULKHEAD_QUEUE_DEPTH = Gauge(
+    "lean_bulkhead_queue_depth",
+    "Requests waiting for a slot in each route pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+BULKHEAD_REJECTED = Counter(
+    "lean_bulkhead_rejected",
+    "Requests rejected by a route pool, by reason (queue_full, queue_timeout, timeout)",
+    ["pool", "reason"],
+)
+CACHE_REQUESTS = Counter(
+    "lean_cache_requests",
+    "Cache lookups by cache (embedding, semantic) and result (hit, miss)",
+    ["cache", "result"],
+)
+CHAT_REQUESTS = Counter(
+    "lean_chat_requests",
+    "Chat requests by endpoint and outcome",
+    ["endpoint", "outcome"],
+)
+
+_STAGE = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
+
+
+@contextmanager
+def stage_timer(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        _STAGE[stage].observe(end - start)
+        record_span(stage, start, end)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    _STAGE[stage].observe(seconds)
+    end = time.perf_counter()
+    record_span(stage, end - seconds, end)
+
+
+def cache_result(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_tokens(provider: str, usage: Dict) -> None:
+    LLM_TOKENS.labels(provider, "prompt").inc(usage["input_tokens"])
+    LLM_TOKENS.labels(provider, "cached_prompt").inc(usage["cached_input_tokens"])
+    LLM_TOKENS.labels(provider, "cache_write").inc(usage["cache_write_tokens"])
+    LLM_TOKENS.labels(provider, "completion").inc(usage["output_tokens"])
+
+
+def render_latest():
+    """
+    (body, content type) for the /metrics endpoint.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
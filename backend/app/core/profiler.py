@@ -0,0 +1,47 @@
+# Sampling profiler for the live worker (admin endpoint).
+#
+# A background thread snapshots every thread's stack with
+# sys._current_frames() and counts identical stacks; the output is the
+# "folded" format read by flamegraph.pl, speedscope and inferno.
+from collections import Counter
+import sys
+import threading
+import time
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", code.co_filename)
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+def sample_stacks(seconds: float, interval_ms: float = 5.0) -> Counter:
+    """
+    Blocking: sample all threads (except this one) for ``seconds``.
+    Returns Counter of "thread;outer;...;inner" -> samples.
+    """
+    me = threading.get_ident()
+    names = {}
+    stacks: Counter = Counter()
+    interval = interval_ms / 1000
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if ident not in names:
+                names = {t.ident: t.name for t in threading.enumerate()}
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}"))
+            stacks[";".join(reversed(labels))] += 1
+        time.sleep(interval)
+
+    return stacks
+
+
+def folded(stacks: Counter) -> str:
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
@@ -0,0 +1,22 @@
+from typing import Optional
+import secrets
+
+from fastapi import Header, HTTPException
+
+from app.core.config import settings
+
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    return bool(settings.ADMIN_TOKEN) and token is not None and secrets.compare_digest(
+        token.encode(), settings.ADMIN_TOKEN.encode()
+    )
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Admin endpoints: 404 while ADMIN_TOKEN is unset, 403 on a wrong token.
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not admin_token_valid(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
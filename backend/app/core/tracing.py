@@ -0,0 +1,118 @@
+# Opt-in per-request traces.
+#
+# A Trace lives in a ContextVar only for requests that asked for it
+# (X-Debug-Trace + admin token, see main.py); everywhere else
+# record_span() is a single ContextVar lookup that returns None.
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import time
+import uuid
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.security import admin_token_valid
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("lean_trace", default=None)
+
+
+class Trace:
+    """
+    Spans of one request, as offsets from the request start.
+    """
+
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.spans: List[Dict] = []
+        self.duration_ms: Optional[float] = None
+
+    def add(self, name: str, start: float, end: float) -> None:
+        self.spans.append({
+            "name": name,
+            "start_ms": round((start - self._start) * 1000, 2),
+            "duration_ms": round((end - start) * 1000, 2),
+        })
+
+    def finish(self) -> None:
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 2)
+
+    def server_timing(self) -> str:
+        """
+        ``Server-Timing`` header value (shown by browser dev tools).
+        """
+        entries = [f"{s['name']};dur={s['duration_ms']}" for s in self.spans]
+        if self.duration_ms is not None:
+            entries.append(f"request;dur={self.duration_ms}")
+        return ", ".join(entries)
+
+    def as_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": self.spans,
+        }
+
+
+class TraceBuffer:
+    """
+    Last ``size`` finished traces, for the admin endpoint.
+    """
+
+    def __init__(self, size: int = 100):
+        self._traces: deque = deque(maxlen=size)
+
+    def add(self, trace: Trace) -> None:
+        self._traces.append(trace)
+
+    def recent(self, limit: int) -> List[Dict]:
+        return [t.as_dict() for t in list(self._traces)[-limit:]][::-1]
+
+
+def record_span(name: str, start: float, end: float) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, start, end)
+
+
+class TraceMiddleware:
+    """
+    Pure ASGI middleware, installed only when TRACING_ENABLED. Requests with
+    ``X-Debug-Trace: 1`` and a valid ``X-Admin-Token`` get a trace: spans
+    come back in ``Server-Timing`` / ``X-Trace-Id`` headers and the full
+    trace (including streamed bodies) lands in the buffer.
+    """
+
+    def __init__(self, app, buffer: TraceBuffer):
+        self.app = app
+        self.buffer = buffer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        if headers.get("x-debug-trace") != "1" or not admin_token_valid(headers.get("x-admin-token")):
+            return await self.app(scope, receive, send)
+
+        trace = Trace(f"{scope['method']} {scope['path']}")
+        token = _current.set(trace)
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                trace.finish()
+                response_headers = MutableHeaders(scope=message)
+                response_headers.append("Server-Timing", trace.server_timing())
+                response_headers.append("X-Trace-Id", trace.id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            _current.reset(token)
+            trace.finish()
+            self.buffer.add(trace)
@@ -1,20 +1,36 @@
 import time
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import routes
+from app.api import admin, calculator, routes
+from app.core.bulkhead import Bulkheads, create_bulkheads
 from app.core.config import settings
-from app.services.rag_service import RAGService
+from app.core.dependencies import ServiceContainer, get_bulkheads, get_services
+from app.core.metrics import render_latest
+from app.core.tracing import TraceBuffer, TraceMiddleware
+
+
+# ===== LIFESPAN: una sola instancia de servicios por worker (warm memory) =====
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    services = ServiceContainer()
+    # WARM START (CLAVE PARA RENDER)
+    await services.startup()
+    app.state.services = services
+    yield
+    await services.shutdown()
+    app.state.bulkheads.close()
+
 
 app = FastAPI(
     title="Lean AI Assistant",
     description="AI-powered assistant for Lean Manufacturing expertise",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
-# 🔹 Instancia global del RAG (warm memory)
-rag_service = RAGService()
-
 
 # ===== CORS =====
 app.add_middleware(
@@ -25,8 +41,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ===== BULKHEADS: chat y calculadoras no comparten límites ni cola =====
+app.state.bulkheads = create_bulkheads(settings)
+
+# ===== TRACING (opt-in: sin middleware si está desactivado) =====
+if settings.TRACING_ENABLED:
+    app.state.traces = TraceBuffer(settings.TRACE_BUFFER_SIZE)
+    app.add_middleware(TraceMiddleware, buffer=app.state.traces)
+
 # ===== Routers =====
 app.include_router(routes.router, prefix="/api", tags=["api"])
+app.include_router(calculator.router, prefix="/api", tags=["api"])
+app.include_router(admin.router, prefix="/admin", tags=["admin"], include_in_schema=False)
 
 
 # ===== ROOT =====
@@ -41,7 +67,11 @@ async def root():
 
 # ===== HEALTH CHECK PRO =====
 @app.get("/health")
-async def health_check():
+async def health_check(
+    services: ServiceContainer = Depends(get_services),
+    bulkheads: Bulkheads = Depends(get_bulkheads),
+):
+    rag_service = services.rag_service
     start = time.time()
 
     try:
@@ -58,23 +88,36 @@ async def health_check():
         "latency_ms": latency_ms,
         "rag_collection": stats.get("collection_name"),
         "documents": stats.get("total_points", 0),
+        "embedding_cache": rag_service.embedding_cache.stats(),
+        "retrieval": rag_service.get_retrieval_stats(),
+        "semantic_cache": (
+            rag_service.semantic_cache.stats()
+            if rag_service.semantic_cache is not None
+            else None
+        ),
+        "sessions": (
+            rag_service.session_memory.stats()
+            if rag_service.session_memory is not None
+            else None
+        ),
+        "admission": rag_service.admission.stats(),
+        "bulkheads": bulkheads.stats(),
+        "single_flight": (
+            rag_service.single_flight.stats()
+            if rag_service.single_flight is not None
+            else None
+        ),
+        "llm": services.llm_service.stats(),
+        "worker": services.stats(),
         "version": "0.1.0"
     }
 
 
-# ===== WARM START (CLAVE PARA RENDER) =====
-@app.on_event("startup")
-async def startup_event():
-    """
-    Preload embeddings + vector DB connection.
-    Esto evita primera respuesta lenta en producción.
-    """
-    try:
-        _ = rag_service.embedder.encode("warmup")
-        await rag_service.get_knowledge_stats()
-        print("🔥 RAG warm-up completado")
-    except Exception as e:
-        print("⚠️ Warm-up parcial:", e)
+# ===== PROMETHEUS =====
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_latest()
+    return Response(body, media_type=content_type)
 
 
 # ===== LOCAL RUN =====
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 # OEE Models
@@ -14,11 +14,66 @@ class OEEResult(BaseModel):
     losses: dict
     recommendations: List[str]
 
+# OEE from machine event logs (app.services.oee_engine)
+_CLOCK = r"^([01]\d|2[0-3]):[0-5]\d$"
+
+class ShiftDefinition(BaseModel):
+    name: str
+    start: str = Field(..., pattern=_CLOCK, description="HH:MM, plant local time")
+    end: str = Field(..., pattern=_CLOCK, description="HH:MM; before start = ends next day")
+
+class PlannedDowntime(BaseModel):
+    start: datetime
+    end: datetime
+    machine: Optional[str] = None  # None = all machines
+    reason: str = ""
+
+class OEELogConfig(BaseModel):
+    shifts: List[ShiftDefinition] = Field(default_factory=lambda: [
+        ShiftDefinition(name="A", start="06:00", end="14:00"),
+        ShiftDefinition(name="B", start="14:00", end="22:00"),
+        ShiftDefinition(name="C", start="22:00", end="06:00"),
+    ])
+    breaks: List[ShiftDefinition] = []  # paradas planificadas diarias (comida, limpieza)
+    planned_downtime: List[PlannedDowntime] = []  # paradas puntuales (mantenimiento)
+    ideal_cycle_seconds: Dict[str, float] = {}  # por máquina
+    default_ideal_cycle_seconds: float = Field(..., gt=0)
+    # Fin de la ventana observada: el último estado de cada máquina se cierra
+    # aquí. None = se cierra en el último evento de esa máquina (no suma tiempo).
+    log_end: Optional[datetime] = None
+
+class MachineShiftOEE(BaseModel):
+    machine: str
+    shift: str
+    shift_start: datetime
+    shift_end: datetime
+    planned_seconds: float  # tiempo registrado dentro del turno, sin paradas planificadas
+    run_seconds: float
+    setup_seconds: float
+    stop_seconds: float
+    good: int
+    scrap: int
+    availability: float  # %
+    performance: float  # %, recortado a 100 (ciclo ideal mal configurado)
+    quality: float  # %
+    result: OEEResult
+
 # Process Step Model
 class ProcessStep(BaseModel):
     name: str
     cycle_time: float = Field(..., gt=0, description="Cycle time in minutes")
     wait_time: float = Field(default=0, ge=0, description="Wait time in minutes")
+    predecessors: List[str] = Field(
+        default_factory=list, description="Names of the steps that must finish before this one"
+    )
+
+# Line balancing task (app.services.line_balancing)
+class LineTask(BaseModel):
+    name: str
+    time_seconds: float = Field(..., gt=0, description="Task time in seconds")
+    predecessors: List[str] = Field(
+        default_factory=list, description="Names of the tasks that must be done before this one"
+    )
 
 # Chat Models
 class Message(BaseModel):
@@ -30,6 +85,8 @@ class Conversation(BaseModel):
     id: str
     user_id: Optional[str] = None
     messages: List[Message] = []
+    summary: str = ""  # turnos antiguos resumidos (session memory)
+    summarized_turns: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -40,7 +97,28 @@ class Document(BaseModel):
     metadata: dict = {}
     embedding: Optional[List[float]] = None
 
+# Chunk payload schema (Qdrant / local index), shared by ingestion and RAGService
+CHUNK_SCHEMA_VERSION = 2
+SNIPPET_LENGTH = 200
+
 class DocumentChunk(BaseModel):
+    schema_version: int = CHUNK_SCHEMA_VERSION
     text: str
-    metadata: dict
+    source: str
     chunk_index: int
+    total_chunks: int
+    snippet: str = ""  # precomputed at ingest time for the "sources" list
+
+    def to_payload(self) -> dict:
+        payload = self.model_dump()
+        if not payload["snippet"]:
+            payload["snippet"] = self.make_snippet(self.text)
+        return payload
+
+    @staticmethod
+    def make_snippet(text: str) -> str:
+        text = " ".join(text.split())
+        return text[:SNIPPET_LENGTH] + "..." if len(text) > SNIPPET_LENGTH else text
+
+# Payload fields retrieval needs (search/scroll request only these)
+CHUNK_RETRIEVAL_FIELDS = ["text", "source", "chunk_index", "snippet"]
@@ -0,0 +1,165 @@
+from contextlib import asynccontextmanager
+from typing import Dict
+import asyncio
+import math
+
+from app.core.metrics import LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_SHED
+
+
+class Overloaded(Exception):
+    """
+    Request shed by admission control or a bulkhead; maps to an HTTP status + Retry-After.
+    """
+
+    def __init__(self, reason: str, status_code: int, retry_after: int, resource: str = "LLM"):
+        super().__init__(f"{resource} capacity exceeded ({reason})")
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limiter in front of the LLM with a bounded FIFO wait queue.
+
+    A request enters with a deadline (loop time). It is shed immediately,
+    instead of timing out late, when:
+
+      - the queue is full                          -> 429 (queue_full)
+      - the expected queue wait plus one LLM call
+        does not fit before the deadline           -> 503 (deadline)
+      - it waited in the queue and the slot came
+        too late to finish in time                  -> 503 (wait_timeout)
+
+    Once admitted, callers give the LLM only the time left before the
+    deadline and raise ``timed_out()`` (503, llm_timeout) if it runs out.
+
+    The LLM call time is an EWMA of how long slots are held.
+
+    Background work (session summaries) uses ``background_slot``: it never
+    queues, only takes a slot that is free right now with nobody waiting,
+    and at most ``max_background`` at once, so it cannot crowd out chats.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        max_queue: int = 64,
+        initial_service_s: float = 2.0,
+        smoothing: float = 0.2,
+        max_background: int = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_background = max(1, max_concurrent // 4) if max_background is None else max_background
+        self.service_s = initial_service_s
+        self.smoothing = smoothing
+
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.background_in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed: Dict[str, int] = {
+            "queue_full": 0, "deadline": 0, "wait_timeout": 0, "llm_timeout": 0, "background": 0,
+        }
+
+    def expected_wait(self, position: int) -> float:
+        """
+        Seconds until a request at queue ``position`` (1-based) gets a slot.
+        """
+        return math.ceil(position / self.max_concurrent) * self.service_s
+
+    def _shed(self, reason: str, status_code: int, wait: float) -> Overloaded:
+        self.shed[reason] += 1
+        LLM_SHED.labels(reason).inc()
+        return Overloaded(reason, status_code, retry_after=max(1, math.ceil(wait)))
+
+    def timed_out(self) -> Overloaded:
+        """
+        The admitted LLM call ran out of the request deadline -> 503, so the
+        client retries later instead of getting a late timeout answer.
+        """
+        return self._shed("llm_timeout", 503, self.service_s)
+
+    @asynccontextmanager
+    async def slot(self, deadline: float):
+        loop = asyncio.get_running_loop()
+
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()  # free slot: no suspension
+        else:
+            wait = self.expected_wait(self.waiting + 1)
+            if self.waiting >= self.max_queue:
+                raise self._shed("queue_full", 429, wait)
+            if loop.time() + wait + self.service_s > deadline:
+                raise self._shed("deadline", 503, wait)
+
+            # Latest moment a slot is still useful: deadline minus one LLM call
+            budget = deadline - self.service_s - loop.time()
+            self.waiting += 1
+            LLM_QUEUE_DEPTH.inc()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=budget)
+            except asyncio.TimeoutError:
+                raise self._shed("wait_timeout", 503, self.expected_wait(self.waiting)) from None
+            finally:
+                self.waiting -= 1
+                LLM_QUEUE_DEPTH.dec()
+
+        self.in_flight += 1
+        self.admitted += 1
+        LLM_IN_FLIGHT.inc()
+        start = loop.time()
+        try:
+            yield
+        finally:
+            held = loop.time() - start
+            self.service_s += self.smoothing * (held - self.service_s)
+            self.in_flight -= 1
+            LLM_IN_FLIGHT.dec()
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def background_slot(self):
+        """
+        Low-priority slot: raises ``Overloaded`` at once unless a slot is
+        free, no request is queued and the background share is not used up.
+        """
+        if self._semaphore.locked() or self.waiting or self.background_in_flight >= self.max_background:
+            raise self._shed("background", 503, self.service_s)
+
+        await self._semaphore.acquire()  # free slot: no suspension
+        self.in_flight += 1
+        self.background_in_flight += 1
+        LLM_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            # Sin EWMA: los resúmenes son cortos y sesgarían la estimación de los chats
+            self.in_flight -= 1
+            self.background_in_flight -= 1
+            LLM_IN_FLIGHT.dec()
+            self._semaphore.release()
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "background_in_flight": self.background_in_flight,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "service_s_estimate": round(self.service_s, 3),
+        }
+
+
+def create_admission_controller(settings) -> AdmissionController:
+    """
+    One LLM admission controller per worker, shared by chats and summaries.
+    """
+    return AdmissionController(
+        max_concurrent=settings.LLM_MAX_CONCURRENT,
+        max_queue=settings.LLM_MAX_QUEUE,
+    )
@@ -1,6 +1,125 @@
-from typing import List, Dict
+from typing import List, Dict, Sequence, Tuple
+import numpy as np
 from app.models.schemas import OEEInput, OEEResult, ProcessStep
 
+# 🔹 Recomendaciones con código estable: el escalar devuelve el texto, los
+# endpoints batch devuelven una máscara de bits por fila (bit i = código i)
+OEE_RECOMMENDATIONS = (
+    ("tpm", "🔧 Availability < 90%: Implementar TPM (Total Productive Maintenance) "
+            "para reducir paradas no planificadas y tiempos de setup"),
+    ("toc", "⚡ Performance < 95%: Analizar cuellos de botella con Theory of Constraints "
+            "y optimizar la velocidad de producción"),
+    ("poka_yoke", "✅ Quality < 99%: Implementar Poka-Yoke (error-proofing) y Jidoka "
+                  "para detectar defectos en origen"),
+    ("world_class", "🏆 ¡Felicitaciones! Tu OEE está en nivel World-Class (≥85%). "
+                    "Continúa con mejora continua (Kaizen)"),
+    ("acceptable", "📊 OEE Aceptable (60-85%). Enfócate en la pérdida mayor para "
+                   "alcanzar World-Class"),
+    ("low", "⚠️ OEE Bajo (<60%). Requiere atención urgente. "
+            "Prioriza la dimensión con mayor pérdida"),
+)
+
+LEAD_TIME_RECOMMENDATIONS = (
+    ("continuous_flow", "⚠️ Menos del 50% del tiempo agrega valor. "
+                        "Implementar flujo continuo y eliminar esperas"),
+    ("reduce_batch", "📦 Considerar reducir tamaños de lote para disminuir WIP"),
+    ("reduce_waits", "📈 Hay oportunidad de mejora. Analizar y reducir tiempos de espera"),
+    ("good_flow", "✅ Buen flujo de valor. Continuar con Kaizen para optimizar"),
+    ("bottleneck", "🎯 Cuello de botella"),  # escalar: nombre y ciclo del paso
+)
+
+_OEE_TEXT = dict(OEE_RECOMMENDATIONS)
+_LEAD_TEXT = dict(LEAD_TIME_RECOMMENDATIONS)
+_OEE_BIT = {code: 1 << i for i, (code, _) in enumerate(OEE_RECOMMENDATIONS)}
+_LEAD_BIT = {code: 1 << i for i, (code, _) in enumerate(LEAD_TIME_RECOMMENDATIONS)}
+_EFFICIENCY = np.array(["Low", "Medium", "High"])
+
+
+def _round(values: np.ndarray, ndigits: int = 2) -> np.ndarray:
+    """
+    Vectorized ``round(x, ndigits)`` with Python's exact semantics.
+
+    ``rint(x * 10**n) / 10**n`` agrees with Python's correctly rounded
+    ``round`` except near decimal ties (e.g. 2.675), where the scaled float
+    is inexact; those few rows fall back to the builtin.
+    """
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    rounded = np.rint(scaled) / scale
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie | ~(np.abs(scaled) < 2.0 ** 52)):
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+
+def _column(values: Sequence[float], name: str, rows: int) -> np.ndarray:
+    column = np.asarray(values, dtype=np.float64)
+    if column.ndim != 1 or len(column) != rows:
+        raise ValueError(f"'{name}' must have {rows} values")
+    if not np.isfinite(column).all():
+        raise ValueError(f"'{name}' must be finite")
+    return column
+
+
+def _rows(mask: np.ndarray) -> List[int]:
+    return np.flatnonzero(mask)[:10].tolist()
+
+
+def _find_cycle(preds: List[List[int]], indegree: List[int]) -> List[int]:
+    """
+    One cycle among the nodes Kahn's sort could not release (every such node
+    has an unreleased predecessor, so walking back must repeat a node).
+    """
+    v = next(i for i, d in enumerate(indegree) if d > 0)
+    seen: Dict[int, int] = {}
+    walk: List[int] = []
+    while v not in seen:
+        seen[v] = len(walk)
+        walk.append(v)
+        v = next(p for p in preds[v] if indegree[p] > 0)
+    cycle = walk[seen[v]:][::-1]
+    return cycle + cycle[:1]
+
+
+def process_graph(
+    names: Sequence[str], predecessors: Sequence[Sequence[str]]
+) -> Tuple[List[List[int]], List[List[int]], List[int]]:
+    """
+    Index a precedence graph by position: (preds, succs, topological order).
+
+    Raises:
+        ValueError: duplicate names, unknown predecessors or cycles
+    """
+    n = len(names)
+    index: Dict[str, int] = {}
+    for i, name in enumerate(names):
+        if index.setdefault(name, i) != i:
+            raise ValueError(f"Duplicate step name: '{name}'")
+
+    preds: List[List[int]] = [[] for _ in range(n)]
+    succs: List[List[int]] = [[] for _ in range(n)]
+    for i, before in enumerate(predecessors):
+        for name in before:
+            p = index.get(name)
+            if p is None:
+                raise ValueError(f"Step '{names[i]}' has unknown predecessor '{name}'")
+            preds[i].append(p)
+            succs[p].append(i)
+
+    # Kahn: order crece mientras se recorre
+    indegree = [len(p) for p in preds]
+    order = [i for i in range(n) if not indegree[i]]
+    for v in order:
+        for s in succs[v]:
+            indegree[s] -= 1
+            if not indegree[s]:
+                order.append(s)
+    if len(order) < n:
+        cycle = " → ".join(names[i] for i in _find_cycle(preds, indegree))
+        raise ValueError(f"Process graph has a cycle: {cycle}")
+
+    return preds, succs, order
+
 class LeanCalculator:
     """
     Service for calculating Lean Manufacturing metrics
@@ -36,38 +155,20 @@ class LeanCalculator:
         recommendations = []
         
         if input.availability < 90:
-            recommendations.append(
-                "🔧 Availability < 90%: Implementar TPM (Total Productive Maintenance) "
-                "para reducir paradas no planificadas y tiempos de setup"
-            )
+            recommendations.append(_OEE_TEXT["tpm"])
         
         if input.performance < 95:
-            recommendations.append(
-                "⚡ Performance < 95%: Analizar cuellos de botella con Theory of Constraints "
-                "y optimizar la velocidad de producción"
-            )
+            recommendations.append(_OEE_TEXT["toc"])
         
         if input.quality < 99:
-            recommendations.append(
-                "✅ Quality < 99%: Implementar Poka-Yoke (error-proofing) y Jidoka "
-                "para detectar defectos en origen"
-            )
+            recommendations.append(_OEE_TEXT["poka_yoke"])
         
         if oee >= 85:
-            recommendations.append(
-                "🏆 ¡Felicitaciones! Tu OEE está en nivel World-Class (≥85%). "
-                "Continúa con mejora continua (Kaizen)"
-            )
+            recommendations.append(_OEE_TEXT["world_class"])
         elif oee >= 60:
-            recommendations.append(
-                "📊 OEE Aceptable (60-85%). Enfócate en la pérdida mayor para "
-                "alcanzar World-Class"
-            )
+            recommendations.append(_OEE_TEXT["acceptable"])
         else:
-            recommendations.append(
-                "⚠️ OEE Bajo (<60%). Requiere atención urgente. "
-                "Prioriza la dimensión con mayor pérdida"
-            )
+            recommendations.append(_OEE_TEXT["low"])
         
         return OEEResult(
             oee=round(oee, 2),
@@ -129,27 +230,18 @@ class LeanCalculator:
         # Generate recommendations
         recommendations = []
         if value_added_ratio < 50:
-            recommendations.append(
-                "⚠️ Menos del 50% del tiempo agrega valor. "
-                "Implementar flujo continuo y eliminar esperas"
-            )
-            recommendations.append(
-                "📦 Considerar reducir tamaños de lote para disminuir WIP"
-            )
+            recommendations.append(_LEAD_TEXT["continuous_flow"])
+            recommendations.append(_LEAD_TEXT["reduce_batch"])
         elif value_added_ratio < 75:
-            recommendations.append(
-                "📈 Hay oportunidad de mejora. Analizar y reducir tiempos de espera"
-            )
+            recommendations.append(_LEAD_TEXT["reduce_waits"])
         else:
-            recommendations.append(
-                "✅ Buen flujo de valor. Continuar con Kaizen para optimizar"
-            )
+            recommendations.append(_LEAD_TEXT["good_flow"])
         
         # Identify bottleneck
         if process_steps:
             bottleneck = max(process_steps, key=lambda x: x.get("cycle_time", 0))
             recommendations.append(
-                f"🎯 Cuello de botella: '{bottleneck['name']}' "
+                f"{_LEAD_TEXT['bottleneck']}: '{bottleneck['name']}' "
                 f"({bottleneck.get('cycle_time', 0)} min)"
             )
         
@@ -209,3 +301,257 @@ class LeanCalculator:
                 else "Mantener el proceso y considerar reducir inventario"
             )
         }
+
+    # 🔹 Batch (columnar): una pasada NumPy por columna en vez de un modelo
+    # Pydantic y una llamada por fila. Mismas operaciones y mismo redondeo
+    # que las funciones escalares, así que los resultados coinciden exactamente.
+
+    @staticmethod
+    def calculate_oee_batch(
+        availability: Sequence[float],
+        performance: Sequence[float],
+        quality: Sequence[float],
+    ) -> Dict[str, np.ndarray]:
+        """
+        OEE for many lines at once (one row per machine × shift)
+
+        Returns:
+            Dict of equal-length arrays: oee, world_class, the four losses and
+            ``recommendation_codes`` (bitmask over OEE_RECOMMENDATIONS)
+        """
+        rows = len(availability)
+        a = _column(availability, "availability", rows)
+        p = _column(performance, "performance", rows)
+        q = _column(quality, "quality", rows)
+        for name, column in (("availability", a), ("performance", p), ("quality", q)):
+            bad = (column < 0) | (column > 100)
+            if bad.any():
+                raise ValueError(f"'{name}' must be within 0-100 (rows {_rows(bad)})")
+
+        oee = (a / 100) * (p / 100) * (q / 100) * 100
+
+        codes = np.zeros(rows, dtype=np.int64)
+        codes |= np.where(a < 90, _OEE_BIT["tpm"], 0)
+        codes |= np.where(p < 95, _OEE_BIT["toc"], 0)
+        codes |= np.where(q < 99, _OEE_BIT["poka_yoke"], 0)
+        codes |= np.select(
+            [oee >= 85, oee >= 60],
+            [_OEE_BIT["world_class"], _OEE_BIT["acceptable"]],
+            _OEE_BIT["low"],
+        )
+
+        return {
+            "oee": _round(oee),
+            "world_class": oee >= 85,
+            "availability_loss": _round(100 - a),
+            "performance_loss": _round(100 - p),
+            "quality_loss": _round(100 - q),
+            "total_loss": _round(100 - oee),
+            "recommendation_codes": codes,
+        }
+
+    @staticmethod
+    def calculate_takt_time_batch(
+        available_time_minutes: Sequence[float],
+        customer_demand_units: Sequence[float],
+    ) -> Dict[str, np.ndarray]:
+        """
+        Takt time for many lines at once (no per-row interpretation text)
+        """
+        rows = len(available_time_minutes)
+        available = _column(available_time_minutes, "available_time_minutes", rows)
+        demand = _column(customer_demand_units, "customer_demand_units", rows)
+        if (demand <= 0).any():
+            raise ValueError(f"Customer demand must be greater than 0 (rows {_rows(demand <= 0)})")
+        if (available == 0).any():
+            raise ValueError(f"Available time must not be 0 (rows {_rows(available == 0)})")
+
+        takt = available / demand
+        return {
+            "takt_time_minutes": _round(takt),
+            "takt_time_seconds": _round(takt * 60),
+            "units_per_hour": _round(60 / takt),
+            "units_per_day": _round((available / takt) * (480 / available)),
+        }
+
+    @staticmethod
+    def calculate_lead_time_batch(
+        step_counts: Sequence[int],
+        cycle_time: Sequence[float],
+        wait_time: Sequence[float] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Lead time for many processes at once
+
+        Steps are flattened: process i owns the next ``step_counts[i]``
+        entries of ``cycle_time`` / ``wait_time``.
+
+        Returns:
+            Dict of per-process arrays, ``recommendation_codes`` (bitmask over
+            LEAD_TIME_RECOMMENDATIONS) and ``bottleneck_step`` (index within
+            the process, -1 when it has no steps)
+        """
+        counts = np.asarray(step_counts, dtype=np.int64)
+        if counts.ndim != 1 or (counts < 0).any():
+            raise ValueError("'step_counts' must be non-negative integers")
+        steps = int(counts.sum())
+        cycle = _column(cycle_time, "cycle_time", steps)
+        wait = np.zeros(steps) if wait_time is None else _column(wait_time, "wait_time", steps)
+
+        processes = len(counts)
+        owner = np.repeat(np.arange(processes), counts)
+        # bincount suma en orden de entrada, igual que sum() del escalar
+        total_cycle = np.bincount(owner, weights=cycle, minlength=processes)
+        total_wait = np.bincount(owner, weights=wait, minlength=processes)
+        total_lead = total_cycle + total_wait
+
+        has_lead = total_lead > 0
+        ratio = np.zeros(processes)
+        np.divide(total_cycle, total_lead, out=ratio, where=has_lead)
+        ratio = np.where(has_lead, ratio * 100, 0.0)
+
+        codes = np.select(
+            [ratio < 50, ratio < 75],
+            [_LEAD_BIT["continuous_flow"] | _LEAD_BIT["reduce_batch"], _LEAD_BIT["reduce_waits"]],
+            _LEAD_BIT["good_flow"],
+        ).astype(np.int64)
+
+        # First step with the segment's max cycle time (same tie rule as max())
+        bottleneck = np.full(processes, -1, dtype=np.int64)
+        nonempty = counts > 0
+        if steps:
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            seg_max = np.full(processes, -np.inf)
+            seg_max[nonempty] = np.maximum.reduceat(cycle, starts[nonempty])
+            candidates = np.where(cycle == seg_max[owner], np.arange(steps), steps)
+            first = np.minimum.reduceat(candidates, starts[nonempty])
+            bottleneck[nonempty] = first - starts[nonempty]
+            codes |= np.where(nonempty, _LEAD_BIT["bottleneck"], 0)
+
+        return {
+            "total_lead_time_minutes": _round(total_lead),
+            "total_lead_time_hours": _round(total_lead / 60),
+            "total_cycle_time": _round(total_cycle),
+            "total_wait_time": _round(total_wait),
+            "value_added_ratio": _round(ratio),
+            "waste_percentage": _round(100 - ratio),
+            "process_efficiency": _EFFICIENCY[(ratio >= 50).astype(int) + (ratio >= 75)],
+            "recommendation_codes": codes,
+            "bottleneck_step": bottleneck,
+        }
+
+    # 🔹 Lead time sobre grafos de proceso: con ramas paralelas, sub-ensambles
+    # y puntos de unión el lead time es el camino crítico (CPM), no la suma.
+
+    @staticmethod
+    def calculate_critical_path(process_steps: List[ProcessStep]) -> Dict:
+        """
+        Critical-path lead time for a process graph
+
+        A step waits ``wait_time`` and then runs ``cycle_time`` once all its
+        ``predecessors`` have finished. Forward and backward passes in
+        topological order: O(V+E).
+
+        Returns:
+            Dict with lead time along the critical path, slack per step and recommendations
+
+        Raises:
+            ValueError: empty graph, duplicate names, unknown predecessors or cycles
+        """
+        n = len(process_steps)
+        if not n:
+            raise ValueError("At least one process step is required")
+
+        preds, _, order = process_graph(
+            [step.name for step in process_steps], [step.predecessors for step in process_steps]
+        )
+
+        duration = [step.wait_time + step.cycle_time for step in process_steps]
+
+        # Forward pass: earliest start/finish; via = predecessor that sets the start
+        earliest = [0.0] * n
+        finish = [0.0] * n
+        via = [-1] * n
+        for v in order:
+            start = 0.0
+            for p in preds[v]:
+                if finish[p] > start:
+                    start = finish[p]
+                    via[v] = p
+            earliest[v] = start
+            finish[v] = start + duration[v]
+
+        lead = max(finish)
+
+        # Backward pass: latest finish without delaying the end of the process
+        latest = [lead] * n
+        for v in reversed(order):
+            latest_start = latest[v] - duration[v]
+            for p in preds[v]:
+                if latest_start < latest[p]:
+                    latest[p] = latest_start
+
+        path = []
+        v = finish.index(lead)
+        while v >= 0:
+            path.append(v)
+            v = via[v]
+        path.reverse()
+
+        critical_cycle = sum(process_steps[v].cycle_time for v in path)
+        critical_wait = sum(process_steps[v].wait_time for v in path)
+        value_added_ratio = critical_cycle / lead * 100 if lead > 0 else 0
+
+        recommendations = []
+        if value_added_ratio < 50:
+            recommendations.append(_LEAD_TEXT["continuous_flow"])
+            recommendations.append(_LEAD_TEXT["reduce_batch"])
+        elif value_added_ratio < 75:
+            recommendations.append(_LEAD_TEXT["reduce_waits"])
+        else:
+            recommendations.append(_LEAD_TEXT["good_flow"])
+
+        # Only critical steps constrain lead time
+        bottleneck = process_steps[max(path, key=lambda v: process_steps[v].cycle_time)]
+        recommendations.append(
+            f"{_LEAD_TEXT['bottleneck']}: '{bottleneck.name}' ({bottleneck.cycle_time} min)"
+        )
+
+        # Per-step columns rounded in one NumPy pass (same result as round())
+        earliest, finish, latest, duration = map(np.array, (earliest, finish, latest, duration))
+        slack = np.maximum(latest - finish, 0.0)
+        columns = zip(
+            _round(earliest).tolist(),
+            _round(finish).tolist(),
+            _round(latest - duration).tolist(),
+            _round(latest).tolist(),
+            _round(slack).tolist(),
+            (slack <= 1e-9 * lead).tolist(),
+        )
+        steps = [
+            {
+                "name": step.name,
+                "earliest_start": es,
+                "earliest_finish": ef,
+                "latest_start": ls,
+                "latest_finish": lf,
+                "slack": sl,
+                "critical": critical,
+            }
+            for step, (es, ef, ls, lf, sl, critical) in zip(process_steps, columns)
+        ]
+
+        return {
+            "total_lead_time_minutes": round(lead, 2),
+            "total_lead_time_hours": round(lead / 60, 2),
+            "sequential_lead_time_minutes": round(sum(duration.tolist()), 2),
+            "critical_path": [process_steps[v].name for v in path],
+            "critical_cycle_time": round(critical_cycle, 2),
+            "critical_wait_time": round(critical_wait, 2),
+            "total_work_content": round(sum(step.cycle_time for step in process_steps), 2),
+            "value_added_ratio": round(value_added_ratio, 2),
+            "waste_percentage": round(100 - value_added_ratio, 2),
+            "process_efficiency": "High" if value_added_ratio >= 75 else "Medium" if value_added_ratio >= 50 else "Low",
+            "steps": steps,
+            "recommendations": recommendations,
+        }
@@ -0,0 +1,188 @@
+from typing import Dict, List, Optional, Sequence
+import math
+
+import numpy as np
+
+try:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional
+    _ENCODING = None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count with tiktoken if installed, else ~4 characters per token.
+    """
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def strip_overlap(previous: str, current: str, max_overlap: int) -> str:
+    """
+    Drop the prefix of ``current`` that repeats the tail of ``previous``
+    (the chunker's sliding-window overlap).
+    """
+    for size in range(min(max_overlap, len(previous), len(current)), 0, -1):
+        if previous.endswith(current[:size]):
+            return current[size:]
+    return current
+
+
+def mmr_select(
+    docs: Sequence[Dict],
+    lambda_mult: float = 0.7,
+    duplicate_threshold: float = 0.95,
+) -> List[Dict]:
+    """
+    Maximal-marginal-relevance ordering over the vectors returned by search.
+
+    Relevance is the retrieval score; redundancy is the max cosine to chunks
+    already selected. Near-duplicates (cosine >= ``duplicate_threshold``) are
+    dropped. Docs without a vector (lexical-only hits) keep their rank.
+    """
+    with_vectors = [d for d in docs if d.get("vector") is not None]
+    if len(with_vectors) < 2:
+        return list(docs)
+
+    vectors = np.array([d["vector"] for d in with_vectors], dtype=np.float32)
+    vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    relevance = np.array([d.get("score") or 0.0 for d in with_vectors], dtype=np.float32)
+    similarity = vectors @ vectors.T
+
+    selected: List[int] = []
+    remaining = list(range(len(with_vectors)))
+    while remaining:
+        if selected:
+            redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype=np.float32)
+
+        keep = redundancy < duplicate_threshold
+        remaining = [r for r, k in zip(remaining, keep) if k]
+        redundancy = redundancy[keep]
+        if not remaining:
+            break
+
+        mmr = lambda_mult * relevance[remaining] - (1 - lambda_mult) * redundancy
+        best = remaining[int(np.argmax(mmr))]
+        selected.append(best)
+        remaining.remove(best)
+
+    ordered = [with_vectors[i] for i in selected]
+    return ordered + [d for d in docs if d.get("vector") is None]
+
+
+def merge_adjacent(docs: Sequence[Dict], max_overlap: int) -> List[Dict]:
+    """
+    Merge consecutive chunks of the same source into one block, removing
+    the overlapping span between them. Blocks keep the rank of their best chunk.
+    """
+    blocks: List[Dict] = []
+    positioned = []
+
+    for rank, doc in enumerate(docs):
+        metadata = doc.get("metadata", {})
+        if metadata.get("source") is None or metadata.get("chunk_index") is None:
+            blocks.append({**doc, "rank": rank})
+        else:
+            positioned.append((metadata["source"], metadata["chunk_index"], rank, doc))
+
+    positioned.sort(key=lambda p: (p[0], p[1]))
+    run: List = []
+    for item in positioned + [None]:
+        if run and (item is None or item[0] != run[-1][0] or item[1] != run[-1][1] + 1):
+            text = run[0][3].get("content", "")
+            for _, _, _, doc in run[1:]:
+                text += strip_overlap(text, doc.get("content", ""), max_overlap)
+            metadata = dict(run[0][3].get("metadata", {}))
+            metadata["chunk_end"] = run[-1][1]
+            blocks.append({
+                **run[0][3],
+                "content": text,
+                "metadata": metadata,
+                "rank": min(r[2] for r in run),
+            })
+            run = []
+        if item is not None:
+            run.append(item)
+
+    blocks.sort(key=lambda b: b["rank"])
+    for block in blocks:
+        del block["rank"]
+    return blocks
+
+
+def pack_to_budget(blocks: Sequence[Dict], token_budget: int, min_tail_tokens: int = 50) -> List[Dict]:
+    """
+    Keep blocks in order until the budget is spent; the last block is cut at
+    a whitespace boundary if at least ``min_tail_tokens`` still fit.
+    """
+    packed: List[Dict] = []
+    used = 0
+    for block in blocks:
+        tokens = estimate_tokens(block["content"])
+        if used + tokens <= token_budget:
+            packed.append(block)
+            used += tokens
+            continue
+
+        remaining = token_budget - used
+        if remaining >= min_tail_tokens:
+            # Proportional cut, then back off to the previous space
+            cut = int(len(block["content"]) * remaining / tokens)
+            text = block["content"][:cut]
+            text = text[: text.rfind(" ")] if " " in text else text
+            packed.append({**block, "content": text + " …"})
+        break
+    return packed
+
+
+def filter_by_score(
+    docs: Sequence[Dict],
+    min_score: float,
+    relative_cutoff: float,
+    max_gap: float,
+) -> List[Dict]:
+    """
+    Adaptive top-k on the dense similarity scores.
+
+    A chunk is kept when its score is >= ``min_score``, >= ``relative_cutoff``
+    times the best score, and above the first "elbow" (a drop larger than
+    ``max_gap`` between consecutive sorted scores). Chunks without a dense
+    score (lexical hits) are kept.
+    """
+    scores = sorted((d["score"] for d in docs if d.get("score") is not None), reverse=True)
+    if not scores:
+        return list(docs)
+
+    threshold = max(min_score, scores[0] * relative_cutoff)
+    for previous, current in zip(scores, scores[1:]):
+        if current < threshold:
+            break
+        if previous - current > max_gap:
+            threshold = previous
+            break
+
+    return [d for d in docs if d.get("score") is None or d["score"] >= threshold]
+
+
+def build_context(
+    docs: Sequence[Dict],
+    token_budget: int,
+    max_overlap: int,
+    lambda_mult: float = 0.7,
+    duplicate_threshold: float = 0.95,
+) -> List[Dict]:
+    """
+    MMR redundancy filtering -> adjacent-chunk merge -> token-budget packing.
+    """
+    selected = mmr_select(docs, lambda_mult, duplicate_threshold)
+    blocks = merge_adjacent(selected, max_overlap)
+    return pack_to_budget(blocks, token_budget)
+
+
+def context_tokens(docs: Optional[Sequence[Dict]]) -> int:
+    return sum(estimate_tokens(d.get("content", "")) for d in docs or [])
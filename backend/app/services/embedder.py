@@ -0,0 +1,178 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Sequence, Union
+
+import numpy as np
+
+
+class EmbedderBackend(ABC):
+    """
+    Common interface for query/chunk embedders.
+
+    ``encode`` takes a string or a list of strings and returns L2-normalized
+    float32 vectors (1-D for a string, 2-D for a list), like
+    ``SentenceTransformer.encode``.
+    """
+
+    dimension: int
+
+    @abstractmethod
+    def encode(self, texts: Union[str, Sequence[str]]) -> np.ndarray:
+        ...
+
+
+class SentenceTransformerEmbedder(EmbedderBackend):
+    """
+    PyTorch backend (sentence-transformers).
+    """
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts):
+        return self.model.encode(texts, normalize_embeddings=True).astype(np.float32)
+
+
+class OnnxEmbedder(EmbedderBackend):
+    """
+    ONNX Runtime backend: exported MiniLM (optionally int8 dynamic-quantized),
+    HF ``tokenizers`` for tokenization, mean pooling + L2 normalization as in
+    the sentence-transformers pipeline. No torch import.
+    """
+
+    MODEL_FILE = "model.onnx"
+    QUANTIZED_MODEL_FILE = "model_int8.onnx"
+    TOKENIZER_FILE = "tokenizer.json"
+
+    def __init__(
+        self,
+        model_dir: Union[str, Path] = None,
+        quantized: bool = True,
+        intra_op_threads: int = 0,
+        max_length: int = 256,
+        session=None,
+        tokenizer=None,
+    ):
+        if session is None or tokenizer is None:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+
+            model_dir = Path(model_dir)
+            model_file = model_dir / (self.QUANTIZED_MODEL_FILE if quantized else self.MODEL_FILE)
+            if not model_file.exists():
+                raise FileNotFoundError(
+                    f"{model_file} not found; run scripts/export_onnx_embedder.py first"
+                )
+
+            options = ort.SessionOptions()
+            if intra_op_threads:
+                options.intra_op_num_threads = intra_op_threads
+            session = ort.InferenceSession(
+                str(model_file), options, providers=["CPUExecutionProvider"]
+            )
+            tokenizer = Tokenizer.from_file(str(model_dir / self.TOKENIZER_FILE))
+            tokenizer.enable_truncation(max_length=max_length)
+            tokenizer.enable_padding()
+
+        self.session = session
+        self.tokenizer = tokenizer
+        self._input_names = {i.name for i in session.get_inputs()}
+        self.dimension = session.get_outputs()[0].shape[-1]
+
+    def encode(self, texts):
+        single = isinstance(texts, str)
+        batch: List[str] = [texts] if single else list(texts)
+
+        encodings = self.tokenizer.encode_batch(batch)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalization
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        pooled = pooled.astype(np.float32)
+
+        return pooled[0] if single else pooled
+
+
+def create_embedder(
+    backend: str,
+    model_name: str,
+    onnx_path: Union[str, Path] = None,
+    onnx_quantized: bool = True,
+    onnx_threads: int = 0,
+) -> EmbedderBackend:
+    """
+    Build the embedder selected by EMBEDDING_BACKEND.
+    """
+    if backend == "sentence-transformers":
+        return SentenceTransformerEmbedder(model_name)
+    if backend == "onnx":
+        return OnnxEmbedder(onnx_path, quantized=onnx_quantized, intra_op_threads=onnx_threads)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def export_onnx(model_name: str, output_dir: Union[str, Path], quantize: bool = True) -> Path:
+    """
+    One-time export of a sentence-transformers model to ONNX (+ int8 copy).
+
+    Needs torch and sentence-transformers; the runtime image does not.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    model.tokenizer.save_pretrained(str(output_dir))  # writes tokenizer.json
+
+    class _LastHiddenState(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.inner(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                token_type_ids=token_type_ids,
+            )[0]
+
+    dummy = model.tokenizer(["warmup"], return_tensors="pt")
+    dynamic = {0: "batch", 1: "sequence"}
+    torch.onnx.export(
+        _LastHiddenState(transformer),
+        (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"]),
+        str(output_dir / OnnxEmbedder.MODEL_FILE),
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": dynamic,
+            "attention_mask": dynamic,
+            "token_type_ids": dynamic,
+            "last_hidden_state": dynamic,
+        },
+        opset_version=14,
+    )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            str(output_dir / OnnxEmbedder.MODEL_FILE),
+            str(output_dir / OnnxEmbedder.QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8,
+        )
+
+    return output_dir
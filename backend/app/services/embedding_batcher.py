@@ -0,0 +1,110 @@
+from typing import Callable, List, Optional, Sequence, Tuple
+from concurrent.futures import Executor
+import asyncio
+
+import numpy as np
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching scheduler for query embeddings.
+
+    Queries arriving within ``max_wait_ms`` of each other (up to
+    ``max_batch_size``) are encoded with a single ``encode(batch)`` call on
+    the executor, and each caller's future is resolved with its own row.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        executor: Executor,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_in_flight: int = 1,
+    ):
+        self._encode = encode
+        self._executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_in_flight = max(1, max_in_flight)
+
+        # Bound to the running loop on first use
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+
+        self.batches = 0
+        self.items = 0
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Queue a query and wait for its vector.
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            # Only collect a new batch when an encoder slot is free, so
+            # queries pile up (and batch better) while the executor is busy
+            await self._in_flight.acquire()
+            batch = [await self._queue.get()]
+            # Idle encoder and nothing else queued: don't make a lone query wait
+            wait = self.max_wait if self._pending or not self._queue.empty() else 0.0
+            deadline = self._loop.time() + wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self._pending += 1
+            self._loop.create_task(self._encode_batch(batch))
+
+    async def _encode_batch(self, batch: Sequence[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            texts = [text for text, _ in batch]
+            vectors = await self._loop.run_in_executor(
+                self._executor, self._encode, texts
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+        finally:
+            self._pending -= 1
+            self._in_flight.release()
+
+    async def close(self) -> None:
+        """
+        Stop the background worker.
+        """
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import time
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    In-process LRU cache of query embeddings.
+
+    Vectors are stored as contiguous float32 arrays. The cache is bounded by
+    entry count and, optionally, by total vector bytes; entries can also
+    expire after ``ttl_seconds``. Only used from the event loop, so no lock.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 0,
+        ttl_seconds: float = 0,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes  # 0 = sin límite de bytes
+        self.ttl_seconds = ttl_seconds  # 0 = sin expiración
+
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        vector, stored_at = entry
+        if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+            self._remove(key)
+            self.evictions += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return vector
+
+    def put(self, key: str, vector) -> np.ndarray:
+        # Copy: a row of a batch matrix would otherwise keep the whole batch alive
+        vector = np.array(vector, dtype=np.float32, copy=True)
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (vector, time.monotonic())
+        self._bytes += vector.nbytes
+
+        while self._entries and (
+            (self.max_entries and len(self._entries) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+        return vector
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        vector, _ = self._entries.pop(key)
+        self._bytes -= vector.nbytes
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,129 @@
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+import math
+import re
+
+import numpy as np
+
+from app.utils.text import fold_accents
+
+_TOKEN = re.compile(r"\w+")
+
+# Palabras vacías ES/EN que no aportan en consultas cortas
+STOPWORDS = frozenset(
+    """
+    a al como con cual cuales cuando de del donde e el en es esta este esto
+    hay la las lo los me mi mas o para pero por que se sea ser si sin sobre
+    su sus un una uno y yo
+    an and are as be by do does for how in is it of on or the to what when
+    which why with
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase, accent-folded word tokens ("Heijunka", "A3", "SMED").
+    """
+    return _TOKEN.findall(fold_accents(text).casefold())
+
+
+def query_terms(text: str) -> List[str]:
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 inverted index over the knowledge-base chunks.
+
+    Postings are stored per term as parallel numpy arrays (doc rows, term
+    frequencies), so scoring a query touches only the documents that contain
+    its terms.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: List = []
+        self.payloads: List[Dict] = []
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._idf: Dict[str, float] = {}
+        self._doc_len = np.zeros(0, dtype=np.float32)
+        self._avg_len = 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, records: Sequence[Tuple[object, Dict, str]], **kwargs) -> "LexicalIndex":
+        """
+        Build from (id, payload, text) records.
+        """
+        index = cls(**kwargs)
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths = []
+
+        for row, (point_id, payload, text) in enumerate(records):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((row, tf))
+            index.ids.append(point_id)
+            index.payloads.append(payload)
+
+        n = len(records)
+        index._doc_len = np.array(lengths, dtype=np.float32)
+        index._avg_len = float(index._doc_len.mean()) if n else 0.0
+        for term, entries in postings.items():
+            rows = np.fromiter((r for r, _ in entries), dtype=np.int64, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            index._postings[term] = (rows, tfs)
+            df = len(entries)
+            index._idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+        return index
+
+    def search(self, query: str, k: int) -> Tuple[List[Tuple[int, float]], float]:
+        """
+        Top-k (row, score) by BM25, plus a confidence in [0, 1]: the share of
+        the query's IDF mass that the best chunk matches (unknown terms count
+        with the maximum IDF, so "SMED en Heijunka" is confident only if both
+        terms appear in the chunk).
+        """
+        all_terms = list(dict.fromkeys(query_terms(query)))
+        terms = [t for t in all_terms if t in self._postings]
+        if not terms or not self.ids:
+            return [], 0.0
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in terms:
+            rows, tfs = self._postings[term]
+            idf = self._idf[term]
+            norm = self.k1 * (1 - self.b + self.b * self._doc_len[rows] / self._avg_len)
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        candidates = np.flatnonzero(scores)
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        hits = [(int(row), float(scores[row])) for row in top]
+
+        best = hits[0][0]
+        max_idf = math.log(1 + (len(self.ids) + 0.5) / 0.5)
+        matched = sum(
+            self._idf[t] for t in terms if best in self._postings[t][0]
+        )
+        total = sum(self._idf.get(t, max_idf) for t in all_terms)
+        return hits, matched / total
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence], k: int = 60, limit: Optional[int] = None) -> List:
+    """
+    Merge ranked id lists: score(id) = sum 1 / (k + rank).
+    """
+    scores: Dict = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] += 1 / (k + rank)
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return fused[:limit] if limit else fused
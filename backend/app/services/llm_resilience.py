@@ -0,0 +1,108 @@
+from collections import deque
+from typing import Dict, Optional
+import time
+
+import numpy as np
+
+
+class LatencyHistogram:
+    """
+    Rolling latency distribution of the last ``window`` calls: successful
+    ones plus cancelled ones (hedge losers, deadline) as their elapsed time,
+    a lower bound of their real latency.
+
+    Percentiles drive the hedge delay, so a provider that slows down gets
+    hedged sooner and a fast one is hedged rarely.
+    """
+
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=window)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        ``q`` in [0, 1]; None until there is at least one sample.
+        """
+        if not self._samples:
+            return None
+        return float(np.quantile(np.fromiter(self._samples, dtype=np.float64), q))
+
+    def stats(self) -> Dict:
+        def ms(q):
+            value = self.percentile(q)
+            return None if value is None else round(value * 1000, 1)
+
+        return {"count": self.count, "p50_ms": ms(0.5), "p95_ms": ms(0.95), "p99_ms": ms(0.99)}
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker.
+
+    closed -> open after ``failure_threshold`` failures in a row; while open
+    the provider is skipped. After ``reset_seconds`` one trial call is let
+    through (half-open): success closes the breaker, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.opened = 0  # veces que se ha abierto
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        Whether a call may start now (claims the half-open trial slot).
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._state = self.CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+            self._trial_in_flight = False
+            self.opened += 1
+
+    def release(self) -> None:
+        """
+        A call that was cancelled (lost the hedge race) gives back the trial slot.
+        """
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict:
+        return {"state": self.state, "consecutive_failures": self._failures, "opened": self.opened}
@@ -1,9 +1,16 @@
 from openai import AsyncOpenAI
 from anthropic import AsyncAnthropic
 from enum import Enum
+from typing import AsyncIterator, Dict, List, Optional
 import asyncio
+import logging
+import time
 
 from app.core.config import settings
+from app.core.metrics import LLM_HEDGES, LLM_OUTCOMES, LLM_REQUEST_SECONDS, record_tokens
+from app.services.llm_resilience import CircuitBreaker, LatencyHistogram
+
+logger = logging.getLogger(__name__)
 
 
 class LLMProvider(str, Enum):
@@ -11,38 +18,195 @@ class LLMProvider(str, Enum):
     ANTHROPIC = "anthropic"
 
 
+_MODELS = {
+    LLMProvider.OPENAI: lambda: settings.LLM_MODEL,
+    LLMProvider.ANTHROPIC: lambda: settings.ANTHROPIC_MODEL,
+}
+
+
+class TokenUsage:
+    """
+    Input/output token counters from provider usage fields, split into
+    prompt-cache reads and writes.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0  # total, incluye los servidos desde caché
+        self.cached_input_tokens = 0
+        self.cache_write_tokens = 0  # Anthropic: prefijo escrito en caché
+        self.output_tokens = 0
+
+    def record(self, usage: Dict) -> None:
+        self.calls += 1
+        self.input_tokens += usage["input_tokens"]
+        self.cached_input_tokens += usage["cached_input_tokens"]
+        self.cache_write_tokens += usage["cache_write_tokens"]
+        self.output_tokens += usage["output_tokens"]
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_input_ratio": (
+                round(self.cached_input_tokens / self.input_tokens, 4) if self.input_tokens else 0.0
+            ),
+        }
+
+
+def _openai_usage(usage) -> Optional[Dict]:
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "input_tokens": usage.prompt_tokens or 0,
+        "cached_input_tokens": getattr(details, "cached_tokens", 0) or 0,
+        "cache_write_tokens": 0,  # la caché de OpenAI es automática y gratuita
+        "output_tokens": usage.completion_tokens or 0,
+    }
+
+
+def _anthropic_usage(usage) -> Optional[Dict]:
+    if usage is None:
+        return None
+    cached = getattr(usage, "cache_read_input_tokens", 0) or 0
+    written = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    return {
+        # input_tokens de Anthropic excluye lo leído/escrito en caché
+        "input_tokens": (usage.input_tokens or 0) + cached + written,
+        "cached_input_tokens": cached,
+        "cache_write_tokens": written,
+        "output_tokens": usage.output_tokens or 0,
+    }
+
+
+def _anthropic_system(system_prompt: str):
+    """
+    System prompt as a cacheable block: everything up to this breakpoint
+    (the static, versioned prefix) is reused across requests.
+    """
+    if not system_prompt:
+        return ""
+    return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
+
+class _Provider:
+    """
+    One LLM endpoint plus the latency histogram and breaker that steer hedging.
+    """
+
+    def __init__(self, name: str, client, model: str):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.latency = LatencyHistogram(settings.LLM_LATENCY_WINDOW)
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_SECONDS)
+        self.usage = TokenUsage()
+        self.request_seconds = LLM_REQUEST_SECONDS.labels(name)
+
+    def record_usage(self, usage: Optional[Dict]) -> None:
+        if usage is None:
+            return
+        self.usage.record(usage)
+        record_tokens(self.name, usage)
+        logger.info(
+            "llm_usage provider=%s model=%s input_tokens=%d cached_input_tokens=%d "
+            "cache_write_tokens=%d output_tokens=%d",
+            self.name,
+            self.model,
+            usage["input_tokens"],
+            usage["cached_input_tokens"],
+            usage["cache_write_tokens"],
+            usage["output_tokens"],
+        )
+
+    def stats(self) -> Dict:
+        return {
+            "model": self.model,
+            **self.latency.stats(),
+            "breaker": self.breaker.stats(),
+            "usage": self.usage.stats(),
+        }
+
+
 class LLMService:
     """
     Optimized LLM service for low latency production usage.
+
+    ``generate`` hedges: if the primary provider has not answered after its
+    recent p95 latency (LLM_HEDGE_PERCENTILE), a second request goes to the
+    hedge provider (LLM_HEDGE_PROVIDER, same provider by default); the first
+    answer wins and the other request is cancelled. Providers whose circuit
+    breaker is open are skipped.
     """
 
+    TIMEOUT_MESSAGE = "⚠️ La respuesta está tardando demasiado. Intenta reformular la pregunta."
+    ERROR_MESSAGE = "⚠️ Error generando respuesta del modelo."
+
     # 🔹 Clientes en memoria compartida (CRÍTICO)
     _openai_client: AsyncOpenAI | None = None
     _anthropic_client: AsyncAnthropic | None = None
 
-    def __init__(self, provider: str = None):
+    def __init__(self, provider: str = None, hedge_provider: str = None, clients: Dict = None):
+        """
+        ``clients`` maps provider name -> client (fakes in tests); missing
+        ones use the shared SDK clients.
+        """
+        clients = clients or {}
         self.provider = provider or settings.LLM_PROVIDER
+        hedge_provider = hedge_provider or settings.LLM_HEDGE_PROVIDER or self.provider
+
+        # Sin API key para el proveedor de respaldo -> hedge contra el mismo
+        if hedge_provider not in clients and not self._has_api_key(hedge_provider):
+            hedge_provider = self.provider
+
+        self._primary = self._build_provider(self.provider, clients)
+        self._hedge = (
+            self._primary
+            if hedge_provider == self.provider
+            else self._build_provider(hedge_provider, clients)
+        )
+        self.client = self._primary.client
+        self.model = self._primary.model
+
+        self.hedges = 0  # segundas peticiones lanzadas por latencia
+        self.hedge_wins = 0  # ... que respondieron antes que la primera
+        self.fallbacks = 0  # segundas peticiones tras un fallo rápido
 
-        if self.provider == LLMProvider.OPENAI:
+    @staticmethod
+    def _has_api_key(provider: str) -> bool:
+        if provider == LLMProvider.OPENAI:
+            return bool(settings.OPENAI_API_KEY)
+        if provider == LLMProvider.ANTHROPIC:
+            return bool(settings.ANTHROPIC_API_KEY)
+        return False
+
+    @classmethod
+    def _build_provider(cls, name: str, clients: Dict) -> _Provider:
+        if name not in _MODELS:
+            raise ValueError(f"Unknown LLM provider: {name}")
+        client = clients.get(name) or cls._shared_client(name)
+        return _Provider(name, client, _MODELS[name]())
+
+    @classmethod
+    def _shared_client(cls, name: str):
+        if name == LLMProvider.OPENAI:
             if LLMService._openai_client is None:
                 LLMService._openai_client = AsyncOpenAI(
                     api_key=settings.OPENAI_API_KEY,
                     timeout=20,  # evita bloqueos eternos
                 )
-            self.client = LLMService._openai_client
-            self.model = settings.LLM_MODEL
-
-        elif self.provider == LLMProvider.ANTHROPIC:
-            if LLMService._anthropic_client is None:
-                LLMService._anthropic_client = AsyncAnthropic(
-                    api_key=settings.ANTHROPIC_API_KEY,
-                    timeout=20,
-                )
-            self.client = LLMService._anthropic_client
-            self.model = "claude-3-5-sonnet-20241022"
+            return LLMService._openai_client
 
-        else:
-            raise ValueError(f"Unknown LLM provider: {self.provider}")
+        if LLMService._anthropic_client is None:
+            LLMService._anthropic_client = AsyncAnthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                timeout=20,
+            )
+        return LLMService._anthropic_client
 
     async def generate(
         self,
@@ -50,24 +214,253 @@ class LLMService:
         system_prompt: str = None,
         temperature: float = None,
         max_tokens: int = None,
+        timeout: float = None,
     ) -> str:
         """
-        Generate response with timeout + low-latency defaults.
+        Generate response with hedging, breakers and a global deadline.
+
+        ``timeout`` is what is left of the caller's request budget; the call
+        gets the smaller of it and LLM_TIMEOUT_SECONDS.
         """
 
         temperature = temperature or settings.LLM_TEMPERATURE or 0.2
         max_tokens = max_tokens or settings.LLM_MAX_TOKENS or 400
 
         try:
-            # ⏱️ Timeout global de seguridad
-            return await asyncio.wait_for(
-                self._generate_internal(prompt, system_prompt, temperature, max_tokens),
-                timeout=25,
+            answer = await self._hedged(prompt, system_prompt, temperature, max_tokens, timeout)
+        except asyncio.TimeoutError:
+            LLM_OUTCOMES.labels("timeout").inc()
+            return self.TIMEOUT_MESSAGE
+        except Exception:
+            LLM_OUTCOMES.labels("error").inc()
+            return self.ERROR_MESSAGE
+        LLM_OUTCOMES.labels("success").inc()
+        return answer
+
+    def _hedge_delay(self, provider: _Provider) -> float:
+        observed = None
+        if len(provider.latency) >= settings.LLM_HEDGE_MIN_SAMPLES:
+            observed = provider.latency.percentile(settings.LLM_HEDGE_PERCENTILE)
+        delay = settings.LLM_HEDGE_INITIAL_DELAY_S if observed is None else observed
+        return max(settings.LLM_HEDGE_MIN_DELAY_S, delay)
+
+    async def _hedged(self, prompt, system_prompt, temperature, max_tokens, timeout=None) -> str:
+        loop = asyncio.get_running_loop()
+        # ⏱️ Timeout global de seguridad, recortado al presupuesto del llamante
+        budget = settings.LLM_TIMEOUT_SECONDS
+        # Cortar por el plazo del llamante no es culpa del proveedor: no abre el breaker
+        provider_timeout = timeout is None or timeout >= budget
+        if not provider_timeout:
+            if timeout <= 0:
+                raise asyncio.TimeoutError
+            budget = timeout
+        deadline = loop.time() + budget
+
+        order: List[_Provider] = [self._primary]
+        if settings.LLM_HEDGE_ENABLED:
+            order.append(self._hedge)
+        pending: Dict[asyncio.Task, _Provider] = {}
+        hedge_tasks = set()
+        launched = 0
+
+        def launch_next() -> bool:
+            nonlocal launched
+            while launched < len(order):
+                provider = order[launched]
+                launched += 1
+                if provider.breaker.allow():
+                    task = asyncio.ensure_future(
+                        self._attempt(provider, prompt, system_prompt, temperature, max_tokens)
+                    )
+                    pending[task] = provider
+                    if launched > 1:
+                        hedge_tasks.add(task)
+                    return True
+            return False
+
+        if not launch_next():
+            raise RuntimeError("every LLM provider circuit is open")
+        hedge_at = loop.time() + self._hedge_delay(pending[next(iter(pending))])
+
+        error: Exception = None
+        try:
+            while pending:
+                now = loop.time()
+                if now >= deadline:
+                    if provider_timeout:
+                        for provider in pending.values():
+                            provider.breaker.record_failure()
+                    raise asyncio.TimeoutError
+
+                can_hedge = launched < len(order)
+                wait = deadline - now
+                if can_hedge:
+                    wait = min(wait, max(0.0, hedge_at - now))
+
+                done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.pop(task)
+                    if task.exception() is None:
+                        if task in hedge_tasks:
+                            self.hedge_wins += 1
+                            LLM_HEDGES.labels("hedge_win").inc()
+                        return task.result()
+                    error = task.exception()
+
+                # 🔹 Primary failed fast -> fallback now; primary slow -> hedge
+                if can_hedge and not pending:
+                    if launch_next():
+                        self.fallbacks += 1
+                        LLM_HEDGES.labels("fallback").inc()
+                elif can_hedge and loop.time() >= hedge_at:
+                    if launch_next():
+                        self.hedges += 1
+                        LLM_HEDGES.labels("hedge").inc()
+
+            raise error or RuntimeError("no LLM provider available")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, provider: _Provider, prompt, system_prompt, temperature, max_tokens) -> str:
+        start = time.perf_counter()
+        try:
+            text = await self._generate_internal(
+                prompt, system_prompt, temperature, max_tokens, provider=provider
             )
+        except asyncio.CancelledError:
+            provider.breaker.release()  # perdió la carrera; no cuenta como fallo
+            # 🔹 Muestra censurada: tardó al menos esto. Sin ella el histograma
+            # pierde justo las lentas y el p95 (retardo del hedge) deriva a la baja
+            provider.latency.observe(time.perf_counter() - start)
+            raise
+        except Exception:
+            provider.breaker.record_failure()
+            raise
+        elapsed = time.perf_counter() - start
+        provider.latency.observe(elapsed)
+        provider.request_seconds.observe(elapsed)
+        provider.breaker.record_success()
+        return text
+
+    def usage_stats(self) -> Dict:
+        """
+        Token usage summed over providers (cached vs uncached input).
+        """
+        total = TokenUsage()
+        for provider in {id(p): p for p in (self._primary, self._hedge)}.values():
+            for name in ("calls", "input_tokens", "cached_input_tokens", "cache_write_tokens", "output_tokens"):
+                setattr(total, name, getattr(total, name) + getattr(provider.usage, name))
+        return total.stats()
+
+    def stats(self) -> Dict:
+        providers = {self._primary.name: self._primary.stats()}
+        providers[self._hedge.name] = self._hedge.stats()
+        return {
+            "provider": self._primary.name,
+            "hedge_provider": self._hedge.name if settings.LLM_HEDGE_ENABLED else None,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "fallbacks": self.fallbacks,
+            "usage": self.usage_stats(),
+            "providers": providers,
+        }
+
+    async def stream(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        temperature: float = None,
+        max_tokens: int = None,
+        timeout: float = None,
+    ) -> AsyncIterator[str]:
+        """
+        Yield the completion as text deltas. Same timeout budget as
+        ``generate``, for the whole stream; failures are yielded in-band as
+        TIMEOUT_MESSAGE / ERROR_MESSAGE. Not hedged; the hedge provider is
+        used only while the primary's breaker is open.
+        """
+
+        temperature = temperature or settings.LLM_TEMPERATURE or 0.2
+        max_tokens = max_tokens or settings.LLM_MAX_TOKENS or 400
+        loop = asyncio.get_running_loop()
+        budget = settings.LLM_TIMEOUT_SECONDS if timeout is None else min(timeout, settings.LLM_TIMEOUT_SECONDS)
+        deadline = loop.time() + budget
+
+        provider = self._primary
+        if provider.breaker.state == CircuitBreaker.OPEN:
+            provider = self._hedge
+
+        deltas = self._stream_internal(prompt, system_prompt, temperature, max_tokens, provider=provider)
+        try:
+            while True:
+                try:
+                    delta = await asyncio.wait_for(deltas.__anext__(), timeout=max(0.0, deadline - loop.time()))
+                except StopAsyncIteration:
+                    break
+                if delta:
+                    yield delta
         except asyncio.TimeoutError:
-            return "⚠️ La respuesta está tardando demasiado. Intenta reformular la pregunta."
+            LLM_OUTCOMES.labels("timeout").inc()
+            yield self.TIMEOUT_MESSAGE
         except Exception:
-            return "⚠️ Error generando respuesta del modelo."
+            LLM_OUTCOMES.labels("error").inc()
+            yield self.ERROR_MESSAGE
+        else:
+            LLM_OUTCOMES.labels("success").inc()
+        finally:
+            await deltas.aclose()
+
+    async def _stream_internal(
+        self,
+        prompt: str,
+        system_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        provider: _Provider = None,
+    ) -> AsyncIterator[str]:
+
+        provider = provider or self._primary
+
+        # ===== OPENAI =====
+        if provider.name == LLMProvider.OPENAI:
+            messages = []
+
+            if system_prompt:
+                messages.append({"role": "system", "content": system_prompt})
+
+            messages.append({"role": "user", "content": prompt})
+
+            stream = await provider.client.chat.completions.create(
+                model=provider.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if getattr(chunk, "usage", None) is not None:
+                    provider.record_usage(_openai_usage(chunk.usage))
+
+        # ===== ANTHROPIC =====
+        elif provider.name == LLMProvider.ANTHROPIC:
+            async with provider.client.messages.stream(
+                model=provider.model,
+                max_tokens=max_tokens,
+                system=_anthropic_system(system_prompt),
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+                message = await stream.get_final_message()
+                provider.record_usage(_anthropic_usage(getattr(message, "usage", None)))
+
+        else:
+            raise ValueError(f"Unknown LLM provider: {provider.name}")
 
     async def _generate_internal(
         self,
@@ -75,10 +468,13 @@ class LLMService:
         system_prompt: str,
         temperature: float,
         max_tokens: int,
+        provider: _Provider = None,
     ) -> str:
 
+        provider = provider or self._primary
+
         # ===== OPENAI (rápido) =====
-        if self.provider == LLMProvider.OPENAI:
+        if provider.name == LLMProvider.OPENAI:
             messages = []
 
             if system_prompt:
@@ -86,26 +482,28 @@ class LLMService:
 
             messages.append({"role": "user", "content": prompt})
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
+            response = await provider.client.chat.completions.create(
+                model=provider.model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
             )
+            provider.record_usage(_openai_usage(getattr(response, "usage", None)))
 
             return response.choices[0].message.content.strip()
 
         # ===== ANTHROPIC =====
-        elif self.provider == LLMProvider.ANTHROPIC:
-            response = await self.client.messages.create(
-                model=self.model,
+        elif provider.name == LLMProvider.ANTHROPIC:
+            response = await provider.client.messages.create(
+                model=provider.model,
                 max_tokens=max_tokens,
-                system=system_prompt or "",
+                system=_anthropic_system(system_prompt),
                 messages=[{"role": "user", "content": prompt}],
                 temperature=temperature,
             )
+            provider.record_usage(_anthropic_usage(getattr(response, "usage", None)))
 
             return response.content[0].text.strip()
 
         else:
-            raise ValueError(f"Unknown LLM provider: {self.provider}")
+            raise ValueError(f"Unknown LLM provider: {provider.name}")
@@ -0,0 +1,283 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import hashlib
+import json
+import shutil
+import tempfile
+
+import numpy as np
+from qdrant_client.models import Record, ScoredPoint
+
+from app.services.quantization import CompactCodec
+
+VECTORS_FILE = "vectors.f32"
+PAYLOADS_FILE = "payloads.json"
+META_FILE = "meta.json"
+CURRENT_FILE = "CURRENT"  # nombre de la generación publicada
+
+
+def ingest_version(ids: Sequence, payloads: Sequence[Dict]) -> str:
+    """
+    Content hash of an ingested collection (order-independent). Changes
+    whenever a chunk is added, removed or edited, even if the count stays.
+    """
+    digest = hashlib.sha256()
+    for key, payload in sorted(
+        (str(i), json.dumps(p, sort_keys=True, ensure_ascii=False)) for i, p in zip(ids, payloads)
+    ):
+        digest.update(f"{key}\0{payload}\0".encode())
+    return digest.hexdigest()[:16]
+
+
+def resolve_index(path) -> Path:
+    """
+    Directory holding the published artifact: the generation named in
+    ``CURRENT``, or ``path`` itself for artifacts written before generations.
+    """
+    path = Path(path)
+    current = path / CURRENT_FILE
+    if current.exists():
+        return path / current.read_text(encoding="utf-8").strip()
+    return path
+
+
+def write_index(
+    path,
+    vectors,
+    payloads: Sequence[Dict],
+    ids: Optional[Sequence] = None,
+    collection_name: str = "",
+    quantization: str = "none",
+    pca_dim: int = 0,
+) -> Path:
+    """
+    Write a local index artifact:
+
+      vectors.f32    raw float32 matrix (n x dim), L2-normalized, row-major
+      payloads.json  list of {"id": ..., "payload": {...}}, same order
+      meta.json      count, dim, collection name, ingest version
+      codes.bin      optional int8 / binary codes (+ codec.npz, codec.json)
+
+    Every file goes into a fresh ``gen-*`` directory that is never modified
+    afterwards; ``CURRENT`` is then swapped to point at it (temp file +
+    rename). A worker that loads mid-write keeps reading the previous,
+    complete generation, so it never mixes files from two ingests.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim != 2 or len(vectors) != len(payloads):
+        raise ValueError("vectors must be (n, dim) with one payload per row")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+
+    if ids is None:
+        ids = list(range(len(payloads)))
+    version = ingest_version(ids, payloads)
+
+    generation = Path(tempfile.mkdtemp(prefix=f"gen-{version}-", dir=path))
+    generation.chmod(0o755)  # mkdtemp crea 0700; otros usuarios/workers deben leerla
+    vectors.tofile(generation / VECTORS_FILE)
+
+    if quantization != "none" and len(vectors):
+        codec = CompactCodec.fit(vectors, quantization, pca_dim=pca_dim)
+        codec.save(generation, codec.encode(vectors))
+
+    with open(generation / PAYLOADS_FILE, "w", encoding="utf-8") as f:
+        json.dump(
+            [{"id": i, "payload": p} for i, p in zip(ids, payloads)],
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    with open(generation / META_FILE, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "count": len(payloads),
+                "dim": int(vectors.shape[1]),
+                "collection_name": collection_name,
+                "ingest_version": version,
+            },
+            f,
+        )
+
+    # 🔹 Publicación atómica: hasta este rename los lectores ven la generación anterior
+    previous = resolve_index(path)
+    tmp = path / (CURRENT_FILE + ".tmp")
+    tmp.write_text(generation.name, encoding="utf-8")
+    tmp.replace(path / CURRENT_FILE)
+
+    # Se conserva la generación anterior: un worker puede estar abriéndola ahora
+    for old in path.glob("gen-*"):
+        if old not in (generation, previous):
+            shutil.rmtree(old, ignore_errors=True)
+
+    return path
+
+
+def export_collection(client, collection_name: str, path, batch_size: int = 256, **write_kwargs) -> int:
+    """
+    Dump a Qdrant collection (sync client) into a local index artifact.
+    """
+    ids: List = []
+    vectors: List[List[float]] = []
+    payloads: List[Dict] = []
+
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        for point in points:
+            ids.append(point.id)
+            vectors.append(point.vector)
+            payloads.append(point.payload or {})
+        if offset is None:
+            break
+
+    write_index(path, vectors, payloads, ids=ids, collection_name=collection_name, **write_kwargs)
+    return len(ids)
+
+
+class LocalVectorIndex:
+    """
+    Embedded, memory-mapped alternative to the remote Qdrant client.
+
+    Implements the subset of ``AsyncQdrantClient`` that RAGService uses
+    (``query_points``, ``scroll``, ``get_collection``, ``close``). Vectors are mapped
+    read-only, so every uvicorn worker on the host shares the same page-cache
+    pages; search is a single matrix-vector product (cosine, since rows are
+    normalized) plus ``argpartition`` for the top-k.
+
+    If the artifact carries compact codes, the first pass runs on them and
+    only the ``limit * oversampling`` best candidates are rescored with the
+    full float32 rows.
+    """
+
+    def __init__(self, path, oversampling: float = 4.0):
+        self.path = resolve_index(path)
+        self.oversampling = oversampling
+
+        with open(self.path / META_FILE, encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(self.path / PAYLOADS_FILE, encoding="utf-8") as f:
+            records = json.load(f)
+
+        self.count = meta["count"]
+        self.dim = meta["dim"]
+        self.collection_name = meta.get("collection_name", "")
+        self.ingest_version = meta.get("ingest_version")
+        self._ids = [r["id"] for r in records]
+        self._payloads = [r["payload"] for r in records]
+
+        self.vectors = (
+            np.memmap(self.path / VECTORS_FILE, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+            if self.count
+            else np.zeros((0, self.dim), dtype=np.float32)
+        )
+
+        compact = CompactCodec.load(self.path, self.count)
+        self.codec, self.codes = compact if compact else (None, None)
+
+    def search(self, query, limit: int):
+        """
+        Return (row indices, scores) of the ``limit`` best rows, best first.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        limit = min(limit, self.count)
+        if limit <= 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+        if self.codec is None:
+            scores = self.vectors @ query
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+            return top, scores[top]
+
+        # First pass on compact codes, then exact rescoring of the candidates
+        approx = self.codec.scores(self.codes, query)
+        n_candidates = min(self.count, max(limit, int(limit * self.oversampling)))
+        candidates = np.sort(np.argpartition(-approx, n_candidates - 1)[:n_candidates])
+        exact = self.vectors[candidates] @ query
+        best = np.argsort(-exact)[:limit]
+        return candidates[best], exact[best]
+
+    async def query_points(
+        self,
+        collection_name: str,
+        query,
+        limit: int = 10,
+        with_payload=True,
+        with_vectors: bool = False,
+        score_threshold: float = None,
+        **kwargs,
+    ) -> "_QueryResponse":
+        rows, scores = self.search(query, limit)
+        if score_threshold is not None:
+            keep = scores >= score_threshold
+            rows, scores = rows[keep], scores[keep]
+        return _QueryResponse(
+            points=[
+                ScoredPoint(
+                    id=self._ids[row],
+                    version=0,
+                    score=float(score),
+                    payload=_project(self._payloads[row], with_payload),
+                    vector=self.vectors[row].tolist() if with_vectors else None,
+                )
+                for row, score in zip(rows, scores)
+            ]
+        )
+
+    async def scroll(self, collection_name: str, limit: int = 10, offset=None, with_payload=True, **kwargs):
+        start = offset or 0
+        end = min(start + limit, self.count)
+        records = [
+            Record(id=self._ids[row], payload=_project(self._payloads[row], with_payload))
+            for row in range(start, end)
+        ]
+        return records, (end if end < self.count else None)
+
+    async def get_collection(self, collection_name: str):
+        metadata = {"ingest_version": self.ingest_version} if self.ingest_version else None
+        return _CollectionInfo(points_count=self.count, metadata=metadata)
+
+    async def close(self) -> None:
+        pass
+
+
+def _project(payload: Dict, with_payload) -> Optional[Dict]:
+    """
+    Apply a Qdrant-style payload selector (True/False or a list of fields).
+    """
+    if with_payload is True:
+        return payload
+    if not with_payload:
+        return None
+    return {key: payload[key] for key in with_payload if key in payload}
+
+
+class _QueryResponse:
+    def __init__(self, points: List[ScoredPoint]):
+        self.points = points
+
+
+class _CollectionConfig:
+    def __init__(self, metadata: Optional[Dict]):
+        self.metadata = metadata
+
+
+class _CollectionInfo:
+    def __init__(self, points_count: int, metadata: Optional[Dict] = None):
+        self.points_count = points_count
+        self.config = _CollectionConfig(metadata)
@@ -0,0 +1,78 @@
+from typing import Dict, Sequence
+
+from app.models.schemas import Message
+
+# Bump on any change to SYSTEM_PROMPT: it keys provider-side prompt caches
+# and the semantic answer cache namespace.
+PROMPT_VERSION = "lean-v2"
+
+# Provider prompt caching (OpenAI automatic, Anthropic cache_control) only
+# applies to prefixes of at least this many tokens. SYSTEM_PROMPT is ~150
+# tokens, so today neither provider caches it and cached_input_tokens stays
+# at 0; the stable layout only pays off if the static instructions grow.
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# 🔹 Prefijo estático: va SIEMPRE primero y byte a byte igual entre peticiones,
+# para que OpenAI (caché automática por prefijo) y Anthropic (cache_control)
+# lo reutilicen. Nada dinámico (fecha, consulta, contexto) puede ir aquí.
+SYSTEM_PROMPT = """
+Eres un experto en Lean Manufacturing.
+Ingeniero Lean industrial experto.
+Respuestas breves, accionables y útiles en planta.
+Tono directo con ligero humor y se sarcastico , si te preguntan prioriza practica sobre teoria
+
+Formato del mensaje del usuario:
+- Si incluye "Contexto:", usa esas fuentes como base y responde de forma clara,
+  práctica y directa, con ejemplos industriales reales.
+- Si solo incluye "Pregunta:", responde de forma clara, rápida y práctica.
+- "Resumen de la conversación:" y "Conversación reciente:" son el historial de
+  esta sesión: úsalo para entender preguntas de seguimiento, sin repetirlo.
+""".strip()
+
+SUMMARY_SYSTEM_PROMPT = """
+Mantienes el resumen de una conversación sobre Lean Manufacturing.
+Integra los turnos nuevos en el resumen anterior en un solo párrafo breve:
+temas tratados, datos concretos (cifras, máquinas, KPIs) y decisiones.
+Devuelve solo el resumen actualizado.
+""".strip()
+
+
+def _format_turns(messages: Sequence[Message]) -> str:
+    return "\n".join(
+        f"{'Usuario' if m.role == 'user' else 'Asistente'}: {m.content}" for m in messages
+    )
+
+
+def build_user_prompt(
+    query: str,
+    context_blocks: Sequence[Dict],
+    summary: str = "",
+    history: Sequence[Message] = (),
+) -> str:
+    """
+    Dynamic suffix, always after the static system prefix: session summary
+    and recent turns (if any), retrieved context (if any), then the question.
+    """
+    parts = []
+    if summary:
+        parts.append(f"Resumen de la conversación:\n{summary}")
+    if history:
+        parts.append(f"Conversación reciente:\n{_format_turns(history)}")
+    if context_blocks:
+        context_text = "\n\n".join(
+            f"Fuente {i+1}:\n{doc['content']}" for i, doc in enumerate(context_blocks)
+        )
+        parts.append(f"Contexto:\n{context_text}")
+    parts.append(f"Pregunta:\n{query}")
+    return "\n\n".join(parts)
+
+
+def build_summary_prompt(summary: str, turns: Sequence[Message]) -> str:
+    """
+    Incremental fold: only the previous summary and the turns leaving the
+    verbatim window are sent, never the whole history.
+    """
+    return (
+        f"Resumen anterior:\n{summary or '(vacío)'}\n\n"
+        f"Turnos nuevos:\n{_format_turns(turns)}"
+    )
@@ -0,0 +1,142 @@
+from pathlib import Path
+from typing import Optional
+import json
+
+import numpy as np
+
+CODES_FILE = "codes.bin"
+CODEC_FILE = "codec.npz"
+CODEC_META_FILE = "codec.json"
+
+# Filas por bloque en el scoring (limita la memoria temporal por consulta)
+_BLOCK_ROWS = 8192
+
+
+class CompactCodec:
+    """
+    Compact first-pass representation of normalized embeddings.
+
+    - optional PCA to ``pca_dim`` dimensions (fitted on the corpus)
+    - ``int8``: symmetric per-dimension scalar quantization (1 byte / dim)
+    - ``binary``: sign bits packed 8 per byte (1 bit / dim), Hamming scoring
+
+    Codes only rank candidates; callers rescore the top ones with the full
+    float32 vectors.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        mean: Optional[np.ndarray] = None,
+        components: Optional[np.ndarray] = None,
+        scale: Optional[np.ndarray] = None,
+    ):
+        if method not in ("int8", "binary"):
+            raise ValueError(f"Unknown quantization method: {method}")
+        self.method = method
+        self.mean = mean
+        self.components = components  # (dim, pca_dim)
+        self.scale = scale  # int8 only: float value of one quantization step
+
+    @property
+    def dim(self) -> Optional[int]:
+        return None if self.components is None else self.components.shape[1]
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, method: str, pca_dim: int = 0) -> "CompactCodec":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        mean = components = scale = None
+
+        if pca_dim and pca_dim < vectors.shape[1]:
+            mean = vectors.mean(axis=0)
+            # Right singular vectors = principal axes
+            _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+            components = np.ascontiguousarray(vt[:pca_dim].T, dtype=np.float32)
+
+        codec = cls(method, mean, components)
+        if method == "int8":
+            projected = codec.project(vectors)
+            max_abs = np.abs(projected).max(axis=0)
+            codec.scale = np.where(max_abs == 0, 1, max_abs / 127).astype(np.float32)
+        return codec
+
+    def project(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.components is None:
+            return vectors
+        return (vectors - self.mean) @ self.components
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        projected = self.project(np.atleast_2d(vectors))
+        if self.method == "int8":
+            return np.clip(np.rint(projected / self.scale), -127, 127).astype(np.int8)
+        return np.packbits(projected > 0, axis=1)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """
+        Approximate similarity of every code row to the query (higher = closer).
+        """
+        projected = self.project(query[None, :])[0]
+        out = np.empty(len(codes), dtype=np.float32)
+
+        if self.method == "int8":
+            weights = projected * self.scale
+            for start in range(0, len(codes), _BLOCK_ROWS):
+                block = codes[start:start + _BLOCK_ROWS]
+                out[start:start + len(block)] = block.astype(np.float32) @ weights
+        else:
+            query_bits = np.packbits(projected > 0)
+            for start in range(0, len(codes), _BLOCK_ROWS):
+                block = codes[start:start + _BLOCK_ROWS]
+                out[start:start + len(block)] = -_popcount(block ^ query_bits).sum(axis=1, dtype=np.int32)
+        return out
+
+    def bytes_per_vector(self, dim: int) -> int:
+        dim = self.dim or dim
+        return dim if self.method == "int8" else (dim + 7) // 8
+
+    def save(self, path: Path, codes: np.ndarray) -> None:
+        path = Path(path)
+        tmp = path / (CODES_FILE + ".tmp")
+        np.ascontiguousarray(codes).tofile(tmp)
+        tmp.replace(path / CODES_FILE)
+
+        arrays = {
+            name: value
+            for name, value in (("mean", self.mean), ("components", self.components), ("scale", self.scale))
+            if value is not None
+        }
+        np.savez(path / CODEC_FILE, **arrays)
+        with open(path / CODEC_META_FILE, "w", encoding="utf-8") as f:
+            json.dump({"method": self.method, "code_width": int(codes.shape[1])}, f)
+
+    @classmethod
+    def load(cls, path: Path, count: int):
+        """
+        Return (codec, memory-mapped codes), or None if the artifact has no codes.
+        """
+        path = Path(path)
+        if not (path / CODEC_META_FILE).exists():
+            return None
+
+        with open(path / CODEC_META_FILE, encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(path / CODEC_FILE) as arrays:
+            codec = cls(meta["method"], **{name: arrays[name] for name in arrays.files})
+
+        dtype = np.int8 if codec.method == "int8" else np.uint8
+        codes = (
+            np.memmap(path / CODES_FILE, dtype=dtype, mode="r", shape=(count, meta["code_width"]))
+            if count
+            else np.zeros((0, meta["code_width"]), dtype=dtype)
+        )
+        return codec, codes
+
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    return _POPCOUNT_TABLE[x]
+
+
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
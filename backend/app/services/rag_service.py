@@ -1,12 +1,107 @@
-from typing import List, Dict
+from typing import AsyncIterator, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
 import os
+import time
 
-from sentence_transformers import SentenceTransformer
-from qdrant_client import QdrantClient
-from qdrant_client.models import Filter
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import QuantizationSearchParams, SearchParams
 
 from app.core.config import settings
+from app.core.metrics import cache_result, observe_stage, stage_timer
+from app.models.schemas import CHUNK_RETRIEVAL_FIELDS, Conversation, DocumentChunk
 from app.services.llm_service import LLMService
+from app.services.embedder import create_embedder
+from app.services.context_builder import (
+    build_context,
+    context_tokens,
+    estimate_tokens,
+    filter_by_score,
+)
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache
+from app.services.prompts import PROMPT_VERSION, SYSTEM_PROMPT, build_user_prompt
+from app.services.admission import create_admission_controller
+from app.services.semantic_cache import create_semantic_cache
+from app.services.session_memory import create_session_memory
+from app.services.single_flight import SingleFlight
+from app.services.local_index import LocalVectorIndex
+from app.services.lexical_index import LexicalIndex, query_terms, reciprocal_rank_fusion
+from app.utils.text import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Quantized Qdrant collections: search on codes, rescore with full vectors
+_SEARCH_PARAMS = (
+    SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=True, oversampling=settings.VECTOR_RESCORE_OVERSAMPLING
+        )
+    )
+    if settings.VECTOR_QUANTIZATION != "none"
+    else None
+)
+
+
+def create_vector_client():
+    """
+    Remote Qdrant or the embedded memory-mapped index, per VECTOR_BACKEND.
+    """
+    if settings.VECTOR_BACKEND == "local":
+        return LocalVectorIndex(
+            settings.LOCAL_INDEX_PATH,
+            oversampling=settings.VECTOR_RESCORE_OVERSAMPLING,
+        )
+    if settings.VECTOR_BACKEND == "qdrant":
+        return AsyncQdrantClient(
+            url=os.getenv("QDRANT_URL"),
+            api_key=os.getenv("QDRANT_API_KEY")
+        )
+    raise ValueError(f"Unknown vector backend: {settings.VECTOR_BACKEND}")
+
+
+def _load_embedder():
+    """
+    Load the configured embedder (heavy import, done lazily).
+    """
+    return create_embedder(
+        settings.EMBEDDING_BACKEND,
+        settings.EMBEDDING_MODEL,
+        onnx_path=settings.EMBEDDING_ONNX_PATH,
+        onnx_quantized=settings.EMBEDDING_ONNX_QUANTIZED,
+        onnx_threads=settings.EMBEDDING_ONNX_THREADS,
+    )
+
+
+class _PathStats:
+    """
+    Latency / hit-rate counters for one retrieval path (also exported as
+    the ``<path>_search`` stage histogram).
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.searches = 0
+        self.hits = 0
+        self.fast_path = 0
+        self.total_ms = 0.0
+
+    def record(self, start: float, hit: bool) -> None:
+        elapsed = time.perf_counter() - start
+        self.searches += 1
+        self.hits += hit
+        self.total_ms += elapsed * 1000
+        observe_stage(self.stage, elapsed)
+
+    def as_dict(self) -> Dict:
+        return {
+            "searches": self.searches,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.searches, 4) if self.searches else 0.0,
+            "fast_path": self.fast_path,
+            "avg_latency_ms": round(self.total_ms / self.searches, 3) if self.searches else 0.0,
+        }
 
 
 class RAGService:
@@ -14,118 +109,553 @@ class RAGService:
     Retrieval-Augmented Generation service optimized for low latency.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        embedder=None,
+        qdrant=None,
+        llm_service=None,
+        semantic_cache=None,
+        session_memory=None,
+        admission=None,
+    ):
         # 🔹 LLM service
-        self.llm_service = LLMService()
+        self.llm_service = llm_service or LLMService()
 
-        # 🔹 Load embeddings ONCE (critical for speed)
-        self.embedder = SentenceTransformer(
-            "sentence-transformers/all-MiniLM-L6-v2"
+        # 🔹 Embeddings: loaded ONCE, on first use (critical for speed)
+        self._embedder = embedder
+
+        # 🔹 Bounded executor for CPU-bound encode() (keeps the event loop free)
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.EMBEDDING_EXECUTOR_THREADS,
+            thread_name_prefix="embedder",
         )
 
-        # 🔹 Persistent Qdrant client
-        self.qdrant = QdrantClient(
-            url=os.getenv("QDRANT_URL"),
-            api_key=os.getenv("QDRANT_API_KEY")
+        # 🔹 Micro-batching: concurrent queries share one encode(batch) call
+        self._batcher = EmbeddingBatcher(
+            encode=lambda texts: self.embedder.encode(texts),
+            executor=self._executor,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+            max_in_flight=settings.EMBEDDING_EXECUTOR_THREADS,
         )
 
-    async def retrieve_context(self, query: str, k: int = None) -> List[Dict]:
+        # 🔹 Repeated questions skip the forward pass entirely
+        self.embedding_cache = EmbeddingCache(
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+            ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
+        )
+
+        # 🔹 Persistent async Qdrant client (or local memmap index)
+        self.qdrant = qdrant or create_vector_client()
+
+        # 🔹 Semantic answer cache (skips search + LLM for near-duplicate questions)
+        self.semantic_cache = semantic_cache or create_semantic_cache(settings)
+        self._cache_checked_at = float("-inf")
+
+        # 🔹 Admission control: bounded LLM concurrency, fast 429/503 instead of late timeouts
+        self.admission = admission or create_admission_controller(settings)
+
+        # 🔹 Per-session history: recent turns verbatim + rolling summary
+        # (summary folds take low-priority admission slots)
+        self.session_memory = session_memory or create_session_memory(
+            settings, self.llm_service, self.admission
+        )
+
+        # 🔹 Identical in-flight questions await one shared answer
+        self.single_flight = SingleFlight() if settings.SINGLE_FLIGHT_ENABLED else None
+
+        # 🔹 BM25 index, built at startup from the same chunks (build_lexical_index)
+        self.lexical_index: LexicalIndex | None = None
+        self.retrieval_stats = {
+            "lexical": _PathStats("lexical_search"),
+            "dense": _PathStats("dense_search"),
+        }
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = _load_embedder()
+        return self._embedder
+
+    async def embed_query(self, query: str) -> List[float]:
+        """
+        Encode a query on the dedicated executor (micro-batched, cached).
+        """
+        key = normalize_query(query)
+        vector = self.embedding_cache.get(key)
+        cache_result("embedding", vector is not None)
+        if vector is None:
+            with stage_timer("embed"):
+                vector = self.embedding_cache.put(key, await self._batcher.embed(query))
+        return vector.tolist()
+
+    def _lexical_pass(self, query: str, k: int) -> Tuple[List, Dict, bool]:
+        """
+        BM25 pass: (ranked ids, payloads by id, confident). ``confident`` means
+        the lexical fast path can answer without embedding the query.
+        """
+        if self.lexical_index is None:
+            return [], {}, False
+
+        start = time.perf_counter()
+        hits, confidence = self.lexical_index.search(query, k)
+        self.retrieval_stats["lexical"].record(start, bool(hits))
+
+        ids = [self.lexical_index.ids[row] for row, _ in hits]
+        payloads = {self.lexical_index.ids[row]: self.lexical_index.payloads[row] for row, _ in hits}
+        confident = bool(
+            hits
+            and confidence >= settings.LEXICAL_FAST_PATH_MIN_CONFIDENCE
+            and len(query_terms(query)) <= settings.LEXICAL_FAST_PATH_MAX_TERMS
+        )
+        return ids, payloads, confident
+
+    async def retrieve_context(
+        self,
+        query: str,
+        k: int = None,
+        query_vector: List[float] = None,
+        lexical: Tuple[List, Dict, bool] = None,
+    ) -> List[Dict]:
         """
-        Retrieve relevant context from Qdrant vector DB.
+        Retrieve relevant context: BM25 + dense search fused with RRF.
+
+        A confident lexical hit on a short query ("SMED", "Heijunka")
+        returns straight away, without embedding the query. ``lexical``
+        reuses a BM25 pass the caller already ran.
         """
         if k is None:
             k = settings.RAG_TOP_K
 
-        # 🔹 Embed query
-        query_vector = self.embedder.encode(query).tolist()
+        # 🔹 Lexical (BM25) pass: cheap, exact Lean terms and acronyms
+        if lexical is None:
+            lexical = self._lexical_pass(query, k)
+        lexical_ids, lexical_payloads, confident = lexical
+        if confident:
+            self.retrieval_stats["lexical"].fast_path += 1
+            return [self._format_doc(lexical_payloads[i]) for i in lexical_ids]
 
-        # 🔹 Vector search
-        results = self.qdrant.search(
+        # 🔹 Embed query (off the event loop)
+        if query_vector is None:
+            query_vector = await self.embed_query(query)
+
+        # 🔹 Vector search (async client)
+        start = time.perf_counter()
+        response = await self.qdrant.query_points(
             collection_name=settings.QDRANT_COLLECTION_NAME,
-            query_vector=query_vector,
-            limit=k
+            query=query_vector,
+            limit=k,
+            search_params=_SEARCH_PARAMS,
+            with_payload=CHUNK_RETRIEVAL_FIELDS,  # projected payload, not the full chunk record
+            with_vectors=True,  # reused for MMR in context assembly
+            score_threshold=settings.RAG_MIN_SIMILARITY,
         )
+        results = response.points
+        self.retrieval_stats["dense"].record(start, bool(results))
 
-        # 🔹 Format docs
-        docs = []
-        for r in results:
-            payload = r.payload or {}
-            docs.append({
-                "content": payload.get("content", ""),
-                "metadata": payload.get("metadata", {})
-            })
+        if not lexical_ids:
+            return [self._format_doc(r.payload, r.score, r.vector) for r in results]
 
-        return docs
+        # 🔹 Hybrid: reciprocal rank fusion of dense + lexical rankings
+        dense = {r.id: r for r in results}
+        fused = reciprocal_rank_fusion(
+            [[r.id for r in results], lexical_ids], k=settings.RRF_K, limit=k
+        )
+        return [
+            self._format_doc(dense[i].payload, dense[i].score, dense[i].vector)
+            if i in dense
+            else self._format_doc(lexical_payloads[i])
+            for i in fused
+        ]
 
-    async def answer_with_context(self, query: str) -> Dict:
+    @staticmethod
+    def _format_doc(payload: Dict, score: float = None, vector=None) -> Dict:
         """
-        Generate Lean expert answer using retrieved context.
+        DocumentChunk payload -> internal doc used for context assembly.
         """
+        payload = payload or {}
+        text = payload.get("text", "")
+        return {
+            "content": text,
+            "metadata": {
+                "source": payload.get("source"),
+                "chunk_index": payload.get("chunk_index"),
+            },
+            "snippet": payload.get("snippet") or DocumentChunk.make_snippet(text),
+            "score": score,
+            "vector": vector,
+        }
 
-        context_docs = await self.retrieve_context(query)
+    async def build_lexical_index(self) -> int:
+        """
+        Build the BM25 index from the chunks stored in the vector backend.
+        """
+        if not settings.LEXICAL_ENABLED:
+            return 0
 
-        if context_docs:
-            context_text = "\n\n".join(
-                [f"Fuente {i+1}:\n{doc['content']}" for i, doc in enumerate(context_docs)]
+        records = []
+        offset = None
+        while True:
+            points, offset = await self.qdrant.scroll(
+                collection_name=settings.QDRANT_COLLECTION_NAME,
+                limit=512,
+                offset=offset,
+                with_payload=CHUNK_RETRIEVAL_FIELDS,
+                with_vectors=False,
             )
+            for point in points:
+                payload = point.payload or {}
+                records.append((point.id, payload, payload.get("text", "")))
+            if offset is None:
+                break
 
-            prompt = f"""
-Eres un experto en Lean Manufacturing.
+        self.lexical_index = LexicalIndex.build(records)
+        return len(records)
 
-Contexto:
-{context_text}
+    def get_retrieval_stats(self) -> Dict:
+        return {
+            "lexical_index_size": len(self.lexical_index) if self.lexical_index else 0,
+            **{path: stats.as_dict() for path, stats in self.retrieval_stats.items()},
+        }
 
-Pregunta:
-{query}
+    async def _prepare_answer(self, query: str, conversation: Conversation = None) -> Dict:
+        """
+        Semantic-cache lookup, retrieval and prompt assembly shared by the
+        blocking and streaming chat paths. Returns {"cached": response} on a
+        cache hit, else the prompt, sources and retrieval metadata.
+
+        With session history the semantic cache is bypassed (a follow-up
+        only makes sense in its conversation) and retrieval also uses the
+        previous question.
 
-Responde de forma clara, práctica y directa, con ejemplos industriales reales.
-"""
+        The BM25 pass runs first: a confident lexical hit never embeds the
+        query, so its answer is cached under the normalized question text
+        instead of the query vector.
+        """
+
+        query_vector = None
+        exact_key = None
+        retrieval_query = query
+        if conversation is not None:
+            previous = [m.content for m in conversation.messages if m.role == "user"]
+            if previous:
+                retrieval_query = f"{previous[-1]} {query}"
+
+        lexical = self._lexical_pass(retrieval_query, settings.RAG_TOP_K)
+        cacheable = conversation is None and self.semantic_cache is not None
+
+        # 🔹 Semantic cache: a close enough earlier question reuses its answer
+        # (fast-path questions: same normalized text, no embedding needed)
+        if cacheable:
+            if lexical[2]:
+                exact_key = normalize_query(query)
+            else:
+                query_vector = await self.embed_query(query)
+            with stage_timer("semantic_cache"):
+                await self._refresh_cache_namespace()
+                cached = await (
+                    self.semantic_cache.lookup_exact(exact_key)
+                    if exact_key is not None
+                    else self.semantic_cache.lookup(query_vector)
+                )
+            cache_result("semantic", cached is not None)
+            if cached is not None:
+                response, similarity = cached
+                return {"cached": {**response, "cache": {"hit": True, "similarity": round(similarity, 4)}}}
+
+        retrieved = await self.retrieve_context(retrieval_query, query_vector=query_vector, lexical=lexical)
+        context_start = time.perf_counter()
+
+        # 🔹 Adaptive k: drop low-score / past-the-elbow chunks
+        context_docs = filter_by_score(
+            retrieved,
+            min_score=settings.RAG_MIN_SIMILARITY,
+            relative_cutoff=settings.RAG_RELATIVE_CUTOFF,
+            max_gap=settings.RAG_MAX_SCORE_GAP,
+        )
+        retrieval = {
+            "k": len(context_docs),
+            "k_max": settings.RAG_TOP_K,
+            "scores": [
+                round(d["score"], 4) if d.get("score") is not None else None
+                for d in context_docs
+            ],
+        }
+
+        # 🔹 Context assembly: MMR de-dup, merge adjacent chunks, token budget
+        context_blocks = build_context(
+            context_docs,
+            token_budget=settings.RAG_CONTEXT_TOKEN_BUDGET,
+            max_overlap=settings.RAG_CHUNK_OVERLAP,
+            lambda_mult=settings.RAG_MMR_LAMBDA,
+            duplicate_threshold=settings.RAG_MMR_DUPLICATE_THRESHOLD,
+        )
+
+        # 🔹 Static versioned system prefix first (provider prompt caching),
+        # dynamic context + question last
+        system_prompt = SYSTEM_PROMPT
+        if conversation is not None:
+            prompt = build_user_prompt(
+                query,
+                context_blocks,
+                summary=conversation.summary,
+                history=self.session_memory.recent(conversation),
+            )
         else:
-            prompt = f"""
-Eres un experto en Lean Manufacturing.
-Responde de forma clara, rápida y práctica:
-
-{query}
-"""
-
-        system_prompt = """
-Ingeniero Lean industrial experto.
-Respuestas breves, accionables y útiles en planta.
-Tono directo con ligero humor y se sarcastico , si te preguntan prioriza practica sobre teoria 
-"""
-
-        answer = await self.llm_service.generate(
-            prompt=prompt,
-            system_prompt=system_prompt
+            prompt = build_user_prompt(query, context_blocks)
+
+        logger.info(
+            "prompt_version=%s prompt_tokens=%d context_tokens=%d raw_context_tokens=%d blocks=%d chunks=%d",
+            PROMPT_VERSION,
+            estimate_tokens(system_prompt + prompt),
+            context_tokens(context_blocks),
+            context_tokens(context_docs),
+            len(context_blocks),
+            len(context_docs),
         )
 
         sources = [
             {
-                "content": doc.get("content", "")[:200] + "...",
+                "content": doc["snippet"],
                 "metadata": doc.get("metadata", {})
             }
-            for doc in context_docs
+            for doc in context_blocks
         ]
 
+        observe_stage("context_build", time.perf_counter() - context_start)
+
         return {
+            "cached": None,
+            "cacheable": cacheable,
+            "query_vector": query_vector,
+            "exact_key": exact_key,
+            "prompt": prompt,
+            "system_prompt": system_prompt,
+            "sources": sources,
+            "retrieval": retrieval,
+        }
+
+    async def answer_with_context(self, query: str, session_id: str = None) -> Dict:
+        """
+        Generate Lean expert answer using retrieved context.
+
+        Concurrent calls for the same normalized question (and retrieval
+        settings) share one embed + search + LLM call, unless the session
+        already has history.
+
+        Raises ``Overloaded`` when the LLM cannot be reached, or cannot
+        finish, before the request deadline (CHAT_DEADLINE_SECONDS).
+        """
+
+        deadline = asyncio.get_running_loop().time() + settings.CHAT_DEADLINE_SECONDS
+        conversation = await self._load_session(session_id)
+
+        if conversation is not None or self.single_flight is None:
+            response = await self._answer(query, deadline, conversation)
+        else:
+            response = await self.single_flight.do(
+                self._answer_key(query), lambda: self._answer(query, deadline)
+            )
+            # Each caller gets its own top-level dict (routes pop "cache")
+            response = dict(response)
+
+        await self._remember(session_id, query, response["answer"])
+        return response
+
+    async def _load_session(self, session_id: str = None):
+        """
+        The session's Conversation if it has any history, else None.
+        """
+        if self.session_memory is None or not session_id:
+            return None
+        conversation = await self.session_memory.load(session_id)
+        if conversation.messages or conversation.summary:
+            return conversation
+        return None
+
+    async def _remember(self, session_id: str, query: str, answer: str) -> None:
+        if (
+            self.session_memory is not None
+            and session_id
+            and answer not in (LLMService.TIMEOUT_MESSAGE, LLMService.ERROR_MESSAGE)
+        ):
+            await self.session_memory.remember(session_id, query, answer)
+
+    @staticmethod
+    def _answer_key(query: str) -> tuple:
+        return (
+            normalize_query(query),
+            settings.QDRANT_COLLECTION_NAME,
+            settings.RAG_TOP_K,
+            settings.RAG_MIN_SIMILARITY,
+            settings.RAG_CONTEXT_TOKEN_BUDGET,
+        )
+
+    async def _answer(self, query: str, deadline: float, conversation: Conversation = None) -> Dict:
+        with stage_timer("total"):
+            prepared = await self._prepare_answer(query, conversation)
+            if prepared["cached"] is not None:
+                return prepared["cached"]
+
+            async with self.admission.slot(deadline):
+                with stage_timer("llm"):
+                    answer = await self.llm_service.generate(
+                        prompt=prepared["prompt"],
+                        system_prompt=prepared["system_prompt"],
+                        timeout=deadline - asyncio.get_running_loop().time(),
+                    )
+                if answer == LLMService.TIMEOUT_MESSAGE:
+                    raise self.admission.timed_out()
+
+        response = {
             "answer": answer,
-            "sources": sources
+            "sources": prepared["sources"],
+            "retrieval": prepared["retrieval"],
+        }
+        if prepared["cacheable"]:
+            await self._store_answer(prepared, response)
+
+        return {**response, "cache": {"hit": False}}
+
+    async def stream_answer(self, query: str, session_id: str = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Streaming variant of ``answer_with_context``. Yields (event, data):
+
+          sources  {"sources", "retrieval", "cache"}  as soon as retrieval is done
+          token    {"text"}                           one per LLM delta
+          done     {"ttft_ms", "total_ms", "cache"}
+
+        Time-to-first-token and total latency are measured from the request.
+        Admission ``Overloaded`` is raised before the first event, so callers
+        can still answer 429/503; an LLM that runs out of the deadline
+        mid-stream raises it after ``sources`` (the route sends it in-band).
+        """
+
+        start = time.perf_counter()
+        deadline = asyncio.get_running_loop().time() + settings.CHAT_DEADLINE_SECONDS
+        conversation = await self._load_session(session_id)
+        prepared = await self._prepare_answer(query, conversation)
+        cached = prepared["cached"]
+
+        if cached is not None:
+            yield "sources", {
+                "sources": cached["sources"],
+                "retrieval": cached["retrieval"],
+                "cache": cached["cache"],
+            }
+            ttft = time.perf_counter() - start
+            yield "token", {"text": cached["answer"]}
+            await self._remember(session_id, query, cached["answer"])
+            yield "done", self._stream_timings(start, ttft, cached["cache"])
+            return
+
+        async with self.admission.slot(deadline):
+            yield "sources", {
+                "sources": prepared["sources"],
+                "retrieval": prepared["retrieval"],
+                "cache": {"hit": False},
+            }
+
+            parts: List[str] = []
+            ttft = None
+            failed = False
+            llm_start = time.perf_counter()
+            async for delta in self.llm_service.stream(
+                prompt=prepared["prompt"],
+                system_prompt=prepared["system_prompt"],
+                timeout=deadline - asyncio.get_running_loop().time(),
+            ):
+                if delta == LLMService.TIMEOUT_MESSAGE:
+                    raise self.admission.timed_out()
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                failed = failed or delta in (LLMService.TIMEOUT_MESSAGE, LLMService.ERROR_MESSAGE)
+                parts.append(delta)
+                yield "token", {"text": delta}
+            observe_stage("llm", time.perf_counter() - llm_start)
+
+        if not failed:
+            answer = "".join(parts)
+            if prepared["cacheable"]:
+                await self._store_answer(prepared, {
+                    "answer": answer,
+                    "sources": prepared["sources"],
+                    "retrieval": prepared["retrieval"],
+                })
+            await self._remember(session_id, query, answer)
+
+        yield "done", self._stream_timings(start, ttft, {"hit": False})
+
+    @staticmethod
+    def _stream_timings(start: float, ttft, cache: Dict) -> Dict:
+        total = time.perf_counter() - start
+        ttft = total if ttft is None else ttft
+        observe_stage("first_token", ttft)
+        observe_stage("total", total)
+        logger.info("chat_stream ttft_ms=%.1f total_ms=%.1f cache_hit=%s", ttft * 1000, total * 1000, cache.get("hit"))
+        return {
+            "ttft_ms": round(ttft * 1000, 1),
+            "total_ms": round(total * 1000, 1),
+            "cache": cache,
         }
 
+    async def _store_answer(self, prepared: Dict, response: Dict) -> None:
+        if self.semantic_cache is None or response["answer"] in (
+            LLMService.TIMEOUT_MESSAGE, LLMService.ERROR_MESSAGE
+        ):
+            return
+        if prepared["exact_key"] is not None:
+            await self.semantic_cache.store_exact(prepared["exact_key"], response)
+        else:
+            await self.semantic_cache.store(prepared["query_vector"], response)
+
+    async def _refresh_cache_namespace(self) -> None:
+        """
+        Key the semantic cache on the ingest version (content hash written by
+        scripts/ingest_documents.py) and prompt version, so re-ingesting edited
+        documents or changing the prompt invalidates earlier answers.
+        Collections ingested without a version fall back to the point count.
+        """
+        now = time.monotonic()
+        if now - self._cache_checked_at < settings.SEMANTIC_CACHE_REFRESH_SECONDS:
+            return
+        self._cache_checked_at = now
+
+        stats = await self.get_knowledge_stats()
+        version = stats["ingest_version"] or f"points-{stats['total_points']}"
+        self.semantic_cache.set_namespace(f"{stats['collection_name']}:{version}:{PROMPT_VERSION}")
+
     async def get_knowledge_stats(self) -> Dict:
         """
         Basic stats from Qdrant.
         """
         try:
-            info = self.qdrant.get_collection(settings.QDRANT_COLLECTION_NAME)
+            info = await self.qdrant.get_collection(settings.QDRANT_COLLECTION_NAME)
+            config = getattr(info, "config", None)
+            metadata = getattr(config, "metadata", None) or {}
             return {
                 "total_points": info.points_count,
                 "collection_name": settings.QDRANT_COLLECTION_NAME,
+                "ingest_version": metadata.get("ingest_version"),
                 "status": "ready"
             }
         except Exception:
             return {
                 "total_points": 0,
                 "collection_name": settings.QDRANT_COLLECTION_NAME,
+                "ingest_version": None,
                 "status": "collection not found"
             }
+
+    async def close(self) -> None:
+        """
+        Release the executor and the Qdrant/Redis connections.
+        """
+        await self._batcher.close()
+        self._executor.shutdown(wait=False)
+        await self.qdrant.close()
+        if self.semantic_cache is not None:
+            await self.semantic_cache.close()
+        if self.session_memory is not None:
+            await self.session_memory.close()
@@ -0,0 +1,335 @@
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryCacheBackend:
+    """
+    Process-local stand-in for Redis (tests, single-worker deployments).
+    """
+
+    def __init__(self):
+        self._seq: Dict[str, int] = {}
+        self._entries: Dict[str, Dict[int, Tuple[bytes, str, float]]] = {}
+        self._exact: Dict[str, Dict[str, Tuple[str, float]]] = {}
+
+    async def add(self, namespace: str, vector: bytes, payload: str, ttl: int, max_entries: int) -> int:
+        seq = self._seq.get(namespace, 0) + 1
+        self._seq[namespace] = seq
+        entries = self._entries.setdefault(namespace, {})
+        entries[seq] = (vector, payload, time.monotonic() + ttl if ttl else float("inf"))
+        while len(entries) > max_entries:
+            del entries[min(entries)]
+        return seq
+
+    async def since(self, namespace: str, seq: int) -> List[Tuple[int, bytes]]:
+        now = time.monotonic()
+        return [
+            (entry_id, vector)
+            for entry_id, (vector, _, expires) in sorted(self._entries.get(namespace, {}).items())
+            if entry_id > seq and expires > now
+        ]
+
+    async def get(self, namespace: str, entry_id: int) -> Optional[str]:
+        entry = self._entries.get(namespace, {}).get(entry_id)
+        if entry is None or entry[2] <= time.monotonic():
+            return None
+        return entry[1]
+
+    async def get_exact(self, namespace: str, key: str) -> Optional[str]:
+        entry = self._exact.get(namespace, {}).get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    async def set_exact(self, namespace: str, key: str, payload: str, ttl: int) -> None:
+        self._exact.setdefault(namespace, {})[key] = (
+            payload, time.monotonic() + ttl if ttl else float("inf")
+        )
+
+    async def clear(self, namespace: str) -> None:
+        self._entries.pop(namespace, None)
+        self._exact.pop(namespace, None)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisCacheBackend:
+    """
+    Redis layout per namespace:
+      {prefix}:{ns}:seq          INCR counter (entry ids)
+      {prefix}:{ns}:index        ZSET of entry ids (score = id), oldest evicted first
+      {prefix}:{ns}:entry:{id}   HASH {vector: float32 bytes, payload: json}, with TTL
+      {prefix}:{ns}:exact:{sha1} STRING payload json for an exact query key, with TTL
+    """
+
+    def __init__(self, client, prefix: str = "lean:semcache"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, namespace: str, *parts) -> str:
+        return ":".join([self.prefix, namespace, *map(str, parts)])
+
+    async def add(self, namespace: str, vector: bytes, payload: str, ttl: int, max_entries: int) -> int:
+        index = self._key(namespace, "index")
+        seq = await self.client.incr(self._key(namespace, "seq"))
+        entry = self._key(namespace, "entry", seq)
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hset(entry, mapping={"vector": vector, "payload": payload})
+            pipe.zadd(index, {seq: seq})
+            if ttl:
+                pipe.expire(entry, ttl)
+                pipe.expire(index, ttl)
+                pipe.expire(self._key(namespace, "seq"), ttl)
+            pipe.zcard(index)
+            size = (await pipe.execute())[-1]
+
+        if size > max_entries:
+            evicted = await self.client.zpopmin(index, size - max_entries)
+            if evicted:
+                await self.client.delete(
+                    *(self._key(namespace, "entry", int(member)) for member, _ in evicted)
+                )
+        return seq
+
+    async def since(self, namespace: str, seq: int) -> List[Tuple[int, bytes]]:
+        index = self._key(namespace, "index")
+        ids = [int(i) for i in await self.client.zrangebyscore(index, f"({seq}", "+inf")]
+        if not ids:
+            return []
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            for entry_id in ids:
+                pipe.hget(self._key(namespace, "entry", entry_id), "vector")
+            vectors = await pipe.execute()
+
+        expired = [entry_id for entry_id, vector in zip(ids, vectors) if vector is None]
+        if expired:
+            await self.client.zrem(index, *expired)
+        return [(entry_id, vector) for entry_id, vector in zip(ids, vectors) if vector is not None]
+
+    async def get(self, namespace: str, entry_id: int) -> Optional[str]:
+        payload = await self.client.hget(self._key(namespace, "entry", entry_id), "payload")
+        if isinstance(payload, bytes):
+            payload = payload.decode()
+        return payload
+
+    async def get_exact(self, namespace: str, key: str) -> Optional[str]:
+        payload = await self.client.get(self._exact_key(namespace, key))
+        if isinstance(payload, bytes):
+            payload = payload.decode()
+        return payload
+
+    async def set_exact(self, namespace: str, key: str, payload: str, ttl: int) -> None:
+        await self.client.set(self._exact_key(namespace, key), payload, ex=ttl or None)
+
+    def _exact_key(self, namespace: str, key: str) -> str:
+        return self._key(namespace, "exact", hashlib.sha1(key.encode()).hexdigest())
+
+    async def clear(self, namespace: str) -> None:
+        keys = [key async for key in self.client.scan_iter(match=self._key(namespace, "*"))]
+        if keys:
+            await self.client.delete(*keys)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by query embedding.
+
+    A lookup returns a stored answer when its query vector is within
+    ``threshold`` cosine similarity of the new one. Each worker mirrors the
+    namespace's vectors locally and pulls only entries added since its last
+    sync, so a lookup is one small backend round trip plus a dot product.
+    Backend errors fail open (treated as a miss).
+
+    Questions answered without an embedding (lexical fast path) are cached
+    under their normalized text instead (``lookup_exact`` / ``store_exact``);
+    those entries expire by TTL only.
+    """
+
+    def __init__(
+        self,
+        backend,
+        threshold: float = 0.92,
+        ttl_seconds: int = 86400,
+        max_entries: int = 1000,
+    ):
+        self.backend = backend
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.namespace = "default"
+        self._ids: List[int] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._last_seq = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def set_namespace(self, namespace: str) -> None:
+        """
+        Switch namespace (e.g. the Qdrant collection changed); drops the local mirror.
+        """
+        if namespace != self.namespace:
+            self.namespace = namespace
+            self._reset_mirror()
+
+    async def invalidate(self) -> None:
+        await self.backend.clear(self.namespace)
+        self._reset_mirror()
+
+    async def lookup(self, vector) -> Optional[Tuple[Dict, float]]:
+        """
+        Return (cached response, similarity) or None.
+        """
+        try:
+            await self._sync()
+            if not self._ids:
+                self.misses += 1
+                return None
+
+            query = _unit(vector)
+            similarities = self._vectors @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+
+            if similarity >= self.threshold:
+                payload = await self.backend.get(self.namespace, self._ids[best])
+                if payload is not None:
+                    self.hits += 1
+                    return json.loads(payload), similarity
+                # Expired or evicted by another worker
+                self._drop(best)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Semantic cache lookup failed: %s", e)
+
+        self.misses += 1
+        return None
+
+    async def store(self, vector, response: Dict) -> None:
+        try:
+            await self.backend.add(
+                self.namespace,
+                _unit(vector).tobytes(),
+                json.dumps(response, ensure_ascii=False),
+                self.ttl_seconds,
+                self.max_entries,
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Semantic cache store failed: %s", e)
+
+    async def lookup_exact(self, key: str) -> Optional[Tuple[Dict, float]]:
+        """
+        Return (cached response, 1.0) for an exact query key, or None.
+        """
+        try:
+            payload = await self.backend.get_exact(self.namespace, key)
+            if payload is not None:
+                self.hits += 1
+                return json.loads(payload), 1.0
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Semantic cache exact lookup failed: %s", e)
+
+        self.misses += 1
+        return None
+
+    async def store_exact(self, key: str, response: Dict) -> None:
+        try:
+            await self.backend.set_exact(
+                self.namespace, key, json.dumps(response, ensure_ascii=False), self.ttl_seconds
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Semantic cache exact store failed: %s", e)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "entries": len(self._ids),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    async def _sync(self) -> None:
+        new = await self.backend.since(self.namespace, self._last_seq)
+        if not new:
+            return
+
+        ids = [entry_id for entry_id, _ in new]
+        vectors = np.stack([np.frombuffer(v, dtype=np.float32) for _, v in new])
+        self._ids.extend(ids)
+        self._vectors = vectors if self._vectors is None else np.vstack([self._vectors, vectors])
+        self._last_seq = ids[-1]
+
+        if len(self._ids) > self.max_entries:
+            self._ids = self._ids[-self.max_entries:]
+            self._vectors = self._vectors[-self.max_entries:]
+
+    def _drop(self, position: int) -> None:
+        del self._ids[position]
+        self._vectors = np.delete(self._vectors, position, axis=0)
+
+    def _reset_mirror(self) -> None:
+        self._ids = []
+        self._vectors = None
+        self._last_seq = 0
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def create_semantic_cache(settings) -> Optional[SemanticCache]:
+    """
+    Build the cache from settings (None when disabled).
+    """
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+
+    if settings.SEMANTIC_CACHE_BACKEND == "memory":
+        backend = InMemoryCacheBackend()
+    elif settings.SEMANTIC_CACHE_BACKEND == "redis":
+        from redis.asyncio import Redis
+
+        backend = RedisCacheBackend(
+            Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                socket_timeout=0.5,
+                socket_connect_timeout=0.5,
+            )
+        )
+    else:
+        raise ValueError(f"Unknown semantic cache backend: {settings.SEMANTIC_CACHE_BACKEND}")
+
+    return SemanticCache(
+        backend,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+    )
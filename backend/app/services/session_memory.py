@@ -0,0 +1,307 @@
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+import asyncio
+import logging
+import time
+
+from app.models.schemas import Conversation, Message
+from app.services.admission import Overloaded
+from app.services.llm_service import LLMService
+from app.services.prompts import SUMMARY_SYSTEM_PROMPT, build_summary_prompt
+
+logger = logging.getLogger(__name__)
+
+# summarize(previous_summary, turns) -> new summary, or None on failure
+Summarizer = Callable[[str, Sequence[Message]], Awaitable[Optional[str]]]
+
+# mutate(current data or None) -> new data, or None to leave the session as is
+Mutation = Callable[[Optional[str]], Optional[str]]
+
+
+class InMemorySessionStore:
+    """
+    Process-local stand-in for Redis (tests, single-worker dev).
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, float]] = {}
+
+    async def load(self, session_id: str) -> Optional[str]:
+        entry = self._data.get(session_id)
+        if entry is None:
+            return None
+        data, expires_at = entry
+        if expires_at and time.monotonic() > expires_at:
+            del self._data[session_id]
+            return None
+        return data
+
+    async def update(self, session_id: str, mutate: Mutation, ttl: int) -> bool:
+        # Sin await entre leer y escribir: atómico dentro del proceso
+        data = mutate(await self.load(session_id))
+        if data is None:
+            return False
+        self._data[session_id] = (data, time.monotonic() + ttl if ttl else 0.0)
+        return True
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisSessionStore:
+    """
+    One JSON string per session: {prefix}:{session_id}, refreshed TTL on save.
+
+    Updates are optimistic transactions (WATCH + MULTI/EXEC): if another
+    worker writes the session between the read and the write, the update
+    is retried on the new value instead of overwriting it.
+    """
+
+    MAX_RETRIES = 10
+
+    def __init__(self, client, prefix: str = "lean:session"):
+        self.client = client
+        self.prefix = prefix
+
+    async def load(self, session_id: str) -> Optional[str]:
+        data = await self.client.get(f"{self.prefix}:{session_id}")
+        if isinstance(data, bytes):
+            data = data.decode()
+        return data
+
+    async def update(self, session_id: str, mutate: Mutation, ttl: int) -> bool:
+        from redis.exceptions import WatchError
+
+        key = f"{self.prefix}:{session_id}"
+        async with self.client.pipeline(transaction=True) as pipe:
+            for _ in range(self.MAX_RETRIES):
+                try:
+                    await pipe.watch(key)
+                    current = await pipe.get(key)
+                    if isinstance(current, bytes):
+                        current = current.decode()
+                    data = mutate(current)
+                    if data is None:
+                        await pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.set(key, data, ex=ttl or None)
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    continue  # otro worker escribió la sesión: reintentar sobre el valor nuevo
+        raise RuntimeError(f"session {session_id} kept changing during {self.MAX_RETRIES} update attempts")
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class SessionMemory:
+    """
+    Server-side chat history per ``session_id``.
+
+    The last ``max_turns`` turns are kept verbatim; older turns are folded
+    into a running summary. Folding runs in the background after the answer
+    and only sends the previous summary plus the evicted turns to the LLM,
+    so both the fold and the chat prompt stay roughly constant in size
+    however long the conversation runs.
+
+    Every write is a read-modify-write done atomically by the store (Redis
+    WATCH/MULTI), so turns from several workers on one session are never
+    lost. Store errors degrade to "no history" instead of failing the chat.
+    """
+
+    def __init__(
+        self,
+        store,
+        summarize: Summarizer,
+        max_turns: int = 3,
+        ttl_seconds: int = 86400,
+        message_max_chars: int = 1500,
+        summary_max_chars: int = 1200,
+    ):
+        self.store = store
+        self.summarize = summarize
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.message_max_chars = message_max_chars
+        self.summary_max_chars = summary_max_chars
+
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.turns = 0
+        self.compactions = 0
+        self.summary_failures = 0
+        self.store_errors = 0
+
+    async def load(self, session_id: str) -> Conversation:
+        try:
+            data = await self.store.load(session_id)
+        except Exception as e:
+            self.store_errors += 1
+            logger.warning("Session load failed: %s", e)
+            data = None
+        return Conversation.model_validate_json(data) if data else Conversation(id=session_id)
+
+    def recent(self, conversation: Conversation) -> List[Message]:
+        """
+        Verbatim window for the prompt (turns still waiting to be folded
+        are left out rather than growing the prompt).
+        """
+        return conversation.messages[-2 * self.max_turns:] if self.max_turns else []
+
+    async def _update(self, session_id: str, change: Callable[[Conversation], bool]) -> bool:
+        """
+        Atomically apply ``change`` to the stored conversation; it returns
+        False to leave the session untouched.
+        """
+        def mutate(data: Optional[str]) -> Optional[str]:
+            conversation = Conversation.model_validate_json(data) if data else Conversation(id=session_id)
+            if not change(conversation):
+                return None
+            conversation.updated_at = datetime.utcnow()
+            return conversation.model_dump_json()
+
+        try:
+            return await self.store.update(session_id, mutate, self.ttl_seconds)
+        except Exception as e:
+            self.store_errors += 1
+            logger.warning("Session save failed: %s", e)
+            return False
+
+    async def remember(self, session_id: str, question: str, answer: str) -> None:
+        """
+        Append one turn (one atomic read-modify-write); schedule a fold
+        when the verbatim window overflows.
+        """
+        size = 0
+
+        def append(conversation: Conversation) -> bool:
+            nonlocal size
+            conversation.messages.append(Message(role="user", content=question[: self.message_max_chars]))
+            conversation.messages.append(Message(role="assistant", content=answer[: self.message_max_chars]))
+            size = len(conversation.messages)
+            return True
+
+        if not await self._update(session_id, append):
+            return
+        self.turns += 1
+
+        if size > 2 * self.max_turns:
+            task = asyncio.create_task(self._compact(session_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _compact(self, session_id: str) -> None:
+        conversation = await self.load(session_id)
+        overflow = len(conversation.messages) - 2 * self.max_turns
+        if overflow <= 0:
+            return
+        evicted = conversation.messages[:overflow]
+
+        # LLM call outside the update: new turns can be appended meanwhile
+        summary = await self.summarize(conversation.summary, evicted)
+        if summary is not None:
+            summary = summary[: self.summary_max_chars]
+        else:
+            self.summary_failures += 1
+            # Extractive fallback: append the questions, keep the most recent part
+            questions = " | ".join(m.content for m in evicted if m.role == "user")
+            summary = f"{conversation.summary} {questions}".strip()[-self.summary_max_chars:]
+
+        def fold(current: Conversation) -> bool:
+            if current.messages[: len(evicted)] != evicted:
+                return False  # another fold got there first
+            current.messages = current.messages[len(evicted):]
+            current.summary = summary
+            current.summarized_turns += len(evicted) // 2
+            return True
+
+        if await self._update(session_id, fold):
+            self.compactions += 1
+
+    async def drain(self) -> None:
+        """
+        Wait for background folds (tests, shutdown).
+        """
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def close(self) -> None:
+        await self.drain()
+        await self.store.close()
+
+    def stats(self) -> Dict:
+        return {
+            "turns": self.turns,
+            "compactions": self.compactions,
+            "pending_compactions": len(self._tasks),
+            "summary_failures": self.summary_failures,
+            "store_errors": self.store_errors,
+        }
+
+
+def llm_summarizer(llm_service, max_tokens: int, admission=None) -> Summarizer:
+    """
+    Fold turns with the chat LLM (short, low-temperature completion).
+
+    With ``admission`` each fold takes a low-priority slot: under load it is
+    skipped (extractive fallback) instead of competing with chats.
+    """
+    async def generate(summary: str, turns: Sequence[Message]) -> str:
+        return await llm_service.generate(
+            prompt=build_summary_prompt(summary, turns),
+            system_prompt=SUMMARY_SYSTEM_PROMPT,
+            temperature=0.1,
+            max_tokens=max_tokens,
+        )
+
+    async def summarize(summary: str, turns: Sequence[Message]) -> Optional[str]:
+        if admission is None:
+            text = await generate(summary, turns)
+        else:
+            try:
+                async with admission.background_slot():
+                    text = await generate(summary, turns)
+            except Overloaded:
+                return None
+        if text in (LLMService.TIMEOUT_MESSAGE, LLMService.ERROR_MESSAGE):
+            return None
+        return text
+
+    return summarize
+
+
+def create_session_memory(settings, llm_service, admission=None) -> Optional[SessionMemory]:
+    """
+    Build session memory from settings (None when disabled). Summary folds
+    go through ``admission`` when given.
+    """
+    if not settings.SESSION_MEMORY_ENABLED:
+        return None
+
+    if settings.SESSION_BACKEND == "memory":
+        store = InMemorySessionStore()
+    elif settings.SESSION_BACKEND == "redis":
+        from redis.asyncio import Redis
+
+        store = RedisSessionStore(
+            Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                socket_timeout=0.5,
+                socket_connect_timeout=0.5,
+            )
+        )
+    else:
+        raise ValueError(f"Unknown session backend: {settings.SESSION_BACKEND}")
+
+    return SessionMemory(
+        store,
+        summarize=llm_summarizer(llm_service, settings.SESSION_SUMMARY_MAX_TOKENS, admission),
+        max_turns=settings.SESSION_MAX_TURNS,
+        ttl_seconds=settings.SESSION_TTL_SECONDS,
+        message_max_chars=settings.SESSION_MESSAGE_MAX_CHARS,
+        summary_max_chars=settings.SESSION_SUMMARY_MAX_CHARS,
+    )
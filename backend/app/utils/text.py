@@ -0,0 +1,27 @@
+import re
+import string
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = string.punctuation + "¿¡" + string.whitespace
+
+
+def fold_accents(text: str) -> str:
+    """
+    Remove diacritics (á -> a, ü -> u) but keep ñ, which is a letter in Spanish.
+    """
+    text = text.replace("ñ", "\0").replace("Ñ", "\1")
+    decomposed = unicodedata.normalize("NFKD", text)
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return folded.replace("\0", "ñ").replace("\1", "Ñ")
+
+
+def normalize_query(text: str) -> str:
+    """
+    Canonical form of a user query for cache keys.
+
+    "¿Cómo calculo el  OEE?" and "como calculo el oee" map to the same key.
+    """
+    text = fold_accents(text).casefold()
+    text = _WHITESPACE.sub(" ", text)
+    return text.strip(_EDGE_PUNCTUATION)
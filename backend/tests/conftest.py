@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+# Dummy credentials so services can be constructed without real API keys
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+
+# Keep tests off Redis; semantic cache tests inject an in-memory backend
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+os.environ.setdefault("SESSION_BACKEND", "memory")
+
+
+@pytest.fixture
+def use_rag_service():
+    """Route the app's RAGService dependency to a test instance"""
+    from app.core.dependencies import get_rag_service
+    from app.main import app
+
+    def install(service):
+        app.dependency_overrides[get_rag_service] = lambda: service
+        return service
+
+    yield install
+    app.dependency_overrides.clear()
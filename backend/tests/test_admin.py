@@ -0,0 +1,98 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api import admin, routes
+from app.core.bulkhead import create_bulkheads
+from app.core.config import settings
+from app.core.dependencies import get_rag_service
+from app.core.tracing import TraceBuffer, TraceMiddleware
+from app.services.rag_service import RAGService
+from tests.test_rag import FakeLLM, SlowEmbedder, SlowQdrant
+
+ADMIN = {"X-Admin-Token": "s3cret"}
+
+
+@pytest.fixture
+def traced_app(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(settings, "TRACING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+
+    app = FastAPI()
+    app.state.bulkheads = create_bulkheads(settings)
+    app.state.traces = TraceBuffer(10)
+    app.add_middleware(TraceMiddleware, buffer=app.state.traces)
+    app.include_router(routes.router, prefix="/api")
+    app.include_router(admin.router, prefix="/admin")
+
+    service = RAGService(embedder=SlowEmbedder(0.01), qdrant=SlowQdrant(0.01), llm_service=FakeLLM())
+    app.dependency_overrides[get_rag_service] = lambda: service
+    return app
+
+
+def request(app, method, url, **kwargs):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kwargs)
+
+    return asyncio.run(run())
+
+
+def test_opted_in_request_returns_stage_spans(traced_app):
+    response = request(
+        traced_app, "POST", "/api/chat",
+        json={"message": "qué es poka-yoke"},
+        headers={**ADMIN, "X-Debug-Trace": "1"},
+    )
+
+    timing = response.headers["Server-Timing"]
+    for stage in ("embed", "dense_search", "context_build", "llm", "total", "request"):
+        assert f"{stage};dur=" in timing
+
+    traces = request(traced_app, "GET", "/admin/traces", headers=ADMIN).json()["traces"]
+    assert traces[0]["id"] == response.headers["X-Trace-Id"]
+    assert traces[0]["name"] == "POST /api/chat"
+    embed = next(s for s in traces[0]["spans"] if s["name"] == "embed")
+    assert embed["duration_ms"] >= 10
+
+
+def test_requests_without_opt_in_or_token_are_not_traced(traced_app):
+    plain = request(traced_app, "POST", "/api/chat", json={"message": "qué es 5S"})
+    forged = request(
+        traced_app, "POST", "/api/chat",
+        json={"message": "qué es 5S"},
+        headers={"X-Debug-Trace": "1", "X-Admin-Token": "guess"},
+    )
+
+    assert "Server-Timing" not in plain.headers
+    assert "Server-Timing" not in forged.headers
+    assert request(traced_app, "GET", "/admin/traces", headers=ADMIN).json()["traces"] == []
+
+
+def test_admin_endpoints_are_guarded(traced_app, monkeypatch):
+    assert request(traced_app, "GET", "/admin/traces").status_code == 403
+
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", False)
+    assert request(traced_app, "POST", "/admin/profile", headers=ADMIN).status_code == 404
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    assert request(traced_app, "GET", "/admin/traces", headers=ADMIN).status_code == 404
+
+
+def test_profile_returns_folded_stacks(traced_app):
+    response = request(
+        traced_app, "POST", "/admin/profile",
+        params={"seconds": 0.2, "interval_ms": 5}, headers=ADMIN,
+    )
+
+    assert response.status_code == 200
+    lines = response.text.strip().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    # Root frame is the thread name, then module:function:line frames
+    assert ":" in stack.split(";")[-1]
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+from app.services.admission import AdmissionController, Overloaded
+from app.services.llm_service import LLMService
+from app.services.rag_service import RAGService
+from tests.test_llm_service import FakeOpenAI
+from tests.test_rag import FakeLLM, SlowEmbedder, SlowQdrant
+
+
+async def hold(controller, seconds, deadline_s=10.0):
+    loop = asyncio.get_running_loop()
+    async with controller.slot(loop.time() + deadline_s):
+        await asyncio.sleep(seconds)
+
+
+def test_full_queue_is_rejected_with_429():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, initial_service_s=0.1)
+
+    async def run():
+        holder = asyncio.create_task(hold(controller, 0.1))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold(controller, 0.0))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as shed:
+            await hold(controller, 0.0)
+        await asyncio.gather(holder, queued)
+        return shed.value
+
+    shed = asyncio.run(run())
+
+    assert (shed.reason, shed.status_code) == ("queue_full", 429)
+    assert shed.retry_after >= 1
+    assert controller.stats()["admitted"] == 2
+
+
+def test_unmeetable_deadline_is_shed_immediately():
+    controller = AdmissionController(max_concurrent=1, initial_service_s=1.0)
+
+    async def run():
+        holder = asyncio.create_task(hold(controller, 0.2))
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        with pytest.raises(Overloaded) as shed:
+            await hold(controller, 0.0, deadline_s=0.5)
+        elapsed = time.perf_counter() - start
+        await holder
+        return shed.value, elapsed
+
+    shed, elapsed = asyncio.run(run())
+
+    assert (shed.reason, shed.status_code) == ("deadline", 503)
+    assert elapsed < 0.05
+
+
+def test_slot_arriving_too_late_is_shed():
+    controller = AdmissionController(max_concurrent=1, initial_service_s=0.01)
+
+    async def run():
+        holder = asyncio.create_task(hold(controller, 0.3))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as shed:
+            await hold(controller, 0.0, deadline_s=0.1)
+        await holder
+        return shed.value
+
+    shed = asyncio.run(run())
+
+    assert shed.reason == "wait_timeout"
+    assert controller.stats()["queue_depth"] == 0
+
+
+class SlowLLM(FakeLLM):
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        await asyncio.sleep(0.3)
+        return await super().generate(prompt, system_prompt)
+
+
+def test_chat_sheds_with_retry_after_under_load(use_rag_service, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_DEADLINE_SECONDS", 0.5)
+    service = use_rag_service(
+        RAGService(embedder=SlowEmbedder(0), qdrant=SlowQdrant(0), llm_service=SlowLLM())
+    )
+    service.admission = AdmissionController(max_concurrent=1, max_queue=4, initial_service_s=0.3)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                *(client.post("/api/chat", json={"message": f"pregunta {i}"}) for i in range(3)),
+                client.post("/api/chat/stream", json={"message": "pregunta stream"}),
+            )
+
+    responses = asyncio.run(run())
+    statuses = [r.status_code for r in responses]
+
+    assert statuses.count(200) >= 1
+    shed = [r for r in responses if r.status_code == 503]
+    assert shed and all(int(r.headers["Retry-After"]) >= 1 for r in shed)
+    assert service.admission.stats()["shed"]["deadline"] + service.admission.stats()["shed"]["wait_timeout"] == len(shed)
+
+
+class HangingStreamLLM(FakeLLM):
+    """Streams one delta, then stalls; times out like LLMService.stream"""
+
+    def __init__(self):
+        super().__init__()
+        self.timeouts = []
+
+    async def stream(self, prompt, system_prompt=None, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        yield "res"
+        await asyncio.sleep(timeout)
+        yield LLMService.TIMEOUT_MESSAGE
+
+
+def test_admitted_chat_that_outlives_the_deadline_gets_503(use_rag_service, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_DEADLINE_SECONDS", 0.3)
+    openai = FakeOpenAI(delays=[5.0])  # answers well after the 0.3 s deadline
+    service = use_rag_service(
+        RAGService(
+            embedder=SlowEmbedder(0),
+            qdrant=SlowQdrant(0),
+            llm_service=LLMService("openai", clients={"openai": openai}),
+        )
+    )
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/chat", json={"message": "qué es SMED"})
+
+    r = asyncio.run(run())
+
+    assert r.status_code == 503
+    assert int(r.headers["Retry-After"]) >= 1
+    assert LLMService.TIMEOUT_MESSAGE not in r.text
+    assert openai.cancelled == 1  # the LLM call was cut at the deadline
+    assert service.admission.stats()["shed"]["llm_timeout"] == 1
+    assert service.admission.stats()["in_flight"] == 0
+
+
+def test_stream_that_outlives_the_deadline_ends_with_in_band_503(use_rag_service, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_DEADLINE_SECONDS", 0.3)
+    llm = HangingStreamLLM()
+    service = use_rag_service(RAGService(embedder=SlowEmbedder(0), qdrant=SlowQdrant(0), llm_service=llm))
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/chat/stream", json={"message": "qué es SMED"})
+
+    r = asyncio.run(run())
+    events = [
+        (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+        for block in r.text.strip().split("\n\n")
+    ]
+
+    assert 0 < llm.timeouts[0] <= 0.3  # the stream only gets what is left of the deadline
+    assert [event for event, _ in events] == ["sources", "token", "error"]
+    assert events[1][1] == {"text": "res"}
+    assert events[2][1]["status"] == 503 and events[2][1]["retry_after"] >= 1
+    assert service.admission.stats()["shed"]["llm_timeout"] == 1
+    assert service.admission.stats()["in_flight"] == 0
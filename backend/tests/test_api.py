@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.core import dependencies
+from app.main import app
+from tests.test_rag import FakeLLM, SlowQdrant
+
+
+class FixedEmbedder:
+    def encode(self, texts):
+        return np.ones((len(texts), 384), dtype=np.float32)
+
+
+def test_lifespan_builds_one_service_container(monkeypatch):
+    created = []
+
+    class CountingRAGService(dependencies.RAGService):
+        def __init__(self, **kwargs):
+            created.append(self)
+            super().__init__(embedder=FixedEmbedder(), **kwargs)
+
+    monkeypatch.setattr(dependencies, "RAGService", CountingRAGService)
+    monkeypatch.setattr(dependencies, "LLMService", FakeLLM)
+    monkeypatch.setattr(dependencies, "create_vector_client", lambda: SlowQdrant(0))
+
+    with TestClient(app) as client:
+        health = client.get("/health").json()
+        chat = client.post("/api/chat", json={"message": "qué es SMED"})
+
+        assert app.state.services.rag_service is created[0]
+
+    assert len(created) == 1
+    assert chat.status_code == 200
+    assert health["worker"]["startup_s"] >= 0
+    assert health["worker"]["rss_mb"] > 0
+    # Warm-up went through the container's instance
+    assert health["embedding_cache"]["entries"] == 1
+
+
+def test_metrics_endpoint_exposes_stage_histograms(use_rag_service):
+    from tests.test_rag import SlowEmbedder
+
+    use_rag_service(
+        dependencies.RAGService(
+            embedder=SlowEmbedder(0), qdrant=SlowQdrant(0), llm_service=FakeLLM()
+        )
+    )
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/api/chat", json={"message": "qué es jidoka"})
+            return await client.get("/metrics")
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    for stage in ("embed", "dense_search", "context_build", "llm", "total"):
+        assert f'lean_rag_stage_seconds_count{{stage="{stage}"}}' in body
+    assert 'lean_cache_requests_total{cache="embedding",result="miss"}' in body
+    assert 'lean_chat_requests_total{endpoint="chat",outcome="ok"}' in body
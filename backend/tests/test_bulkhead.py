@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.core.bulkhead import Bulkhead, Bulkheads
+from app.main import app
+from app.services.admission import Overloaded
+from app.services.rag_service import RAGService
+from tests.test_rag import FakeLLM, SlowEmbedder, SlowQdrant
+
+
+def test_saturated_pool_rejects_fast():
+    pool = Bulkhead("chat", max_concurrent=1, max_queue=1, queue_timeout_s=0.05)
+
+    async def hold(seconds):
+        async with pool.slot():
+            await asyncio.sleep(seconds)
+
+    async def run():
+        holder = asyncio.create_task(hold(0.2))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold(0))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as full:
+            await hold(0)
+        with pytest.raises(Overloaded) as late:
+            await queued
+        await holder
+        return full.value, late.value
+
+    full, late = asyncio.run(run())
+
+    assert (full.reason, full.status_code) == ("queue_full", 429)
+    assert (late.reason, late.status_code) == ("queue_timeout", 503)
+    assert pool.stats()["in_flight"] == 0
+
+
+def test_run_timeout_keeps_slot_until_thread_finishes():
+    pool = Bulkhead("calculator", max_concurrent=1, timeout_s=0.05, queue_timeout_s=0.01, threads=1)
+    done = threading.Event()
+
+    def slow():
+        time.sleep(0.2)
+        done.set()
+
+    async def run():
+        with pytest.raises(Overloaded) as timeout:
+            await pool.run(slow)
+        # the thread is still busy: no second job is admitted alongside it
+        with pytest.raises(Overloaded) as busy:
+            await pool.run(lambda: None)
+        await asyncio.sleep(0.3)
+        return timeout.value, busy.value, await pool.run(lambda: 42)
+
+    timeout, busy, result = asyncio.run(run())
+    pool.close()
+
+    assert (timeout.reason, timeout.status_code) == ("timeout", 504)
+    assert busy.status_code in (429, 503)
+    assert done.is_set() and result == 42
+
+
+class SlowLLM(FakeLLM):
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        await asyncio.sleep(0.5)
+        return await super().generate(prompt, system_prompt)
+
+
+def test_calculators_stay_fast_while_chat_is_saturated(use_rag_service, monkeypatch):
+    use_rag_service(RAGService(embedder=SlowEmbedder(0), qdrant=SlowQdrant(0), llm_service=SlowLLM()))
+    pools = Bulkheads(
+        chat=Bulkhead("chat", max_concurrent=2, max_queue=0),
+        calculator=Bulkhead("calculator", max_concurrent=2, threads=2),
+    )
+    monkeypatch.setattr(app.state, "bulkheads", pools)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            chats = [
+                asyncio.create_task(client.post("/api/chat", json={"message": f"pregunta {i}"}))
+                for i in range(6)
+            ]
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            calc = await client.post(
+                "/api/calculate/oee",
+                json={"availability": 90, "performance": 95, "quality": 99},
+            )
+            calc_s = time.perf_counter() - start
+            return calc, calc_s, await asyncio.gather(*chats)
+
+    calc, calc_s, chats = asyncio.run(run())
+    pools.close()
+
+    assert calc.status_code == 200 and calc_s < 0.25
+    statuses = sorted(r.status_code for r in chats)
+    assert statuses == [200, 200, 429, 429, 429, 429]
+    assert all(r.headers["Retry-After"] for r in chats if r.status_code == 429)
@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+import numpy as np
+
+from app.main import app
+from app.models.schemas import OEEInput
+from app.services.calculator import (
+    LEAD_TIME_RECOMMENDATIONS,
+    OEE_RECOMMENDATIONS,
+    LeanCalculator,
+)
+
+calculator = LeanCalculator()
+rng = np.random.default_rng(7)
+
+
+def decode(codes, legend):
+    return [text for i, (_, text) in enumerate(legend) if codes & (1 << i)]
+
+
+def test_oee_batch_matches_scalar_exactly():
+    # Includes decimal ties (84.645, x.xx5) where naive NumPy rounding differs
+    a = np.concatenate([[90.0, 95.0, 0, 100], rng.uniform(0, 100, 2000).round(1)])
+    p = np.concatenate([[95.0, 98.0, 0, 100], rng.uniform(0, 100, 2000).round(1)])
+    q = np.concatenate([[99.0, 99.5, 0, 100], rng.uniform(0, 100, 2000).round(1)])
+
+    batch = calculator.calculate_oee_batch(a, p, q)
+
+    for i in range(len(a)):
+        scalar = calculator.calculate_oee(
+            OEEInput(availability=float(a[i]), performance=float(p[i]), quality=float(q[i]))
+        )
+        assert batch["oee"][i] == scalar.oee
+        assert batch["world_class"][i] == scalar.world_class
+        for loss, value in scalar.losses.items():
+            assert batch[loss][i] == value
+        assert decode(batch["recommendation_codes"][i], OEE_RECOMMENDATIONS) == scalar.recommendations
+
+
+def test_takt_batch_matches_scalar_exactly():
+    available = rng.uniform(1, 960, 2000).round(2)
+    demand = rng.integers(1, 5000, 2000)
+
+    batch = calculator.calculate_takt_time_batch(available, demand)
+
+    for i in range(len(available)):
+        scalar = calculator.calculate_takt_time(float(available[i]), int(demand[i]))
+        for key, column in batch.items():
+            assert column[i] == scalar[key]
+
+
+def test_lead_time_batch_matches_scalar_exactly():
+    counts = rng.integers(0, 8, 500)
+    cycle = rng.integers(1, 20, counts.sum()).astype(float)  # integer minutes: ties for the bottleneck
+    wait = rng.uniform(0, 120, counts.sum()).round(1)
+
+    batch = calculator.calculate_lead_time_batch(counts, cycle, wait)
+
+    # Plain floats as the API delivers them (np.float64 has its own __round__)
+    cycle, wait = cycle.tolist(), wait.tolist()
+    start = 0
+    for i, count in enumerate(counts):
+        steps = [
+            {"name": f"step {j}", "cycle_time": cycle[start + j], "wait_time": wait[start + j]}
+            for j in range(count)
+        ]
+        scalar = calculator.calculate_lead_time(steps)
+        for key in ("total_lead_time_minutes", "total_lead_time_hours", "total_cycle_time",
+                    "total_wait_time", "value_added_ratio", "waste_percentage", "process_efficiency"):
+            assert batch[key][i] == scalar[key]
+        texts = decode(batch["recommendation_codes"][i], LEAD_TIME_RECOMMENDATIONS)
+        if count:
+            bottleneck = steps[batch["bottleneck_step"][i]]
+            texts[-1] = f"{texts[-1]}: '{bottleneck['name']}' ({bottleneck['cycle_time']} min)"
+        assert texts == scalar["recommendations"]
+        start += count
+
+
+def post(url, payload):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(url, json=payload)
+
+    return asyncio.run(run())
+
+
+def test_batch_endpoints_return_columnar_arrays():
+    r = post("/api/calculate/oee/batch", {
+        "availability": [90, 95], "performance": [95, 98], "quality": [99, 99.5],
+    })
+    assert r.status_code == 200
+    body = r.json()
+    assert body["world_class"] == [False, True]
+    assert len(body["recommendation_codes"]) == 2
+    assert [entry["code"] for entry in body["recommendation_legend"]][0] == "tpm"
+
+    r = post("/api/calculate/lead-time/batch", {"step_counts": [2, 0], "cycle_time": [5, 10], "wait_time": [60, 30]})
+    assert r.status_code == 200
+    assert r.json()["bottleneck_step"] == [1, -1]
+
+
+def test_batch_endpoints_reject_invalid_rows():
+    r = post("/api/calculate/oee/batch", {"availability": [90, 120], "performance": [95, 95], "quality": [99, 99]})
+    assert r.status_code == 422
+    assert "rows [1]" in r.json()["detail"]
+
+    r = post("/api/calculate/takt-time/batch", {"available_time_minutes": [480], "customer_demand_units": [1, 2]})
+    assert r.status_code == 422
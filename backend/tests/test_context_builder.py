@@ -0,0 +1,105 @@
+import numpy as np
+
+from app.services.context_builder import (
+    build_context,
+    estimate_tokens,
+    filter_by_score,
+    merge_adjacent,
+    mmr_select,
+    pack_to_budget,
+    strip_overlap,
+)
+
+TEXT = " ".join(f"frase{i} sobre flujo continuo y reducción de inventario." for i in range(60))
+
+
+def _chunks(text, size=300, overlap=60):
+    # Same sliding window as scripts/ingest_documents.chunk_text
+    chunks, start = [], 0
+    while start < len(text):
+        chunks.append(text[start:start + size])
+        start += size - overlap
+    return chunks
+
+
+def _doc(content, source="lean.pdf", index=None, score=None, vector=None):
+    return {
+        "content": content,
+        "metadata": {"source": source, "chunk_index": index},
+        "score": score,
+        "vector": vector,
+    }
+
+
+def test_strip_overlap():
+    assert strip_overlap("abc def", "def ghi", 10) == " ghi"
+    assert strip_overlap("abc", "xyz", 10) == "xyz"
+
+
+def test_merge_adjacent_reconstructs_source_text():
+    chunks = _chunks(TEXT)
+    # Retrieved out of order, plus a chunk from another book
+    docs = [_doc(chunks[3], index=3), _doc("otro libro", source="tps.pdf", index=0),
+            _doc(chunks[1], index=1), _doc(chunks[2], index=2)]
+
+    blocks = merge_adjacent(docs, max_overlap=60)
+
+    assert len(blocks) == 2
+    assert blocks[0]["content"] == TEXT[240:240 * 3 + 300]
+    assert blocks[0]["metadata"]["chunk_index"] == 1
+    assert blocks[0]["metadata"]["chunk_end"] == 3
+    assert blocks[1]["content"] == "otro libro"
+
+
+def test_mmr_drops_near_duplicates():
+    a = np.array([1.0, 0.0, 0.0])
+    docs = [
+        _doc("a", index=0, score=0.9, vector=a),
+        _doc("a bis", index=5, score=0.89, vector=a + 0.01),
+        _doc("b", index=9, score=0.5, vector=np.array([0.0, 1.0, 0.0])),
+        _doc("lexical", index=20),
+    ]
+
+    selected = mmr_select(docs, duplicate_threshold=0.95)
+
+    assert [d["content"] for d in selected] == ["a", "b", "lexical"]
+
+
+def test_pack_to_budget_cuts_at_whitespace():
+    blocks = [{"content": "uno " * 200, "metadata": {}}, {"content": "dos " * 200, "metadata": {}}]
+    budget = estimate_tokens(blocks[0]["content"]) + 60
+
+    packed = pack_to_budget(blocks, budget)
+
+    assert len(packed) == 2
+    assert packed[1]["content"].endswith(" …")
+    assert sum(estimate_tokens(b["content"]) for b in packed) <= budget + 2
+
+
+def test_build_context_saves_tokens_on_overlapping_chunks():
+    chunks = _chunks(TEXT)
+    docs = [_doc(c, index=i) for i, c in enumerate(chunks[:5])]
+
+    blocks = build_context(docs, token_budget=10_000, max_overlap=60)
+
+    raw = sum(estimate_tokens(d["content"]) for d in docs)
+    packed = sum(estimate_tokens(b["content"]) for b in blocks)
+    assert len(blocks) == 1
+    assert packed < raw
+
+
+def test_filter_by_score_adaptive_k():
+    def docs(*scores):
+        return [_doc(str(s), index=i, score=s) for i, s in enumerate(scores)]
+
+    cut = lambda d: [x["score"] for x in filter_by_score(d, 0.3, 0.75, 0.15)]
+
+    # Elbow after the second hit
+    assert cut(docs(0.82, 0.8, 0.55, 0.5)) == [0.82, 0.8]
+    # Relative cutoff: 0.5 < 0.75 * 0.7
+    assert cut(docs(0.7, 0.65, 0.5)) == [0.7, 0.65]
+    # Nothing relevant -> no context
+    assert cut(docs(0.2, 0.1)) == []
+    # Lexical hits without a dense score are kept
+    lexical = _doc("smed", index=9)
+    assert filter_by_score([lexical] + docs(0.1), 0.3, 0.75, 0.15) == [lexical]
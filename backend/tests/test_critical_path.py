@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+import httpx
+import numpy as np
+import pytest
+
+from app.main import app
+from app.models.schemas import ProcessStep
+from app.services.calculator import LeanCalculator
+
+calculator = LeanCalculator()
+
+
+def step(name, cycle, wait=0, after=()):
+    return ProcessStep(name=name, cycle_time=cycle, wait_time=wait, predecessors=list(after))
+
+
+def assembly():
+    """
+    Two sub-assemblies in parallel, merged into final assembly:
+
+        cut (5+10) → weld (8+20) ─┐
+                                   ├→ assembly (10+5) → pack (2+3)
+        mold (12+6) → paint (4+2) ┘
+    """
+    return [
+        step("cut", 5, 10),
+        step("weld", 8, 20, ["cut"]),
+        step("mold", 12, 6),
+        step("paint", 4, 2, ["mold"]),
+        step("assembly", 10, 5, ["weld", "paint"]),
+        step("pack", 2, 3, ["assembly"]),
+    ]
+
+
+def test_critical_path_of_parallel_branches():
+    result = calculator.calculate_critical_path(assembly())
+
+    # cut→weld = 43 min, mold→paint = 24 min; +15 +5 after the merge
+    assert result["total_lead_time_minutes"] == 63
+    assert result["sequential_lead_time_minutes"] == 87  # the flat sum overstates it
+    assert result["critical_path"] == ["cut", "weld", "assembly", "pack"]
+    assert result["critical_cycle_time"] == 25
+    assert result["critical_wait_time"] == 38
+    assert result["total_work_content"] == 41
+    assert result["value_added_ratio"] == round(25 / 63 * 100, 2)
+    assert "'assembly' (10.0 min)" in result["recommendations"][-1]
+
+    steps = {s["name"]: s for s in result["steps"]}
+    assert steps["mold"]["slack"] == steps["paint"]["slack"] == 19
+    assert steps["paint"]["latest_finish"] == 43
+    assert [s["critical"] for s in result["steps"]] == [True, True, False, False, True, True]
+
+
+def test_sequential_chain_matches_flat_lead_time():
+    flat = [
+        {"name": "Step 1", "cycle_time": 5, "wait_time": 10},
+        {"name": "Step 2", "cycle_time": 3, "wait_time": 15},
+        {"name": "Step 3", "cycle_time": 7, "wait_time": 5},
+    ]
+    chain = [
+        step(s["name"], s["cycle_time"], s["wait_time"], [flat[i - 1]["name"]] if i else [])
+        for i, s in enumerate(flat)
+    ]
+
+    graph = calculator.calculate_critical_path(chain)
+    linear = calculator.calculate_lead_time(flat)
+
+    for key in ("total_lead_time_minutes", "value_added_ratio", "waste_percentage", "process_efficiency"):
+        assert graph[key] == linear[key]
+    assert all(s["critical"] and s["slack"] == 0 for s in graph["steps"])
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="cycle: b → c → a → b"):
+        calculator.calculate_critical_path([
+            step("start", 1),
+            step("a", 1, after=["start", "c"]),
+            step("b", 1, after=["a"]),
+            step("c", 1, after=["b"]),
+        ])
+    with pytest.raises(ValueError, match="unknown predecessor 'x'"):
+        calculator.calculate_critical_path([step("a", 1, after=["x"])])
+    with pytest.raises(ValueError, match="Duplicate step name"):
+        calculator.calculate_critical_path([step("a", 1), step("a", 2)])
+    with pytest.raises(ValueError, match="cycle: a → a"):
+        calculator.calculate_critical_path([step("a", 1, after=["a"])])
+
+
+def test_large_graph_is_linear_time():
+    # 100k steps: a layered DAG, each step fed by up to 3 steps of the previous layer
+    rng = np.random.default_rng(3)
+    width, n = 100, 100_000
+    steps = []
+    for i in range(n):
+        layer = i // width
+        after = [] if layer == 0 else [
+            f"s{(layer - 1) * width + j}" for j in set(rng.integers(0, width, 3).tolist())
+        ]
+        steps.append(step(f"s{i}", float(rng.integers(1, 10)), 0, after))
+
+    start = time.perf_counter()
+    result = calculator.calculate_critical_path(steps)
+    assert time.perf_counter() - start < 5
+
+    assert len(result["critical_path"]) == n // width
+    assert result["total_lead_time_minutes"] == result["critical_cycle_time"]
+    assert min(s["slack"] for s in result["steps"]) == 0
+
+
+def post(url, payload):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(url, json=payload)
+
+    return asyncio.run(run())
+
+
+def test_critical_path_endpoint():
+    steps = [s.model_dump() for s in assembly()]
+    r = post("/api/calculate/lead-time/critical-path", {"steps": steps})
+    assert r.status_code == 200
+    assert r.json()["critical_path"] == ["cut", "weld", "assembly", "pack"]
+
+    steps[0]["predecessors"] = ["pack"]
+    r = post("/api/calculate/lead-time/critical-path", {"steps": steps})
+    assert r.status_code == 422
+    assert "cycle" in r.json()["detail"]
+
+    r = post("/api/calculate/lead-time/critical-path", {"steps": [{"name": "a", "cycle_time": 0}]})
+    assert r.status_code == 422
@@ -0,0 +1,198 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.embedder import EmbedderBackend, OnnxEmbedder
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache
+from app.utils.text import normalize_query
+
+
+class RecordingEncoder:
+    """Encodes each text as [len(text)] and records batch sizes"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, texts):
+        self.batch_sizes.append(len(texts))
+        return np.array([[float(len(t))] for t in texts], dtype=np.float32)
+
+
+def test_batcher_groups_concurrent_queries():
+    encoder = RecordingEncoder()
+
+    async def run():
+        batcher = EmbeddingBatcher(
+            encoder, ThreadPoolExecutor(1), max_batch_size=32, max_wait_ms=50
+        )
+        texts = [f"q{'x' * i}" for i in range(8)]
+        vectors = await asyncio.gather(*(batcher.embed(t) for t in texts))
+        await batcher.close()
+        return texts, vectors
+
+    texts, vectors = asyncio.run(run())
+
+    assert encoder.batch_sizes == [8]
+    # Each caller gets its own row back
+    assert [v[0] for v in vectors] == [float(len(t)) for t in texts]
+
+
+def test_batcher_respects_max_batch_size():
+    encoder = RecordingEncoder()
+
+    async def run():
+        batcher = EmbeddingBatcher(
+            encoder, ThreadPoolExecutor(1), max_batch_size=3, max_wait_ms=50
+        )
+        await asyncio.gather(*(batcher.embed("q") for _ in range(7)))
+        await batcher.close()
+
+    asyncio.run(run())
+
+    assert max(encoder.batch_sizes) <= 3
+    assert sum(encoder.batch_sizes) == 7
+
+
+def test_batcher_propagates_encoder_errors():
+    def failing(texts):
+        raise RuntimeError("model crashed")
+
+    async def run():
+        batcher = EmbeddingBatcher(failing, ThreadPoolExecutor(1), max_wait_ms=1)
+        try:
+            with pytest.raises(RuntimeError):
+                await batcher.embed("q")
+            # The worker survives a failed batch
+            with pytest.raises(RuntimeError):
+                await batcher.embed("q")
+        finally:
+            await batcher.close()
+
+    asyncio.run(run())
+
+
+def test_normalize_query_spanish():
+    assert normalize_query("¿Cómo calculo el  OEE?") == "como calculo el oee"
+    assert normalize_query("  Qué es SMED ") == normalize_query("que es smed")
+    # ñ is a letter, not an accent
+    assert normalize_query("Año") == "año"
+
+
+def test_cache_lru_eviction_and_stats():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("a", [1.0, 2.0])
+    cache.put("b", [3.0, 4.0])
+    assert cache.get("a") is not None  # "a" becomes most recent
+    cache.put("c", [5.0, 6.0])  # evicts "b"
+
+    assert cache.get("b") is None
+    assert cache.get("c").dtype == np.float32
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["bytes"] == 2 * 2 * 4
+
+
+def test_cache_byte_bound_and_ttl(monkeypatch):
+    cache = EmbeddingCache(max_entries=100, max_bytes=384 * 4 * 2)
+    for key in "abc":
+        cache.put(key, np.zeros(384))
+    assert len(cache) == 2
+
+    now = [1000.0]
+    monkeypatch.setattr("app.services.embedding_cache.time.monotonic", lambda: now[0])
+    cache = EmbeddingCache(ttl_seconds=60)
+    cache.put("a", [1.0])
+    now[0] += 61
+    assert cache.get("a") is None
+
+
+class FakeEncoding:
+    def __init__(self, ids, attention_mask):
+        self.ids = ids
+        self.attention_mask = attention_mask
+
+
+class FakeTokenizer:
+    """Pads to 3 tokens: token i -> id i + 1"""
+
+    def encode_batch(self, texts):
+        out = []
+        for text in texts:
+            n = len(text.split())
+            out.append(FakeEncoding(list(range(1, n + 1)) + [0] * (3 - n), [1] * n + [0] * (3 - n)))
+        return out
+
+
+class FakeSession:
+    """Hidden state of token id t is [t, 1]"""
+
+    class _Node:
+        def __init__(self, name, shape=None):
+            self.name = name
+            self.shape = shape
+
+    def get_inputs(self):
+        return [self._Node("input_ids"), self._Node("attention_mask")]
+
+    def get_outputs(self):
+        return [self._Node("last_hidden_state", ["batch", "sequence", 2])]
+
+    def run(self, _, feeds):
+        ids = feeds["input_ids"].astype(np.float32)
+        return [np.stack([ids, np.ones_like(ids)], axis=-1)]
+
+
+def test_onnx_embedder_mean_pools_real_tokens():
+    embedder = OnnxEmbedder(session=FakeSession(), tokenizer=FakeTokenizer())
+
+    single = embedder.encode("a b")
+    batch = embedder.encode(["a b", "a b c"])
+
+    assert embedder.dimension == 2
+    assert single.shape == (2,)
+    assert batch.shape == (2, 2)
+    # "a b": mean of [1, 1] and [2, 1] -> [1.5, 1], padding ignored
+    expected = np.array([1.5, 1.0]) / np.linalg.norm([1.5, 1.0])
+    np.testing.assert_allclose(single, expected, rtol=1e-6)
+    np.testing.assert_allclose(batch[0], expected, rtol=1e-6)
+
+
+ONNX_DIR = Path(__file__).parent.parent / settings.EMBEDDING_ONNX_PATH
+
+
+@pytest.mark.skipif(
+    not all(
+        (ONNX_DIR / name).exists()
+        for name in (OnnxEmbedder.MODEL_FILE, OnnxEmbedder.QUANTIZED_MODEL_FILE)
+    ),
+    reason="ONNX model not exported (scripts/export_onnx_embedder.py)",
+)
+def test_onnx_parity_with_sentence_transformers():
+    pytest.importorskip("sentence_transformers")
+    from app.services.embedder import SentenceTransformerEmbedder
+
+    texts = [
+        "¿Cómo calculo el OEE?",
+        "Qué es SMED",
+        "El TPM involucra a los operarios en el mantenimiento autónomo.",
+    ]
+    reference = SentenceTransformerEmbedder(settings.EMBEDDING_MODEL).encode(texts)
+
+    for quantized, min_cosine in ((False, 0.999), (True, 0.98)):
+        vectors = OnnxEmbedder(ONNX_DIR, quantized=quantized).encode(texts)
+        cosine = (vectors * reference).sum(axis=1)
+        assert cosine.min() >= min_cosine
+
+
+def test_embedder_backend_is_abstract():
+    with pytest.raises(TypeError):
+        EmbedderBackend()
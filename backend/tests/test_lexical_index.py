@@ -0,0 +1,150 @@
+import asyncio
+
+import numpy as np
+
+from app.models.schemas import DocumentChunk
+from app.services.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+from app.services.local_index import LocalVectorIndex, write_index
+from app.services.rag_service import RAGService
+from app.services.semantic_cache import InMemoryCacheBackend, SemanticCache
+from tests.test_rag import FakeLLM
+
+CHUNKS = [
+    "SMED reduce el tiempo de cambio de formato a menos de diez minutos.",
+    "El TPM involucra a los operarios en el mantenimiento autónomo.",
+    "Heijunka nivela el volumen y el mix de producción.",
+    "Jidoka: parar la línea ante el primer defecto.",
+    "El informe A3 resume problema, causa raíz y contramedidas.",
+    "El OEE combina disponibilidad, rendimiento y calidad.",
+]
+
+
+def _records():
+    return [(i, {"text": text}, text) for i, text in enumerate(CHUNKS)]
+
+
+def test_tokenize_folds_accents_and_keeps_acronyms():
+    assert tokenize("Autónomo A3 SMED") == ["autonomo", "a3", "smed"]
+
+
+def test_bm25_finds_exact_lean_terms():
+    index = LexicalIndex.build(_records())
+
+    hits, confidence = index.search("¿Qué es Heijunka?", k=3)
+    assert hits[0][0] == 2
+    assert confidence > 0.3
+
+    hits, _ = index.search("informe A3", k=3)
+    assert hits[0][0] == 4
+
+    assert index.search("kanban", k=3) == ([], 0.0)
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]], k=60)
+    assert fused[0] == "a"
+    assert set(fused) == {"a", "b", "c", "d"}
+    assert reciprocal_rank_fusion([["a", "b"], ["b"]], limit=1) == ["b"]
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        return np.ones((len(texts), 8), dtype=np.float32)
+
+
+def test_confident_lexical_hit_skips_embedding(tmp_path):
+    payloads = [
+        DocumentChunk(text=t, source="lean.pdf", chunk_index=i, total_chunks=len(CHUNKS)).to_payload()
+        for i, t in enumerate(CHUNKS)
+    ]
+    write_index(tmp_path, np.eye(len(CHUNKS), 8), payloads)
+    embedder = CountingEmbedder()
+    service = RAGService(
+        embedder=embedder, qdrant=LocalVectorIndex(tmp_path), llm_service=FakeLLM()
+    )
+
+    async def run():
+        assert await service.build_lexical_index() == len(CHUNKS)
+        fast = await service.retrieve_context("SMED", k=2)
+        hybrid = await service.retrieve_context(
+            "cómo mejorar la calidad y la disponibilidad de la máquina", k=3
+        )
+        await service.close()
+        return fast, hybrid
+
+    fast, hybrid = asyncio.run(run())
+
+    assert fast[0]["content"] == CHUNKS[0]
+    assert embedder.calls == 1  # only the hybrid query was embedded
+    assert CHUNKS[5] in [doc["content"] for doc in hybrid]
+
+    stats = service.get_retrieval_stats()
+    assert stats["lexical"]["fast_path"] == 1
+    assert stats["dense"]["searches"] == 1
+
+
+def test_chat_fast_path_skips_embedding_with_semantic_cache_enabled(tmp_path):
+    payloads = [
+        DocumentChunk(text=t, source="lean.pdf", chunk_index=i, total_chunks=len(CHUNKS)).to_payload()
+        for i, t in enumerate(CHUNKS)
+    ]
+    write_index(tmp_path, np.eye(len(CHUNKS), 8), payloads)
+    embedder = CountingEmbedder()
+    service = RAGService(
+        embedder=embedder,
+        qdrant=LocalVectorIndex(tmp_path),
+        llm_service=FakeLLM(),
+        semantic_cache=SemanticCache(InMemoryCacheBackend()),
+    )
+
+    async def run():
+        await service.build_lexical_index()
+        answer = await service.answer_with_context("SMED")
+        streamed = [event async for event, _ in service.stream_answer("Heijunka")]
+        await service.close()
+        return answer, streamed
+
+    answer, streamed = asyncio.run(run())
+
+    assert embedder.calls == 0
+    assert answer["answer"] == "respuesta"
+    assert answer["cache"] == {"hit": False}
+    assert streamed[0] == "sources" and streamed[-1] == "done"
+    assert service.get_retrieval_stats()["lexical"]["fast_path"] == 2
+
+
+def test_repeated_fast_path_question_is_served_from_cache(tmp_path):
+    payloads = [
+        DocumentChunk(text=t, source="lean.pdf", chunk_index=i, total_chunks=len(CHUNKS)).to_payload()
+        for i, t in enumerate(CHUNKS)
+    ]
+    write_index(tmp_path, np.eye(len(CHUNKS), 8), payloads)
+    embedder = CountingEmbedder()
+    llm = FakeLLM()
+    service = RAGService(
+        embedder=embedder,
+        qdrant=LocalVectorIndex(tmp_path),
+        llm_service=llm,
+        semantic_cache=SemanticCache(InMemoryCacheBackend()),
+    )
+
+    async def run():
+        await service.build_lexical_index()
+        first = await service.answer_with_context("SMED")
+        again = await service.answer_with_context("¿smed?")  # same normalized question
+        streamed = [data async for event, data in service.stream_answer("Smed") if event == "done"]
+        await service.close()
+        return first, again, streamed[0]
+
+    first, again, done = asyncio.run(run())
+
+    assert first["cache"] == {"hit": False}
+    assert again["cache"] == {"hit": True, "similarity": 1.0}
+    assert again["answer"] == first["answer"]
+    assert done["cache"]["hit"] is True
+    assert len(llm.prompts) == 1
+    assert embedder.calls == 0
@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import httpx
+import numpy as np
+import pytest
+
+from app.main import app
+from app.models.schemas import LineTask
+from app.services.line_balancing import balance_line, positional_weights
+from app.services.calculator import process_graph
+
+
+def task(name, seconds, after=()):
+    return LineTask(name=name, time_seconds=seconds, predecessors=list(after))
+
+
+def synthetic_line(n, seed=0):
+    # Each task follows up to 2 of the previous 20 tasks, like a real assembly sequence
+    rng = np.random.default_rng(seed)
+    tasks = []
+    for i in range(n):
+        after = {f"t{j}" for j in rng.integers(max(0, i - 20), i, 2).tolist()} if i else set()
+        tasks.append(task(f"t{i}", float(rng.integers(2, 40)), sorted(after)))
+    return tasks
+
+
+def check_feasible(tasks, result, takt):
+    station_of = {}
+    for k, station in enumerate(result["stations"]):
+        assert sum(t["time_seconds"] for t in station["tasks"]) <= takt + 1e-9
+        for t in station["tasks"]:
+            station_of[t["name"]] = k
+    assert len(station_of) == len(tasks)
+    for t in tasks:
+        assert all(station_of[p] <= station_of[t.name] for p in t.predecessors)
+
+
+def test_small_line_reaches_theoretical_minimum():
+    tasks = [task("A", 4), task("B", 3, ["A"]), task("C", 5, ["A"]), task("D", 2, ["B", "C"])]
+
+    result = balance_line(tasks, takt_time_seconds=7)
+
+    assert result["theoretical_min_stations"] == result["stations_count"] == 2
+    assert [[t["name"] for t in s["tasks"]] for s in result["stations"]] == [["A", "B"], ["C", "D"]]
+    assert result["balance_efficiency"] == 100
+    assert result["smoothness_index"] == 0
+    assert result["stations"][0] == {
+        "station": "S1",
+        "tasks": [{"name": "A", "time_seconds": 4.0}, {"name": "B", "time_seconds": 3.0}],
+        "load_seconds": 7.0,
+        "idle_seconds": 0.0,
+        "utilization": 100.0,
+    }
+
+
+def test_positional_weights_count_each_follower_once():
+    # Diamond: D is reachable from A through B and C but counts once
+    tasks = [task("A", 1), task("B", 2, ["A"]), task("C", 3, ["A"]), task("D", 4, ["B", "C"])]
+    _, succs, order = process_graph([t.name for t in tasks], [t.predecessors for t in tasks])
+
+    weights = positional_weights(np.array([1.0, 2, 3, 4]), succs, order)
+
+    assert weights.tolist() == [10, 6, 7, 4]
+
+
+@pytest.mark.parametrize("method", ["rpw", "lcr"])
+def test_heuristics_respect_precedence_and_takt(method):
+    tasks = synthetic_line(500)
+    result = balance_line(tasks, takt_time_seconds=60, method=method)
+
+    check_feasible(tasks, result, 60)
+    assert result["stations_count"] >= result["theoretical_min_stations"]
+    assert result["balance_efficiency"] == round(
+        result["total_work_content_seconds"] / (result["stations_count"] * 60) * 100, 2
+    )
+
+
+def test_improvement_search_never_worsens():
+    tasks = synthetic_line(300, seed=4)
+    base = balance_line(tasks, 55, method="lcr")
+    improved = balance_line(tasks, 55, method="lcr", improve_iterations=50)
+
+    check_feasible(tasks, improved, 55)
+    assert (improved["stations_count"], improved["cycle_time_seconds"]) <= (
+        base["stations_count"], base["cycle_time_seconds"]
+    )
+    assert improved["improved"] == (improved["stations"] != base["stations"])
+
+
+def test_thousands_of_tasks_under_a_second():
+    tasks = synthetic_line(5000)
+
+    start = time.perf_counter()
+    result = balance_line(tasks, takt_time_seconds=60)
+    elapsed = time.perf_counter() - start
+
+    check_feasible(tasks, result, 60)
+    assert elapsed < 1
+
+
+def test_improvement_search_stops_at_time_budget():
+    # 20k tasks x 1000 restarts would take minutes; the budget cuts it short
+    tasks = synthetic_line(20_000)
+
+    start = time.perf_counter()
+    result = balance_line(tasks, 60, improve_iterations=1000, time_budget_seconds=1)
+    elapsed = time.perf_counter() - start
+
+    check_feasible(tasks, result, 60)
+    assert elapsed < 3
+    assert result["improve_iterations"] == 1000
+    assert result["improve_iterations_run"] < 1000
+
+
+def test_invalid_lines_are_rejected():
+    with pytest.raises(ValueError, match="'B' .* exceeds takt"):
+        balance_line([task("A", 5), task("B", 9)], takt_time_seconds=8)
+    with pytest.raises(ValueError, match="cycle"):
+        balance_line([task("A", 1, ["B"]), task("B", 1, ["A"])], takt_time_seconds=8)
+    with pytest.raises(ValueError, match="Unknown method"):
+        balance_line([task("A", 1)], takt_time_seconds=8, method="comsoal")
+
+
+def post(url, payload):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(url, json=payload)
+
+    return asyncio.run(run())
+
+
+def test_line_balance_endpoint():
+    tasks = [t.model_dump() for t in synthetic_line(50)]
+
+    # 480 min / 480 units = 60 s of takt
+    r = post("/api/calculate/line-balance", {
+        "tasks": tasks, "available_time_minutes": 480, "customer_demand_units": 480,
+        "improve_iterations": 10,
+    })
+    assert r.status_code == 200
+    body = r.json()
+    assert body["takt_time_seconds"] == 60
+    assert body["stations"][0]["station"] == "S1"
+    assert body["recommendations"]
+
+    r = post("/api/calculate/line-balance", {"tasks": tasks})
+    assert r.status_code == 422
+
+    r = post("/api/calculate/line-balance", {"tasks": tasks, "takt_time_seconds": 10})
+    assert r.status_code == 422
+    assert "exceeds takt" in r.json()["detail"]
@@ -0,0 +1,231 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.config import settings
+from app.services.llm_resilience import CircuitBreaker, LatencyHistogram
+from app.services.llm_service import LLMService
+from app.services.prompts import SYSTEM_PROMPT
+
+
+class FakeOpenAI:
+    """AsyncOpenAI-shaped client: chat.completions.create with a fixed delay"""
+
+    def __init__(self, delays, text="openai", fail=False, usage=None):
+        self.delays = list(delays)
+        self.text = text
+        self.fail = fail
+        self.usage = usage
+        self.requests = []
+        self.calls = 0
+        self.cancelled = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError("503")
+        message = SimpleNamespace(content=f" {self.text} ")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=self.usage)
+
+
+class FakeAnthropic:
+    """AsyncAnthropic-shaped client: messages.create"""
+
+    def __init__(self, delay=0.0, text="anthropic", usage=None):
+        self.delay = delay
+        self.text = text
+        self.usage = usage
+        self.requests = []
+        self.calls = 0
+        self.messages = SimpleNamespace(create=self.create)
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(content=[SimpleNamespace(text=self.text)], usage=self.usage)
+
+
+@pytest.fixture
+def hedge_settings(monkeypatch):
+    for name, value in {
+        "LLM_HEDGE_ENABLED": True,
+        "LLM_HEDGE_INITIAL_DELAY_S": 0.05,
+        "LLM_HEDGE_MIN_DELAY_S": 0.01,
+        "LLM_HEDGE_MIN_SAMPLES": 3,
+        "LLM_TIMEOUT_SECONDS": 1.0,
+        "LLM_BREAKER_FAILURES": 2,
+        "LLM_BREAKER_RESET_SECONDS": 60,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+
+def test_slow_primary_is_hedged_to_other_provider(hedge_settings):
+    openai = FakeOpenAI(delays=[0.5])
+    anthropic = FakeAnthropic(delay=0.01)
+    llm = LLMService("openai", "anthropic", clients={"openai": openai, "anthropic": anthropic})
+
+    async def run():
+        answer = await llm.generate("hola")
+        await asyncio.sleep(0)  # let the cancelled loser unwind
+        return answer
+
+    assert asyncio.run(run()) == "anthropic"
+    assert llm.hedges == 1 and llm.hedge_wins == 1
+    assert openai.cancelled == 1
+    # A cancelled loser is not a provider failure
+    assert llm.stats()["providers"]["openai"]["breaker"]["consecutive_failures"] == 0
+    # ... but its latency is kept, as at least the time it ran before losing
+    primary = llm.stats()["providers"]["openai"]
+    assert primary["count"] == 1
+    assert primary["p50_ms"] >= 50  # hedge delay
+
+
+def test_fast_primary_is_not_hedged(hedge_settings):
+    openai = FakeOpenAI(delays=[0.01])
+    anthropic = FakeAnthropic()
+    llm = LLMService("openai", "anthropic", clients={"openai": openai, "anthropic": anthropic})
+
+    assert asyncio.run(llm.generate("hola")) == "openai"
+    assert anthropic.calls == 0
+    assert llm.stats()["providers"]["openai"]["count"] == 1
+
+
+def test_same_provider_hedge_takes_the_faster_request(hedge_settings):
+    openai = FakeOpenAI(delays=[0.5, 0.01])
+    llm = LLMService("openai", clients={"openai": openai})
+
+    assert asyncio.run(llm.generate("hola")) == "openai"
+    assert openai.calls == 2
+    assert llm.hedge_wins == 1
+
+
+def test_fast_failure_falls_back_and_opens_breaker(hedge_settings):
+    openai = FakeOpenAI(delays=[0.0], fail=True)
+    anthropic = FakeAnthropic()
+    llm = LLMService("openai", "anthropic", clients={"openai": openai, "anthropic": anthropic})
+
+    async def run():
+        return [await llm.generate("hola") for _ in range(3)]
+
+    assert asyncio.run(run()) == ["anthropic"] * 3
+    # Breaker opened after 2 failures: the third call skips OpenAI entirely
+    assert openai.calls == 2
+    assert llm.fallbacks == 2
+    assert llm.stats()["providers"]["openai"]["breaker"]["state"] == "open"
+
+
+def test_deadline_returns_timeout_message(hedge_settings, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_TIMEOUT_SECONDS", 0.1)
+    llm = LLMService("openai", clients={"openai": FakeOpenAI(delays=[1.0])})
+
+    assert asyncio.run(llm.generate("hola")) == LLMService.TIMEOUT_MESSAGE
+
+
+def test_caller_budget_caps_the_llm_timeout_without_tripping_breakers(hedge_settings):
+    llm = LLMService("openai", clients={"openai": FakeOpenAI(delays=[0.5])})
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        answer = await llm.generate("hola", timeout=0.05)
+        return answer, loop.time() - start
+
+    answer, elapsed = asyncio.run(run())
+
+    assert answer == LLMService.TIMEOUT_MESSAGE
+    assert elapsed < 0.5  # cut at the caller's budget, not at LLM_TIMEOUT_SECONDS (1 s)
+    # The request ran out of time; the provider did not fail
+    assert llm.stats()["providers"]["openai"]["breaker"]["consecutive_failures"] == 0
+
+
+def test_hedge_delay_follows_observed_percentile(hedge_settings):
+    llm = LLMService("openai", clients={"openai": FakeOpenAI(delays=[0.0])})
+    provider = llm._primary
+    assert llm._hedge_delay(provider) == 0.05  # initial delay until enough samples
+
+    for seconds in (0.2, 0.3, 0.4, 2.0):
+        provider.latency.observe(seconds)
+    assert 0.4 < llm._hedge_delay(provider) <= 2.0
+
+
+def test_circuit_breaker_half_open_allows_one_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial in flight
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram(window=3)
+    assert histogram.percentile(0.95) is None
+    for seconds in (10.0, 1.0, 2.0, 3.0):
+        histogram.observe(seconds)
+
+    assert len(histogram) == 3  # oldest sample dropped
+    assert histogram.percentile(0.5) == 2.0
+    assert histogram.stats()["count"] == 4
+
+
+def test_anthropic_marks_static_prefix_cacheable_and_reports_cache_reads():
+    usage = SimpleNamespace(
+        input_tokens=120, cache_read_input_tokens=1500, cache_creation_input_tokens=0, output_tokens=80
+    )
+    anthropic = FakeAnthropic(usage=usage)
+    llm = LLMService("anthropic", clients={"anthropic": anthropic})
+    labels = {"provider": "anthropic", "kind": "cached_prompt"}
+    before = REGISTRY.get_sample_value("lean_llm_tokens_total", labels) or 0
+
+    asyncio.run(llm.generate("Pregunta:\nqué es SMED", system_prompt=SYSTEM_PROMPT))
+
+    system = anthropic.requests[0]["system"]
+    assert system == [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+    assert llm.usage_stats() == {
+        "calls": 1,
+        "input_tokens": 1620,
+        "cached_input_tokens": 1500,
+        "cache_write_tokens": 0,
+        "output_tokens": 80,
+        "cached_input_ratio": round(1500 / 1620, 4),
+    }
+    assert REGISTRY.get_sample_value("lean_llm_tokens_total", labels) - before == 1500
+
+
+def test_openai_keeps_system_prefix_first_and_reports_cached_tokens():
+    usage = SimpleNamespace(
+        prompt_tokens=1600,
+        completion_tokens=50,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=1024),
+    )
+    openai = FakeOpenAI(delays=[0.0], usage=usage)
+    llm = LLMService("openai", clients={"openai": openai})
+
+    async def run():
+        for query in ("qué es SMED", "qué es TPM"):
+            await llm.generate(f"Pregunta:\n{query}", system_prompt=SYSTEM_PROMPT)
+
+    asyncio.run(run())
+
+    first, second = (r["messages"] for r in openai.requests)
+    assert first[0] == second[0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert llm.usage_stats()["cached_input_tokens"] == 2048
+    assert llm.stats()["providers"]["openai"]["usage"]["calls"] == 2
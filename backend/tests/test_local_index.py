@@ -0,0 +1,115 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services import local_index
+from app.services.local_index import LocalVectorIndex, write_index
+
+
+def test_write_and_search_roundtrip(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 384)).astype(np.float32)
+    payloads = [{"text": f"chunk {i}", "source": "lean.pdf"} for i in range(50)]
+    write_index(tmp_path, vectors, payloads, collection_name="lean_knowledge")
+
+    index = LocalVectorIndex(tmp_path)
+    assert isinstance(index.vectors, np.memmap)
+
+    rows, scores = index.search(vectors[7] * 3, limit=5)
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(unit @ unit[7]))[:5]
+    assert list(rows) == list(expected)
+    assert rows[0] == 7
+    assert abs(scores[0] - 1.0) < 1e-5
+
+
+def test_query_points_matches_qdrant_shape(tmp_path):
+    vectors = np.eye(4, dtype=np.float32)
+    write_index(tmp_path, vectors, [{"text": str(i)} for i in range(4)], ids=[10, 11, 12, 13])
+    index = LocalVectorIndex(tmp_path)
+
+    async def run():
+        response = await index.query_points("lean_knowledge", query=[0, 1, 0, 0], limit=10)
+        info = await index.get_collection("lean_knowledge")
+        return response, info
+
+    response, info = asyncio.run(run())
+
+    assert len(response.points) == 4
+    assert response.points[0].id == 11
+    assert response.points[0].payload == {"text": "1"}
+    assert info.points_count == 4
+
+
+def test_quantized_index_rescores_with_full_vectors(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = (rng.normal(size=(500, 16)) @ rng.normal(size=(16, 384))).astype(np.float32)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    for method, pca_dim in (("int8", 0), ("int8", 64), ("binary", 0)):
+        path = tmp_path / f"{method}{pca_dim}"
+        write_index(path, vectors, [{}] * 500, quantization=method, pca_dim=pca_dim)
+        index = LocalVectorIndex(path, oversampling=10)
+
+        assert index.codec.method == method
+        assert index.codes.nbytes < index.vectors.nbytes / 3
+
+        rows, scores = index.search(vectors[42], limit=3)
+        assert rows[0] == 42
+        # Returned scores are exact cosine, not code approximations
+        np.testing.assert_allclose(scores, unit[rows] @ unit[42], rtol=1e-5)
+
+
+def test_rewriting_without_quantization_drops_codes(tmp_path):
+    vectors = np.eye(4, dtype=np.float32)
+    write_index(tmp_path, vectors, [{}] * 4, quantization="binary")
+    write_index(tmp_path, vectors, [{}] * 4)
+
+    assert LocalVectorIndex(tmp_path).codec is None
+
+
+def test_ingest_version_changes_when_content_changes(tmp_path):
+    vectors = np.eye(4, dtype=np.float32)
+
+    async def version(payloads):
+        write_index(tmp_path, vectors, payloads)
+        info = await LocalVectorIndex(tmp_path).get_collection("lean_knowledge")
+        return info.config.metadata["ingest_version"]
+
+    original = asyncio.run(version([{"text": str(i)} for i in range(4)]))
+    same = asyncio.run(version([{"text": str(i)} for i in range(4)]))
+    edited = asyncio.run(version([{"text": str(i)} for i in range(3)] + [{"text": "edited"}]))
+
+    assert original == same
+    assert edited != original
+
+
+def test_interrupted_rewrite_keeps_previous_artifact_consistent(tmp_path, monkeypatch):
+    write_index(tmp_path, np.eye(4, 8, dtype=np.float32), [{"text": str(i)} for i in range(4)])
+    before = LocalVectorIndex(tmp_path)
+
+    # Crash after the new matrix is on disk but before codes/payloads/meta
+    def crash(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(local_index.CompactCodec, "save", crash)
+    with pytest.raises(OSError):
+        write_index(tmp_path, np.eye(6, 16, dtype=np.float32), [{}] * 6, quantization="int8")
+
+    reloaded = LocalVectorIndex(tmp_path)
+    assert (reloaded.count, reloaded.dim) == (4, 8)
+    assert reloaded.vectors.shape == (4, 8)
+    assert reloaded.codec is None
+    assert reloaded.search(np.eye(8)[2], limit=1)[0].tolist() == [2]
+    assert before.search(np.eye(8)[2], limit=1)[0].tolist() == [2]
+
+
+def test_rewrite_publishes_new_generation_and_prunes_old_ones(tmp_path):
+    for n in (3, 4, 5):
+        write_index(tmp_path, np.eye(n, 8, dtype=np.float32), [{}] * n)
+
+    assert LocalVectorIndex(tmp_path).count == 5
+    # The current generation plus the one before it, for workers still opening it
+    assert len(list(tmp_path.glob("gen-*"))) == 2
@@ -0,0 +1,171 @@
+import asyncio
+import io
+from datetime import datetime
+
+import httpx
+import numpy as np
+import pytest
+
+from app.main import app
+from app.models.schemas import OEELogConfig, PlannedDowntime, ShiftDefinition
+from app.services.oee_engine import OEEEngine, compute_oee_from_events, make_chunk, read_csv_chunks
+
+LOG = """machine,timestamp,state,good,scrap
+M1,2024-03-01T06:00:00,run,,
+M2,2024-03-01T06:00:00,run,,
+M1,2024-03-01T08:00:00,stop,100,0
+M1,2024-03-01T09:00:00,run,,
+M2,2024-03-01T12:00:00,stop,330,6
+M1,2024-03-01T14:00:00,setup,240,10
+M1,2024-03-01T14:30:00,run,,
+M2,2024-03-01T16:00:00,run,,
+M1,2024-03-01T23:00:00,stop,400,5
+M2,2024-03-02T02:00:00,stop,200,0
+"""
+
+CONFIG = OEELogConfig(
+    shifts=[
+        ShiftDefinition(name="A", start="06:00", end="14:00"),
+        ShiftDefinition(name="B", start="14:00", end="22:00"),
+        ShiftDefinition(name="C", start="22:00", end="06:00"),
+    ],
+    breaks=[ShiftDefinition(name="comida", start="10:00", end="10:30")],
+    planned_downtime=[
+        PlannedDowntime(start="2024-03-01T18:00:00", end="2024-03-01T19:00:00", machine="M2", reason="TPM"),
+    ],
+    ideal_cycle_seconds={"M2": 30},
+    default_ideal_cycle_seconds=60,
+)
+
+
+def run(log=LOG, chunk_rows=250_000):
+    return {(r.machine, r.shift): r for r in compute_oee_from_events(io.BytesIO(log.encode()), CONFIG, "csv", chunk_rows)}
+
+
+def test_availability_excludes_breaks_and_planned_downtime():
+    rows = run()
+    a = rows[("M1", "A")]
+
+    # 06-14 minus the 10:00 break; stopped 08-09
+    assert a.planned_seconds == 7.5 * 3600
+    assert a.run_seconds == 6.5 * 3600
+    assert a.stop_seconds == 3600
+    assert a.availability == round(6.5 / 7.5 * 100, 2)
+    assert a.good == 340 and a.scrap == 10  # report at 14:00 closes shift A
+    performance = 60 * 350 / (6.5 * 3600) * 100
+    assert a.performance == round(performance, 2)
+    assert a.quality == round(340 / 350 * 100, 2)
+    assert a.result.oee == round(6.5 / 7.5 * performance * 340 / 350, 2)
+
+    b = rows[("M1", "B")]
+    assert (b.setup_seconds, b.run_seconds) == (1800, 7.5 * 3600)
+
+    # M2: TPM window 18-19 is not planned time; stopped 12-16
+    m2b = rows[("M2", "B")]
+    assert m2b.planned_seconds == 7 * 3600
+    assert m2b.run_seconds == 5 * 3600
+
+
+def test_night_shift_crosses_midnight():
+    rows = run()
+    c = rows[("M1", "C")]
+    assert c.shift_start.isoformat() == "2024-03-01T22:00:00"
+    assert c.shift_end.isoformat() == "2024-03-02T06:00:00"
+    # M1's log ends with its 23:00 stop event: only 22-23 is observed
+    assert (c.planned_seconds, c.run_seconds) == (3600, 3600)
+    assert c.good == 400
+
+    assert rows[("M2", "C")].run_seconds == 4 * 3600
+
+
+def test_last_state_closes_per_machine_or_at_explicit_log_end():
+    log = """machine,timestamp,state,good,scrap
+M1,2024-03-01T06:00:00,run,,
+M2,2024-03-01T06:00:00,run,,
+M1,2024-03-01T08:00:00,stop,,
+M2,2024-03-01T13:00:00,run,,
+"""
+
+    def oee(config):
+        rows = compute_oee_from_events(io.BytesIO(log.encode()), config, "csv")
+        return {r.machine: r for r in rows}
+
+    # M1's stop at 08:00 is its last event: not stretched to M2's 13:00
+    rows = oee(CONFIG)
+    assert (rows["M1"].planned_seconds, rows["M1"].run_seconds) == (2 * 3600, 2 * 3600)
+    assert rows["M1"].availability == 100
+    assert rows["M2"].planned_seconds == 6.5 * 3600  # 06-13 minus the 10:00 break
+
+    # Explicit end of the observed window: both machines are closed at 14:00
+    rows = oee(CONFIG.model_copy(update={"log_end": datetime(2024, 3, 1, 14)}))
+    m1, m2 = rows["M1"], rows["M2"]
+    assert (m1.planned_seconds, m1.run_seconds, m1.stop_seconds) == (7.5 * 3600, 2 * 3600, 5.5 * 3600)
+    assert (m2.planned_seconds, m2.run_seconds) == (7.5 * 3600, 7.5 * 3600)
+
+
+def test_results_do_not_depend_on_chunk_size():
+    whole = {k: r.model_dump() for k, r in run().items()}
+    for chunk_rows in (1, 3, 4):
+        assert {k: r.model_dump() for k, r in run(chunk_rows=chunk_rows).items()} == whole
+
+
+def test_long_1hz_log_streams_in_bounded_chunks():
+    engine = OEEEngine(OEELogConfig(breaks=[], default_ideal_cycle_seconds=1))
+    start = np.datetime64("2024-03-01T00:00:00", "s")
+    seconds = 2 * 86400
+    chunk = 50_000
+    for offset in range(0, seconds, chunk):
+        t = np.arange(offset, min(offset + chunk, seconds))
+        for machine in ("M1", "M2"):
+            engine.feed(make_chunk(
+                machine=np.full(len(t), machine),
+                timestamp=start + t,
+                state=np.where(t % 600 < 540, "run", "stop"),  # 9 of every 10 minutes running
+                good=np.ones(len(t), dtype=int),
+            ))
+
+    rows = engine.results()
+    full = [r for r in rows if r.planned_seconds == 8 * 3600]
+    assert len(full) == 2 * 5  # 2 days x 3 shifts, minus the partial first night shift
+    assert all(r.availability == 90.0 for r in full)
+    assert engine.stats()["machine_shifts"] == len(rows)
+
+
+def test_csv_reader_requires_state_columns():
+    with pytest.raises(ValueError, match="missing columns"):
+        list(read_csv_chunks(io.BytesIO(b"machine,timestamp\nM1,2024-03-01T06:00:00\n")))
+
+
+def test_parquet_log_matches_csv(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    lines = [line.split(",") for line in LOG.strip().splitlines()[1:]]
+    table = pa.table({
+        "machine": [l[0] for l in lines],
+        "timestamp": pa.array(np.array([l[1] for l in lines], dtype="datetime64[ms]")),
+        "state": [l[2] for l in lines],
+        "good": [int(l[3]) if l[3] else None for l in lines],
+        "scrap": [int(l[4]) if l[4] else None for l in lines],
+    })
+    path = tmp_path / "events.parquet"
+    pq.write_table(table, path, row_group_size=3)
+
+    parquet = compute_oee_from_events(str(path), CONFIG, "parquet", chunk_rows=2)
+    assert [r.model_dump() for r in parquet] == [r.model_dump() for r in run().values()]
+
+
+def test_events_endpoint_accepts_csv_upload():
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/api/calculate/oee/events",
+                files={"file": ("events.csv", LOG.encode(), "text/csv")},
+                data={"config": CONFIG.model_dump_json()},
+            )
+
+    r = asyncio.run(post())
+    assert r.status_code == 200
+    body = r.json()
+    assert {(row["machine"], row["shift"]) for row in body} >= {("M1", "A"), ("M2", "C")}
+    assert "recommendations" in body[0]["result"]
@@ -0,0 +1,341 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import numpy as np
+import pytest
+
+from app.main import app
+from app.models.schemas import DocumentChunk
+from app.services.prompts import SYSTEM_PROMPT
+from app.services.rag_service import RAGService
+
+
+class SlowEmbedder:
+    """Blocking encoder, like SentenceTransformer on CPU"""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+
+    def encode(self, texts):
+        time.sleep(self.delay)
+        return np.ones((len(texts), 384), dtype=np.float32)
+
+
+class SlowQdrant:
+    """Async Qdrant stand-in with network-like latency"""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+
+    async def query_points(self, collection_name, query, limit, **kwargs):
+        await asyncio.sleep(self.delay)
+        return type("QueryResponse", (), {"points": []})()
+
+    async def get_collection(self, collection_name):
+        return type("CollectionInfo", (), {"points_count": 0})()
+
+    async def close(self):
+        pass
+
+
+class FakeLLM:
+    def __init__(self):
+        self.prompts = []
+        self.system_prompts = []
+
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        self.prompts.append(prompt)
+        self.system_prompts.append(system_prompt)
+        return "respuesta"
+
+    def stats(self):
+        return {}
+
+    async def stream(self, prompt, system_prompt=None, **kwargs):
+        self.prompts.append(prompt)
+        for delta in ("res", "pues", "ta"):
+            await asyncio.sleep(0.05)
+            yield delta
+
+
+@pytest.fixture
+def fake_rag(use_rag_service):
+    return use_rag_service(
+        RAGService(
+            embedder=SlowEmbedder(),
+            qdrant=SlowQdrant(),
+            llm_service=FakeLLM(),
+        )
+    )
+
+
+class OverlapQdrant(SlowQdrant):
+    """Records how many searches are in flight at once"""
+
+    def __init__(self, delay: float = 0.2):
+        super().__init__(delay)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def query_points(self, collection_name, query, limit, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().query_points(collection_name, query, limit, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+class GatedEmbedder:
+    """Blocks its worker thread until the test opens the gate"""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+        self.released_by_test = None
+
+    def encode(self, texts):
+        self.entered.set()
+        self.released_by_test = self.gate.wait(timeout=5)
+        return np.ones((len(texts), 384), dtype=np.float32)
+
+
+def test_concurrent_chat_requests_overlap(use_rag_service):
+    """Both chats are searching at the same time instead of one after the other"""
+    qdrant = OverlapQdrant()
+    use_rag_service(RAGService(embedder=SlowEmbedder(), qdrant=qdrant, llm_service=FakeLLM()))
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                client.post("/api/chat", json={"message": "qué es SMED"}),
+                client.post("/api/chat", json={"message": "qué es TPM"}),
+            )
+
+    responses = asyncio.run(run())
+
+    assert all(r.status_code == 200 for r in responses)
+    assert qdrant.max_in_flight == 2
+
+
+def test_calculator_not_blocked_by_embedding(use_rag_service):
+    """Cheap routes keep answering while a chat is encoding"""
+    embedder = GatedEmbedder()
+    use_rag_service(RAGService(embedder=embedder, qdrant=SlowQdrant(0), llm_service=FakeLLM()))
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            chat = asyncio.create_task(
+                client.post("/api/chat", json={"message": "qué es SMED"})
+            )
+            # 🔹 El encoder está bloqueado en su hilo; si bloqueara el loop
+            # esta petición no podría completarse hasta abrir la puerta
+            await asyncio.to_thread(embedder.entered.wait, 5)
+            oee = await client.post(
+                "/api/calculate/oee",
+                json={"availability": 90, "performance": 95, "quality": 99},
+            )
+            embedder.gate.set()
+            return oee, await chat
+
+    oee, chat = asyncio.run(run())
+
+    assert oee.status_code == 200
+    assert chat.status_code == 200
+    assert embedder.released_by_test  # the gate opened after OEE answered, not by timeout
+
+
+def test_repeated_query_hits_embedding_cache():
+    embedder = SlowEmbedder(delay=0)
+    service = RAGService(embedder=embedder, qdrant=SlowQdrant(0), llm_service=FakeLLM())
+
+    async def run():
+        first = await service.embed_query("¿Qué es SMED?")
+        second = await service.embed_query("que es smed")
+        await service.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == second
+    assert service.embedding_cache.stats()["hits"] == 1
+    assert service.embedding_cache.stats()["misses"] == 1
+
+
+class ScoredQdrant(SlowQdrant):
+    """Returns fixed points with the given similarity scores"""
+
+    def __init__(self, scores):
+        super().__init__(0)
+        self.scores = scores
+
+    async def query_points(self, collection_name, query, limit, score_threshold=None, **kwargs):
+        points = [
+            type("Point", (), {
+                "id": i,
+                "score": s,
+                "vector": None,
+                "payload": {"text": f"chunk {i}", "source": "lean.pdf", "chunk_index": i * 10},
+            })()
+            for i, s in enumerate(self.scores)
+            if score_threshold is None or s >= score_threshold
+        ]
+        return type("QueryResponse", (), {"points": points[:limit]})()
+
+
+def test_answer_exposes_adaptive_k_and_skips_context_when_irrelevant():
+    llm = FakeLLM()
+
+    async def run(scores):
+        service = RAGService(
+            embedder=SlowEmbedder(0), qdrant=ScoredQdrant(scores), llm_service=llm
+        )
+        result = await service.answer_with_context("qué es un kanban")
+        await service.close()
+        return result
+
+    relevant = asyncio.run(run([0.8, 0.78, 0.4, 0.35]))
+    assert relevant["retrieval"] == {"k": 2, "k_max": 5, "scores": [0.8, 0.78]}
+    assert "Contexto:" in llm.prompts[-1]
+
+    irrelevant = asyncio.run(run([0.2, 0.1]))
+    assert irrelevant["retrieval"]["k"] == 0
+    assert irrelevant["sources"] == []
+    assert "Contexto:" not in llm.prompts[-1]
+    # Static prefix identical with and without context; question goes last
+    assert llm.system_prompts[0] == llm.system_prompts[1] == SYSTEM_PROMPT
+    assert all(p.endswith("qué es un kanban") for p in llm.prompts)
+
+
+def test_retrieval_requests_projected_payload_and_uses_snippets():
+    payload = DocumentChunk(
+        text="SMED " * 100, source="smed.pdf", chunk_index=3, total_chunks=10
+    ).to_payload()
+
+    class RecordingQdrant(SlowQdrant):
+        async def query_points(self, collection_name, query, limit, **kwargs):
+            self.kwargs = kwargs
+            point = type("Point", (), {"id": 1, "score": 0.9, "vector": None, "payload": payload})()
+            return type("QueryResponse", (), {"points": [point]})()
+
+    qdrant = RecordingQdrant(0)
+    service = RAGService(embedder=SlowEmbedder(0), qdrant=qdrant, llm_service=FakeLLM())
+
+    async def run():
+        result = await service.answer_with_context("cambio rápido de formato")
+        await service.close()
+        return result
+
+    result = asyncio.run(run())
+
+    assert qdrant.kwargs["with_payload"] == ["text", "source", "chunk_index", "snippet"]
+    assert result["sources"] == [
+        {"content": payload["snippet"], "metadata": {"source": "smed.pdf", "chunk_index": 3, "chunk_end": 3}}
+    ]
+    assert payload["schema_version"] == 2
+    assert len(payload["snippet"]) == 203
+
+
+def test_chat_stream_sends_sources_then_tokens_then_timings(fake_rag):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/chat/stream", json={"message": "qué es SMED"})
+            return response
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+        for block in response.text.strip().split("\n\n")
+    ]
+    names = [name for name, _ in events]
+    assert names == ["sources", "token", "token", "token", "done"]
+    assert "".join(data["text"] for name, data in events if name == "token") == "respuesta"
+    done = events[-1][1]
+    # First delta arrives after one 50 ms step, the whole answer after three
+    assert 0 < done["ttft_ms"] < done["total_ms"]
+    assert done["total_ms"] - done["ttft_ms"] >= 90
+
+
+def test_llm_stream_reports_errors_in_band():
+    from app.services.llm_service import LLMService
+
+    llm = LLMService(provider="openai", clients={"openai": object()})
+
+    async def broken(*args, **kwargs):
+        yield "par"
+        raise RuntimeError("connection reset")
+
+    llm._stream_internal = broken
+
+    async def collect():
+        return [delta async for delta in llm.stream("hola")]
+
+    assert asyncio.run(collect()) == ["par", LLMService.ERROR_MESSAGE]
+
+
+class EndlessLLM(FakeLLM):
+    """Upstream stream that never finishes on its own"""
+
+    def __init__(self):
+        super().__init__()
+        self.closed = False
+
+    async def stream(self, prompt, system_prompt=None, **kwargs):
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield "token "
+        finally:
+            self.closed = True
+
+
+def test_chat_stream_client_disconnect_releases_llm_slot(use_rag_service):
+    llm = EndlessLLM()
+    service = use_rag_service(
+        RAGService(embedder=SlowEmbedder(0), qdrant=SlowQdrant(0), llm_service=llm)
+    )
+    body = json.dumps({"message": "qué es SMED"}).encode()
+
+    async def run():
+        tokens = asyncio.Event()
+        requested = False
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "POST", "scheme": "http", "path": "/api/chat/stream",
+            "raw_path": b"/api/chat/stream", "query_string": b"", "root_path": "",
+            "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+            "client": ("test", 1), "server": ("test", 80),
+        }
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await tokens.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and b"event: token" in message.get("body", b""):
+                tokens.set()
+                await asyncio.sleep(10)  # slow client: the disconnect lands while a chunk is being sent
+
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+        # Checked as soon as the app returns, inside the loop: neither the GC
+        # finalizer nor asyncio.run() shutdown gets a chance to close the generator
+        return llm.closed, service.admission.stats()["in_flight"], app.state.bulkheads.chat.stats()["in_flight"]
+
+    closed, llm_in_flight, chat_in_flight = asyncio.run(run())
+
+    assert closed
+    assert llm_in_flight == 0
+    assert chat_in_flight == 0
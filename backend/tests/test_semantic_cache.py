@@ -0,0 +1,159 @@
+import asyncio
+
+import httpx
+import numpy as np
+import pytest
+
+from app.main import app
+from app.services.rag_service import RAGService
+from app.services.semantic_cache import (
+    InMemoryCacheBackend,
+    RedisCacheBackend,
+    SemanticCache,
+)
+from tests.test_rag import FakeLLM, SlowQdrant
+
+
+def _vector(*values):
+    v = np.zeros(384, dtype=np.float32)
+    v[: len(values)] = values
+    return v
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return InMemoryCacheBackend()
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisCacheBackend(fakeredis.FakeAsyncRedis())
+
+
+def test_lookup_within_threshold(backend):
+    cache = SemanticCache(backend, threshold=0.9)
+    answer = {"answer": "SMED es...", "sources": [{"content": "x"}]}
+
+    async def run():
+        assert await cache.lookup(_vector(1, 0)) is None
+        await cache.store(_vector(1, 0), answer)
+        close = await cache.lookup(_vector(1, 0.1))  # cos ~ 0.995
+        far = await cache.lookup(_vector(0, 1))
+        return close, far
+
+    close, far = asyncio.run(run())
+
+    assert close[0] == answer
+    assert close[1] > 0.99
+    assert far is None
+
+
+def test_size_limit_and_namespace_invalidation(backend):
+    cache = SemanticCache(backend, threshold=0.99, max_entries=2)
+
+    async def run():
+        for i in range(3):
+            await cache.store(_vector(*([0] * i + [1])), {"answer": str(i)})
+        evicted = await SemanticCache(backend, threshold=0.99).lookup(_vector(1))
+        kept = await cache.lookup(_vector(0, 0, 1))
+
+        cache.set_namespace("lean_knowledge:42")
+        after_change = await cache.lookup(_vector(0, 0, 1))
+        return evicted, kept, after_change
+
+    evicted, kept, after_change = asyncio.run(run())
+
+    assert evicted is None
+    assert kept[0] == {"answer": "2"}
+    assert after_change is None
+
+
+def test_exact_key_entries_and_invalidation(backend):
+    cache = SemanticCache(backend)
+
+    async def run():
+        assert await cache.lookup_exact("smed") is None
+        await cache.store_exact("smed", {"answer": "SMED es..."})
+        hit = await SemanticCache(backend).lookup_exact("smed")  # another worker
+        other = await cache.lookup_exact("tpm")
+        await cache.invalidate()
+        return hit, other, await cache.lookup_exact("smed")
+
+    hit, other, after_invalidate = asyncio.run(run())
+
+    assert hit == ({"answer": "SMED es..."}, 1.0)
+    assert other is None
+    assert after_invalidate is None
+
+
+def test_entries_are_shared_between_workers():
+    backend = InMemoryCacheBackend()
+    worker_a = SemanticCache(backend)
+    worker_b = SemanticCache(backend)
+
+    async def run():
+        await worker_a.store(_vector(1), {"answer": "a"})
+        return await worker_b.lookup(_vector(1))
+
+    assert asyncio.run(run())[0] == {"answer": "a"}
+
+
+class FixedEmbedder:
+    def encode(self, texts):
+        return np.ones((len(texts), 384), dtype=np.float32)
+
+
+def test_chat_sets_cache_headers(use_rag_service):
+    use_rag_service(RAGService(
+        embedder=FixedEmbedder(),
+        qdrant=SlowQdrant(0),
+        llm_service=FakeLLM(),
+        semantic_cache=SemanticCache(InMemoryCacheBackend()),
+    ))
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.post("/api/chat", json={"message": "qué es SMED"})
+            second = await client.post("/api/chat", json={"message": "Qué es SMED?"})
+            return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert float(second.headers["X-Cache-Similarity"]) >= 0.92
+    assert second.json() == first.json()
+
+
+class VersionedQdrant(SlowQdrant):
+    """Same point count, ingest version set by the ingest script"""
+
+    def __init__(self):
+        super().__init__(0)
+        self.version = "v1"
+
+    async def get_collection(self, collection_name):
+        config = type("Config", (), {"metadata": {"ingest_version": self.version}})()
+        return type("CollectionInfo", (), {"points_count": 42, "config": config})()
+
+
+def test_reingest_with_same_chunk_count_invalidates_cache(monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.SEMANTIC_CACHE_REFRESH_SECONDS", 0)
+    qdrant = VersionedQdrant()
+    service = RAGService(
+        embedder=FixedEmbedder(),
+        qdrant=qdrant,
+        llm_service=FakeLLM(),
+        semantic_cache=SemanticCache(InMemoryCacheBackend()),
+    )
+
+    async def run():
+        await service.answer_with_context("qué es SMED")
+        before = await service.answer_with_context("qué es SMED")
+        qdrant.version = "v2"  # edited documents re-ingested, still 42 points
+        after = await service.answer_with_context("qué es SMED")
+        return before, after
+
+    before, after = asyncio.run(run())
+
+    assert before["cache"]["hit"] is True
+    assert after["cache"]["hit"] is False
@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import AdmissionController
+from app.services.rag_service import RAGService
+from app.services.semantic_cache import InMemoryCacheBackend, SemanticCache
+from app.services.session_memory import (
+    InMemorySessionStore,
+    RedisSessionStore,
+    SessionMemory,
+    llm_summarizer,
+)
+from tests.test_rag import FakeLLM, SlowEmbedder, SlowQdrant
+
+
+class FakeSummarizer:
+    def __init__(self, result="resumen"):
+        self.result = result
+        self.calls = []
+
+    async def __call__(self, summary, turns):
+        self.calls.append((summary, [m.content for m in turns]))
+        return None if self.result is None else f"{self.result} {len(self.calls)}"
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return InMemorySessionStore()
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisSessionStore(fakeredis.FakeAsyncRedis())
+
+
+def test_old_turns_fold_incrementally_into_summary(store):
+    summarizer = FakeSummarizer()
+    memory = SessionMemory(store, summarizer, max_turns=2)
+
+    async def run():
+        for i in range(5):
+            await memory.remember("s1", f"pregunta {i}", f"respuesta {i}")
+            await memory.drain()
+        return await memory.load("s1")
+
+    conversation = asyncio.run(run())
+
+    assert [m.content for m in conversation.messages] == [
+        "pregunta 3", "respuesta 3", "pregunta 4", "respuesta 4",
+    ]
+    assert conversation.summary == "resumen 3"
+    assert conversation.summarized_turns == 3
+    # Each fold only sees the previous summary and the evicted turn
+    assert summarizer.calls[1] == ("resumen 1", ["pregunta 1", "respuesta 1"])
+
+
+def test_concurrent_turns_from_two_workers_are_not_lost(store):
+    # Two workers (no shared in-process state) writing the same session at once
+    workers = [SessionMemory(store, FakeSummarizer(), max_turns=50) for _ in range(2)]
+
+    async def run():
+        await asyncio.gather(*(
+            workers[i % 2].remember("s1", f"pregunta {i}", f"respuesta {i}") for i in range(8)
+        ))
+        return await workers[0].load("s1")
+
+    conversation = asyncio.run(run())
+
+    questions = {m.content for m in conversation.messages if m.role == "user"}
+    assert questions == {f"pregunta {i}" for i in range(8)}
+
+
+def test_summaries_yield_llm_slots_to_chats():
+    llm = FakeLLM()
+    admission = AdmissionController(max_concurrent=2)
+    memory = SessionMemory(InMemorySessionStore(), llm_summarizer(llm, 50, admission), max_turns=1)
+
+    async def run():
+        async with admission.slot(deadline=float("inf")):
+            # One chat in flight: the background share (1 of 2) is free
+            await memory.remember("s1", "pregunta 0", "respuesta 0")
+            await memory.remember("s1", "pregunta 1", "respuesta 1")
+            await memory.drain()
+            async with admission.slot(deadline=float("inf")):
+                # Every slot busy: the fold is skipped, not queued
+                await memory.remember("s1", "pregunta 2", "respuesta 2")
+                await memory.drain()
+        return await memory.load("s1")
+
+    conversation = asyncio.run(run())
+
+    assert len(llm.prompts) == 1
+    assert memory.stats()["summary_failures"] == 1
+    assert "pregunta 1" in conversation.summary  # extractive fallback
+    assert admission.stats()["shed"]["background"] == 1
+    assert admission.stats()["in_flight"] == 0
+
+
+def test_failed_summary_falls_back_to_bounded_questions():
+    memory = SessionMemory(
+        InMemorySessionStore(), FakeSummarizer(result=None), max_turns=1, summary_max_chars=30
+    )
+
+    async def run():
+        for i in range(4):
+            await memory.remember("s1", f"pregunta larga {i}", "respuesta")
+            await memory.drain()
+        return await memory.load("s1")
+
+    conversation = asyncio.run(run())
+
+    assert "pregunta larga 2" in conversation.summary
+    assert len(conversation.summary) <= 30
+    assert memory.stats()["summary_failures"] == 3
+
+
+def test_store_errors_degrade_to_no_history():
+    class BrokenStore(InMemorySessionStore):
+        async def load(self, session_id):
+            raise ConnectionError("redis down")
+
+    memory = SessionMemory(BrokenStore(), FakeSummarizer())
+    conversation = asyncio.run(memory.load("s1"))
+
+    assert conversation.messages == []
+    assert memory.stats()["store_errors"] == 1
+
+
+def test_prompt_size_stays_flat_over_a_long_session():
+    llm = FakeLLM()
+    memory = SessionMemory(InMemorySessionStore(), FakeSummarizer(), max_turns=2)
+    service = RAGService(
+        embedder=SlowEmbedder(0), qdrant=SlowQdrant(0), llm_service=llm, session_memory=memory
+    )
+
+    async def run():
+        for i in range(12):
+            await service.answer_with_context(f"pregunta número {i:02d}", session_id="turno")
+            await memory.drain()
+
+    asyncio.run(run())
+
+    assert "Conversación reciente:" not in llm.prompts[0]
+    assert "Usuario: pregunta número 10" in llm.prompts[-1]
+    assert "Resumen de la conversación:\nresumen" in llm.prompts[-1]
+    # Once the window is full the prompt no longer grows with the session
+    steady = [len(p) for p in llm.prompts[3:]]
+    assert max(steady) - min(steady) <= 4
+
+
+def test_follow_ups_bypass_semantic_cache():
+    llm = FakeLLM()
+    cache = SemanticCache(InMemoryCacheBackend(), threshold=0.9)
+    service = RAGService(
+        embedder=SlowEmbedder(0),
+        qdrant=SlowQdrant(0),
+        llm_service=llm,
+        semantic_cache=cache,
+        session_memory=SessionMemory(InMemorySessionStore(), FakeSummarizer()),
+    )
+
+    async def run():
+        first = await service.answer_with_context("qué es OEE", session_id="a")
+        follow_up = await service.answer_with_context("y cómo se calcula", session_id="a")
+        fresh = await service.answer_with_context("y cómo se calcula", session_id="b")
+        return first, follow_up, fresh
+
+    first, follow_up, fresh = asyncio.run(run())
+
+    assert first["cache"]["hit"] is False
+    # Same embedding as the first question, but it is a follow-up: no cache hit
+    assert follow_up["cache"]["hit"] is False
+    assert "Usuario: qué es OEE" in llm.prompts[1]
+    # A new session with no history can use the cache
+    assert fresh["cache"]["hit"] is True
+    assert len(llm.prompts) == 2
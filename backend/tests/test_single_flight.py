@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from app.services.rag_service import RAGService
+from app.services.single_flight import SingleFlight
+from tests.test_rag import FakeLLM, SlowEmbedder, SlowQdrant
+
+
+def test_concurrent_calls_share_one_task():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"answer": "ok"}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert flight.stats()["coalesced"] == 4
+    assert len(flight) == 0
+
+
+def test_leader_cancellation_does_not_cancel_followers():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        leader = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+    assert flight.stats()["cancelled"] == 0
+
+
+def test_call_is_cancelled_when_every_waiter_leaves():
+    flight = SingleFlight()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+
+    async def run():
+        waiter = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.08)
+
+    asyncio.run(run())
+
+    assert finished == []
+    assert flight.stats()["cancelled"] == 1
+    assert len(flight) == 0
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight()
+    attempts = []
+
+    async def work():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("llm down")
+
+    async def run():
+        results = await asyncio.gather(
+            flight.do("k", work), flight.do("k", work), return_exceptions=True
+        )
+        later = await asyncio.gather(flight.do("k", work), return_exceptions=True)
+        return results + later
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(attempts) == 2
+
+
+def test_identical_questions_make_one_llm_call():
+    llm = FakeLLM()
+    service = RAGService(
+        embedder=SlowEmbedder(0.05),
+        qdrant=SlowQdrant(0.05),
+        llm_service=llm,
+    )
+
+    async def run():
+        return await asyncio.gather(
+            service.answer_with_context("¿Qué es SMED?"),
+            service.answer_with_context("que es smed"),
+            service.answer_with_context("Qué es SMED"),
+            service.answer_with_context("qué es TPM"),
+        )
+
+    responses = asyncio.run(run())
+
+    assert len(llm.prompts) == 2
+    assert [r["answer"] for r in responses] == ["respuesta"] * 4
+    # Callers can mutate their response without affecting the others
+    responses[0].pop("cache")
+    assert "cache" in responses[1]
+    assert service.single_flight.stats()["coalesced"] == 2
@@ -1,10 +1,16 @@
 import streamlit as st
 import requests
+import html
+import json
 import os
-from typing import Dict
+import time
+import uuid
+from typing import Dict, Iterator, Tuple
 
 # Configuration
 BACKEND_URL = os.getenv("BACKEND_URL", "https://lean-rag.onrender.com")
+# Calculadoras en su propio proceso si existe (bulkhead); si no, el backend
+CALCULATOR_URL = os.getenv("CALCULATOR_URL", BACKEND_URL)
 
 # Page config
 st.set_page_config(
@@ -117,13 +123,17 @@ else:
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+# 🔹 Memoria de conversación en el backend (seguimiento de preguntas)
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
 # ---------------- API ----------------
 
 def send_chat_message(message: str) -> Dict:
     try:
         response = session.post(
             f"{BACKEND_URL}/api/chat",
-            json={"message": message},
+            json={"message": message, "session_id": st.session_state.session_id},
             timeout=20
         )
         response.raise_for_status()
@@ -133,10 +143,31 @@ def send_chat_message(message: str) -> Dict:
         return None
 
 
+def stream_chat_message(message: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    POST to /api/chat/stream and yield (event, data) from the SSE response.
+    """
+    with session.post(
+        f"{BACKEND_URL}/api/chat/stream",
+        json={"message": message, "session_id": st.session_state.session_id},
+        stream=True,
+        timeout=(5, 30),  # connect / gap between events
+    ) as response:
+        response.raise_for_status()
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):])
+
+
 def calculate_oee(availability: float, performance: float, quality: float) -> Dict:
     try:
         response = session.post(
-            f"{BACKEND_URL}/api/calculate/oee",
+            f"{CALCULATOR_URL}/api/calculate/oee",
             json={
                 "availability": availability,
                 "performance": performance,
@@ -154,7 +185,7 @@ def calculate_oee(availability: float, performance: float, quality: float) -> Di
 def calculate_takt_time(available_time: float, demand: int) -> Dict:
     try:
         response = session.post(
-            f"{BACKEND_URL}/api/calculate/takt-time",
+            f"{CALCULATOR_URL}/api/calculate/takt-time",
             json={
                 "available_time_minutes": available_time,
                 "customer_demand_units": demand
@@ -191,23 +222,71 @@ if page == "Chat":
         content = message["content"]
 
         if role == "assistant":
-            st.markdown(f'<div class="msg-assistant">{content}</div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="msg-assistant">{html.escape(content)}</div>', unsafe_allow_html=True)
         else:
-            st.markdown(f'<div class="msg-user">{content}</div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="msg-user">{html.escape(content)}</div>', unsafe_allow_html=True)
 
     st.markdown('</div>', unsafe_allow_html=True)
 
+    if "last_ttft_ms" in st.session_state:
+        st.caption(f"Primer token en {st.session_state.last_ttft_ms} ms")
+
     if prompt := st.chat_input("Como te puedo ayudar ?"):
         st.session_state.messages.append({"role": "user", "content": prompt})
 
-        with st.spinner("Estoy en ello…"):
-            response = send_chat_message(prompt)
-
-        if response:
-            answer = response.get("answer", "No pude generar respuesta.")
+        st.markdown(f'<div class="msg-user">{html.escape(prompt)}</div>', unsafe_allow_html=True)
+        placeholder = st.empty()
+        placeholder.markdown('<div class="msg-assistant">Estoy en ello…</div>', unsafe_allow_html=True)
+
+        # 🔹 Tokens se pintan según llegan (SSE); fallback al endpoint bloqueante
+        answer = ""
+        start = time.perf_counter()
+        ttft = None
+        try:
+            for event, data in stream_chat_message(prompt):
+                if event == "token":
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    answer += data["text"]
+                    placeholder.markdown(
+                        f'<div class="msg-assistant">{html.escape(answer)}▌</div>',
+                        unsafe_allow_html=True,
+                    )
+                elif event == "error":
+                    if data.get("retry_after"):
+                        # Plazo agotado a mitad de respuesta: se descarta la respuesta cortada
+                        answer = ""
+                        placeholder.empty()
+                        st.warning(
+                            f"El asistente está saturado. Inténtalo de nuevo en {data['retry_after']} segundos."
+                        )
+                    else:
+                        st.error(f"Error backend: {data.get('detail')}")
+        except requests.HTTPError as e:
+            # 429/503: el backend pide esperar; reintentar ahora solo duplica la carga
+            if e.response is not None and e.response.status_code in (429, 503):
+                retry_after = e.response.headers.get("Retry-After", "unos")
+                st.warning(f"El asistente está saturado. Inténtalo de nuevo en {retry_after} segundos.")
+            else:
+                st.error(f"Error backend: {str(e)}")
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError, ValueError):
+            # Conexión o protocolo (proxy sin SSE, stream cortado): fallback al endpoint bloqueante
+            if not answer:
+                response = send_chat_message(prompt)
+                answer = (response or {}).get("answer", "")
+        except requests.RequestException as e:
+            st.error(f"Error backend: {str(e)}")
+
+        if answer:
             st.session_state.messages.append({"role": "assistant", "content": answer})
+        if ttft is not None:
+            st.session_state.last_ttft_ms = round(ttft * 1000)
 
-        st.rerun()
+        # Sin respuesta no se recarga: el aviso (429/503, error) queda visible
+        if answer:
+            st.rerun()
+        else:
+            placeholder.empty()
 
 
 # ---------------- CALCULATORS ----------------
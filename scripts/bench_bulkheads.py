@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Benchmark de bulkheads: latencia de /api/calculate/oee (p50/p99) mientras
+una carga de chat satura el backend.
+
+Fases (cada una con servidores uvicorn reales en subprocesos):
+  idle      backend sin carga de chat
+  shared    chat y calculadoras sin aislamiento (BULKHEADS_ENABLED=false)
+  pools     pools separados dentro del mismo worker
+  split     calculadoras en su propio proceso (app.calculator_main)
+
+El chat usa servicios sintéticos: embedding y búsqueda instantáneos, LLM con
+latencia fija y un coste de CPU por llamada en el event loop (prompt,
+parseo, serialización), que es lo que compite con las calculadoras.
+
+Uso:
+    python scripts/bench_bulkheads.py
+    python scripts/bench_bulkheads.py --chat-clients 400 --llm-seconds 2
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+OEE = {"availability": 88, "performance": 93, "quality": 98.5}
+
+
+def burn(ms: float) -> None:
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+def serve(args) -> None:
+    """
+    Subproceso: un worker uvicorn con el backend (chat sintético) o solo calculadoras.
+    """
+    import uvicorn
+
+    if args.serve == "calculator":
+        from app.calculator_main import app
+
+        uvicorn.run(app, port=args.port, log_level="warning")
+        return
+
+    from app.core.config import settings
+    from app.core.dependencies import get_rag_service
+    from app.main import app
+    from app.services.rag_service import RAGService
+
+    class SyntheticEmbedder:
+        def encode(self, texts):
+            return np.ones((len(texts), settings.EMBEDDING_DIMENSION), dtype=np.float32)
+
+    class SyntheticQdrant:
+        async def query_points(self, **kwargs):
+            class Result:
+                points = []
+
+            return Result()
+
+    class SyntheticLLM:
+        async def generate(self, prompt, system_prompt=None, **kwargs):
+            burn(args.chat_cpu_ms)
+            await asyncio.sleep(args.llm_seconds)
+            burn(args.chat_cpu_ms)
+            return "Respuesta sintética"
+
+        def stats(self):
+            return {}
+
+    service = RAGService(
+        embedder=SyntheticEmbedder(),
+        qdrant=SyntheticQdrant(),
+        llm_service=SyntheticLLM(),
+    )
+    app.dependency_overrides[get_rag_service] = lambda: service
+    # Sin lifespan: no carga modelos ni conecta a Qdrant/Redis
+    uvicorn.run(app, port=args.port, log_level="warning", lifespan="off")
+
+
+def start_server(kind: str, port: int, args, bulkheads: bool) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "bench"),
+        "BULKHEADS_ENABLED": str(bulkheads).lower(),
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "SESSION_MEMORY_ENABLED": "false",
+        "SINGLE_FLIGHT_ENABLED": "false",
+        "LEXICAL_ENABLED": "false",
+    }
+    cmd = [
+        sys.executable, __file__, "--serve", kind, "--port", str(port),
+        "--llm-seconds", str(args.llm_seconds), "--chat-cpu-ms", str(args.chat_cpu_ms),
+    ]
+    return subprocess.Popen(cmd, cwd=BACKEND, env=env)
+
+
+async def wait_ready(client, url: str) -> None:
+    for _ in range(200):
+        try:
+            r = await client.post(f"{url}/api/calculate/oee", json=OEE)
+            if r.status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not start")
+
+
+async def run_phase(args, backend_url: str, calc_url: str, chat_clients: int):
+    import httpx
+
+    calc_latencies, chat_status = [], {}
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        await wait_ready(client, backend_url)
+        await wait_ready(client, calc_url)
+
+        async def chat_client(worker_id: int):
+            i = 0
+            while not stop.is_set():
+                r = await client.post(f"{backend_url}/api/chat", json={"message": f"pregunta {worker_id}-{i}"})
+                chat_status[r.status_code] = chat_status.get(r.status_code, 0) + 1
+                if r.status_code in (429, 503):
+                    # Clientes educados: respetan Retry-After (acotado para el benchmark)
+                    await asyncio.sleep(min(float(r.headers.get("Retry-After", 1)), 0.5))
+                i += 1
+
+        async def calc_probe():
+            while not stop.is_set():
+                start = time.perf_counter()
+                r = await client.post(f"{calc_url}/api/calculate/oee", json=OEE)
+                r.raise_for_status()
+                calc_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(args.probe_interval_ms / 1000)
+
+        tasks = [asyncio.create_task(chat_client(w)) for w in range(chat_clients)]
+        await asyncio.sleep(args.warmup if chat_clients else 0)
+        probes = [asyncio.create_task(calc_probe()) for _ in range(args.probes)]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*probes, *tasks)
+
+    latencies_ms = np.array(calc_latencies) * 1000
+    return {
+        "p50": float(np.percentile(latencies_ms, 50)),
+        "p99": float(np.percentile(latencies_ms, 99)),
+        "calc": len(calc_latencies),
+        "chat": chat_status,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chat-clients", type=int, default=200)
+    parser.add_argument("--llm-seconds", type=float, default=1.0)
+    parser.add_argument("--chat-cpu-ms", type=float, default=2.0, help="CPU en el loop por llamada LLM (x2)")
+    parser.add_argument("--probes", type=int, default=4)
+    parser.add_argument("--probe-interval-ms", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--serve", choices=("backend", "calculator"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=8100, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    backend_url, calc_url = "http://127.0.0.1:8100", "http://127.0.0.1:8101"
+    phases = (
+        # name, bulkheads, calculadoras en proceso propio, clientes de chat
+        ("idle", True, False, 0),
+        ("shared", False, False, args.chat_clients),
+        ("pools", True, False, args.chat_clients),
+        ("split", True, True, args.chat_clients),
+    )
+
+    print(f"{'phase':>8} {'calc p50 ms':>12} {'calc p99 ms':>12} {'calc reqs':>10}  chat status")
+    print("-" * 70)
+    for name, bulkheads, split, clients in phases:
+        servers = [start_server("backend", 8100, args, bulkheads)]
+        if split:
+            servers.append(start_server("calculator", 8101, args, bulkheads))
+        try:
+            result = asyncio.run(run_phase(args, backend_url, calc_url if split else backend_url, clients))
+        finally:
+            for server in servers:
+                server.terminate()
+                server.wait()
+        chat = " ".join(f"{code}:{n}" for code, n in sorted(result["chat"].items())) or "-"
+        print(f"{name:>8} {result['p50']:>12.2f} {result['p99']:>12.2f} {result['calc']:>10}  {chat}")
+
+
+if __name__ == "__main__":
+    main()
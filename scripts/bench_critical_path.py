@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark del lead time por camino crítico: grafos de proceso en capas
+(ramas paralelas que se unen) de 1k a 1M pasos. Mide el tiempo de
+calculate_critical_path, que debe crecer linealmente con V+E.
+
+Uso:
+    python scripts/bench_critical_path.py
+    python scripts/bench_critical_path.py --steps 1000,100000 --fan-in 5
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.models.schemas import ProcessStep  # noqa: E402
+from app.services.calculator import LeanCalculator  # noqa: E402
+
+
+def layered_graph(steps: int, width: int, fan_in: int, seed: int = 0):
+    """
+    ``steps`` pasos en capas de ``width``; cada paso depende de hasta
+    ``fan_in`` pasos de la capa anterior.
+    """
+    rng = np.random.default_rng(seed)
+    cycle = rng.uniform(1, 10, steps).round(1).tolist()
+    wait = rng.uniform(0, 30, steps).round(1).tolist()
+    graph = []
+    for i in range(steps):
+        layer = i // width
+        after = [] if layer == 0 else sorted({
+            f"s{(layer - 1) * width + j}" for j in rng.integers(0, width, fan_in).tolist()
+        })
+        # model_construct: mide el algoritmo, no la validación Pydantic
+        graph.append(ProcessStep.model_construct(
+            name=f"s{i}", cycle_time=cycle[i], wait_time=wait[i], predecessors=after,
+        ))
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", default="1000,10000,100000,1000000")
+    parser.add_argument("--width", type=int, default=100, help="pasos en paralelo por capa")
+    parser.add_argument("--fan-in", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'steps':>9} {'edges':>10} {'ms':>10} {'kV+E/s':>9} {'lead min':>10} "
+          f"{'flat sum min':>13} {'path len':>9}")
+    print("-" * 78)
+    for steps in [int(s) for s in args.steps.split(",")]:
+        graph = layered_graph(steps, args.width, args.fan_in)
+        edges = sum(len(s.predecessors) for s in graph)
+
+        start = time.perf_counter()
+        result = LeanCalculator.calculate_critical_path(graph)
+        elapsed = time.perf_counter() - start
+
+        print(f"{steps:>9} {edges:>10} {elapsed * 1000:>10.1f} {(steps + edges) / elapsed / 1e3:>9.0f} "
+              f"{result['total_lead_time_minutes']:>10.1f} {result['sequential_lead_time_minutes']:>13.1f} "
+              f"{len(result['critical_path']):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Compara los backends de embeddings: tiempo de import + carga, memoria
+residente (RSS) y latencia por consulta. Cada backend se mide en un proceso
+aparte para que los imports no se contaminen.
+
+Uso:
+    python scripts/bench_embedders.py
+    python scripts/bench_embedders.py --backends onnx --queries 500
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+QUERIES = [
+    "¿Cómo calculo el OEE?",
+    "Qué es SMED",
+    "Cómo reducir el tiempo de cambio de formato en una prensa",
+    "Diferencia entre takt time y tiempo de ciclo",
+]
+
+
+def measure(backend: str, queries: int) -> dict:
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.chdir(BACKEND_DIR)
+
+    start = time.perf_counter()
+    from app.core.config import settings
+    from app.services.embedder import create_embedder
+
+    embedder = create_embedder(
+        backend,
+        settings.EMBEDDING_MODEL,
+        onnx_path=settings.EMBEDDING_ONNX_PATH,
+        onnx_quantized=settings.EMBEDDING_ONNX_QUANTIZED,
+    )
+    embedder.encode("warmup")
+    load_s = time.perf_counter() - start
+
+    latencies = []
+    for i in range(queries):
+        t = time.perf_counter()
+        embedder.encode(QUERIES[i % len(QUERIES)])
+        latencies.append((time.perf_counter() - t) * 1000)
+    latencies.sort()
+
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", default="sentence-transformers,onnx")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.queries)))
+        return
+
+    print(f"{'backend':>22} {'load s':>8} {'RSS MB':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    print("-" * 58)
+    for backend in args.backends.split(","):
+        proc = subprocess.run(
+            [sys.executable, __file__, "--child", backend, "--queries", str(args.queries)],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            print(f"{backend:>22}  failed: {proc.stderr.strip().splitlines()[-1]}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{r['backend']:>22} {r['load_s']:>8} {r['rss_mb']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark del micro-batching de embeddings: throughput y p99 con 1, 8 y 32
+clientes concurrentes, con y sin batching.
+
+Uso:
+    python scripts/bench_embedding_batching.py
+    python scripts/bench_embedding_batching.py --synthetic   # sin modelo real
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.core.config import settings  # noqa: E402
+from app.services.embedding_batcher import EmbeddingBatcher  # noqa: E402
+
+QUERIES = [
+    "¿Cómo calculo el OEE de una línea?",
+    "Qué es SMED",
+    "Diferencia entre takt time y tiempo de ciclo",
+    "Cómo implantar TPM en planta",
+    "Ejemplo de Heijunka en ensamblaje",
+    "Qué es Jidoka",
+    "Cómo estructurar un A3",
+    "Reducir el lead time en un flujo de valor",
+]
+
+
+class SyntheticEncoder:
+    """
+    Coste fijo por llamada + coste por frase, como un forward pass en CPU.
+    """
+
+    def __init__(self, per_call_ms: float = 8.0, per_item_ms: float = 1.0):
+        self.per_call = per_call_ms / 1000
+        self.per_item = per_item_ms / 1000
+
+    def encode(self, texts):
+        time.sleep(self.per_call + self.per_item * len(texts))
+        return np.zeros((len(texts), settings.EMBEDDING_DIMENSION), dtype=np.float32)
+
+
+async def run_clients(batcher: EmbeddingBatcher, clients: int, requests: int):
+    latencies = []
+
+    async def client(worker_id: int):
+        for i in range(requests // clients):
+            query = QUERIES[(worker_id + i) % len(QUERIES)]
+            start = time.perf_counter()
+            await batcher.embed(query)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(w) for w in range(clients)))
+    elapsed = time.perf_counter() - start
+    await batcher.close()
+
+    latencies_ms = np.array(latencies) * 1000
+    return len(latencies) / elapsed, float(np.percentile(latencies_ms, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--clients", default="1,8,32")
+    parser.add_argument("--synthetic", action="store_true")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        encoder = SyntheticEncoder()
+    else:
+        from sentence_transformers import SentenceTransformer
+        encoder = SentenceTransformer(settings.EMBEDDING_MODEL)
+        encoder.encode(["warmup"])
+
+    executor = ThreadPoolExecutor(max_workers=settings.EMBEDDING_EXECUTOR_THREADS)
+
+    print(f"{'clients':>8} {'mode':>10} {'req/s':>10} {'p99 ms':>10}")
+    print("-" * 42)
+    for clients in [int(c) for c in args.clients.split(",")]:
+        for mode, max_batch in (("single", 1), ("batched", settings.EMBEDDING_BATCH_MAX_SIZE)):
+            batcher = EmbeddingBatcher(
+                encoder.encode,
+                executor,
+                max_batch_size=max_batch,
+                max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS if max_batch > 1 else 0,
+                max_in_flight=settings.EMBEDDING_EXECUTOR_THREADS,
+            )
+            throughput, p99 = asyncio.run(run_clients(batcher, clients, args.requests))
+            print(f"{clients:>8} {mode:>10} {throughput:>10.1f} {p99:>10.1f}")
+
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los KPIs batch: OEE, takt y lead time de 1 a 1M filas,
+bucle escalar (un OEEInput + una llamada por fila) frente a una pasada NumPy.
+
+La columna "batch+json" incluye la serialización de la respuesta columnar,
+que es lo que paga de verdad el endpoint /calculate/*/batch.
+
+Uso:
+    python scripts/bench_kpi_batch.py
+    python scripts/bench_kpi_batch.py --max-scalar-rows 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.api.calculator import _encode_batch  # noqa: E402
+from app.models.schemas import OEEInput  # noqa: E402
+from app.services.calculator import (  # noqa: E402
+    LEAD_TIME_RECOMMENDATIONS,
+    OEE_RECOMMENDATIONS,
+    LeanCalculator,
+)
+
+calculator = LeanCalculator()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def oee_case(rows, rng):
+    a, p, q = (rng.uniform(50, 100, rows).round(1).tolist() for _ in range(3))
+
+    def scalar():
+        return [
+            calculator.calculate_oee(OEEInput(availability=a[i], performance=p[i], quality=q[i]))
+            for i in range(rows)
+        ]
+
+    def batch():
+        return calculator.calculate_oee_batch(a, p, q)
+
+    def check(scalar_results, batch_result):
+        return all(r.oee == o for r, o in zip(scalar_results, batch_result["oee"].tolist()))
+
+    return scalar, batch, check, OEE_RECOMMENDATIONS
+
+
+def takt_case(rows, rng):
+    available = rng.uniform(60, 960, rows).round(1).tolist()
+    demand = rng.integers(1, 5000, rows).tolist()
+
+    def scalar():
+        return [calculator.calculate_takt_time(available[i], demand[i]) for i in range(rows)]
+
+    def batch():
+        return calculator.calculate_takt_time_batch(available, demand)
+
+    def check(scalar_results, batch_result):
+        return all(
+            r["takt_time_seconds"] == t
+            for r, t in zip(scalar_results, batch_result["takt_time_seconds"].tolist())
+        )
+
+    return scalar, batch, check, ()
+
+
+def lead_case(rows, rng, steps_per_process=5):
+    counts = [steps_per_process] * rows
+    cycle = rng.uniform(1, 20, rows * steps_per_process).round(1).tolist()
+    wait = rng.uniform(0, 120, rows * steps_per_process).round(1).tolist()
+
+    def scalar():
+        results = []
+        for i in range(rows):
+            base = i * steps_per_process
+            results.append(calculator.calculate_lead_time([
+                {"name": f"step {j}", "cycle_time": cycle[base + j], "wait_time": wait[base + j]}
+                for j in range(steps_per_process)
+            ]))
+        return results
+
+    def batch():
+        return calculator.calculate_lead_time_batch(counts, cycle, wait)
+
+    def check(scalar_results, batch_result):
+        return all(
+            r["value_added_ratio"] == v
+            for r, v in zip(scalar_results, batch_result["value_added_ratio"].tolist())
+        )
+
+    return scalar, batch, check, LEAD_TIME_RECOMMENDATIONS
+
+
+CASES = {"oee": oee_case, "takt": takt_case, "lead-time": lead_case}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", default="1,10,100,1000,10000,100000,1000000")
+    parser.add_argument("--max-scalar-rows", type=int, default=100_000)
+    parser.add_argument("--kpis", default=",".join(CASES))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'kpi':>10} {'rows':>9} {'scalar ms':>11} {'batch ms':>10} {'batch+json ms':>14} "
+          f"{'speedup':>8} {'Mrows/s':>8} {'exact':>6}")
+    print("-" * 84)
+    for kpi in args.kpis.split(","):
+        for rows in [int(r) for r in args.rows.split(",")]:
+            scalar, batch, check, legend = CASES[kpi](rows, rng)
+            batch_result, batch_s = timed(batch)
+            _, encoded_s = timed(lambda: _encode_batch(batch(), legend))
+
+            if rows <= args.max_scalar_rows:
+                scalar_results, scalar_s = timed(scalar)
+                exact = "yes" if check(scalar_results, batch_result) else "NO"
+                scalar_ms, speedup = f"{scalar_s * 1000:.2f}", f"{scalar_s / batch_s:.0f}x"
+            else:
+                scalar_ms, speedup, exact = "-", "-", "-"
+
+            print(f"{kpi:>10} {rows:>9} {scalar_ms:>11} {batch_s * 1000:>10.2f} {encoded_s * 1000:>14.2f} "
+                  f"{speedup:>8} {rows / batch_s / 1e6:>8.2f} {exact:>6}")
+
+
+if __name__ == "__main__":
+    main()
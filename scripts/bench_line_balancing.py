@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark del balanceo de línea: líneas de ensamble sintéticas de 100 a
+20k tareas (cada tarea sigue a 1-3 de las 20 anteriores) contra un takt
+fijo. Compara RPW y LCR en tiempo, estaciones frente al mínimo teórico y
+eficiencia de balance, con y sin búsqueda de mejora.
+
+Uso:
+    python scripts/bench_line_balancing.py
+    python scripts/bench_line_balancing.py --tasks 1000,5000 --improve 100
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.models.schemas import LineTask  # noqa: E402
+from app.services.line_balancing import balance_line  # noqa: E402
+
+
+def assembly_line(tasks: int, window: int = 20, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    times = rng.gamma(2.0, 8.0, tasks).clip(1, 55).round(1).tolist()
+    line = []
+    for i in range(tasks):
+        after = sorted({
+            f"t{j}" for j in rng.integers(max(0, i - window), i, rng.integers(1, 4)).tolist()
+        }) if i else []
+        line.append(LineTask(name=f"t{i}", time_seconds=times[i], predecessors=after))
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", default="100,1000,5000,20000")
+    parser.add_argument("--takt", type=float, default=60.0, help="segundos")
+    parser.add_argument("--improve", type=int, default=20, help="iteraciones de la búsqueda de mejora")
+    args = parser.parse_args()
+
+    print(f"{'tasks':>7} {'method':>6} {'improve':>8} {'ms':>9} {'stations':>9} {'min':>6} "
+          f"{'efficiency %':>13} {'smoothness':>11}")
+    print("-" * 76)
+    for tasks in [int(t) for t in args.tasks.split(",")]:
+        line = assembly_line(tasks)
+        for method in ("rpw", "lcr"):
+            for improve in sorted({0, args.improve}):
+                start = time.perf_counter()
+                result = balance_line(line, args.takt, method, improve)
+                elapsed = time.perf_counter() - start
+                print(f"{tasks:>7} {method:>6} {improve:>8} {elapsed * 1000:>9.1f} "
+                      f"{result['stations_count']:>9} {result['theoretical_min_stations']:>6} "
+                      f"{result['balance_efficiency']:>13.2f} {result['smoothness_index']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
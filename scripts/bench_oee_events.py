@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark del motor OEE sobre logs de eventos: meses de eventos a 1 Hz por
+máquina, en streaming por chunks. Mide eventos/s y la memoria pico, que debe
+depender del tamaño de chunk y no de la duración del log.
+
+Por defecto los chunks se generan en memoria (mide el motor). Con --csv se
+escribe antes un CSV real y se mide también el lector.
+
+Uso:
+    python scripts/bench_oee_events.py
+    python scripts/bench_oee_events.py --days 90 --machines 4
+    python scripts/bench_oee_events.py --days 7 --csv /tmp/events.csv
+"""
+
+import argparse
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.models.schemas import OEELogConfig, ShiftDefinition  # noqa: E402
+from app.services.oee_engine import OEEEngine, make_chunk, read_csv_chunks  # noqa: E402
+
+START = np.datetime64("2024-01-01T00:00:00", "s")
+STATES = np.array(["run", "stop", "setup"])
+
+
+def synthetic_chunks(days: int, machines: int, chunk_rows: int, seed: int = 0):
+    """
+    1 Hz events, machines interleaved second by second, like a plant historian export.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([f"M{i + 1}" for i in range(machines)])
+    seconds_per_chunk = max(chunk_rows // machines, 1)
+    total = days * 86400
+    for offset in range(0, total, seconds_per_chunk):
+        t = np.arange(offset, min(offset + seconds_per_chunk, total))
+        # 85% run, 12% stop, 3% setup, in 5-minute blocks
+        block = rng.random((len(t) + 299) // 300 + 1)
+        state = np.select([block < 0.85, block < 0.97], [0, 1], 2)[(t - offset) // 300]
+        yield make_chunk(
+            machine=np.tile(names, len(t)),
+            timestamp=np.repeat(START + t, machines),
+            state=np.repeat(STATES[state], machines),
+            good=np.repeat((state == 0).astype(int), machines),
+            scrap=np.repeat(((state == 0) & (t % 97 == 0)).astype(int), machines),
+        )
+
+
+def write_csv(path: str, days: int, machines: int, chunk_rows: int) -> int:
+    rows = 0
+    with open(path, "w") as f:
+        f.write("machine,timestamp,state,good,scrap\n")
+        for chunk in synthetic_chunks(days, machines, chunk_rows):
+            stamps = chunk.timestamp.astype("datetime64[ms]").astype(str)
+            for row in zip(chunk.machine, stamps, chunk.state, chunk.good, chunk.scrap):
+                f.write(",".join(map(str, row)) + "\n")
+            rows += len(chunk.machine)
+    return rows
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--machines", type=int, default=2)
+    parser.add_argument("--chunk-rows", type=int, default=250_000)
+    parser.add_argument("--csv", help="escribe y lee un CSV real en esta ruta")
+    args = parser.parse_args()
+
+    config = OEELogConfig(
+        shifts=[
+            ShiftDefinition(name="A", start="06:00", end="14:00"),
+            ShiftDefinition(name="B", start="14:00", end="22:00"),
+            ShiftDefinition(name="C", start="22:00", end="06:00"),
+        ],
+        breaks=[ShiftDefinition(name="comida", start="10:00", end="10:30")],
+        default_ideal_cycle_seconds=1.1,
+    )
+
+    if args.csv:
+        start = time.perf_counter()
+        rows = write_csv(args.csv, args.days, args.machines, args.chunk_rows)
+        print(f"CSV: {rows:,} rows written in {time.perf_counter() - start:.1f} s")
+        chunks = read_csv_chunks(args.csv, args.chunk_rows)
+    else:
+        chunks = synthetic_chunks(args.days, args.machines, args.chunk_rows)
+
+    rss_before = peak_rss_mb()
+    engine = OEEEngine(config)
+    start = time.perf_counter()
+    feed_s = 0.0
+    for chunk in chunks:
+        t = time.perf_counter()
+        engine.feed(chunk)
+        feed_s += time.perf_counter() - t
+    results = engine.results()
+    elapsed = time.perf_counter() - start
+
+    events = engine.stats()["events"]
+    print(f"{'days':>6} {'machines':>9} {'events':>12} {'total s':>8} {'engine s':>9} "
+          f"{'Mev/s':>7} {'rows out':>9} {'peak RSS MB':>12} {'Δ RSS MB':>9}")
+    print(f"{args.days:>6} {args.machines:>9} {events:>12,} {elapsed:>8.1f} {feed_s:>9.1f} "
+          f"{events / feed_s / 1e6:>7.2f} {len(results):>9} {peak_rss_mb():>12.0f} "
+          f"{peak_rss_mb() - rss_before:>9.0f}")
+    mean_oee = np.mean([r.result.oee for r in results])
+    print(f"mean OEE {mean_oee:.1f}%  (stats: {engine.stats()})")
+
+
+if __name__ == "__main__":
+    main()
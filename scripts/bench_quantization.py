@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark de representaciones compactas del índice local: memoria por chunk,
+recall@k frente a la búsqueda exacta float32 y latencia por consulta.
+
+Uso:
+    python scripts/bench_quantization.py                       # datos sintéticos
+    python scripts/bench_quantization.py --index backend/data/processed/local_index
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.services.local_index import LocalVectorIndex, write_index  # noqa: E402
+
+MODES = [
+    ("float32", "none", 0),
+    ("int8", "int8", 0),
+    ("binary", "binary", 0),
+    ("pca128+int8", "int8", 128),
+    ("pca128+binary", "binary", 128),
+]
+
+
+def synthetic_embeddings(n: int, dim: int, rank: int = 48, seed: int = 0) -> np.ndarray:
+    """
+    Low intrinsic dimension + small isotropic noise: closer to real sentence
+    embeddings (anisotropic) than pure Gaussian noise.
+    """
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(n, rank)) @ rng.normal(size=(rank, dim))
+    vectors = latent + 0.5 * rng.normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--index", help="Existing local index artifact to sample vectors from")
+    parser.add_argument("--chunks", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--oversampling", type=float, default=4.0)
+    args = parser.parse_args()
+
+    if args.index:
+        vectors = np.array(LocalVectorIndex(args.index).vectors)
+    else:
+        vectors = synthetic_embeddings(args.chunks, args.dim)
+
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.02 * rng.normal(size=queries.shape).astype(np.float32)
+    exact = [set(np.argsort(-(vectors @ q))[: args.k]) for q in queries]
+
+    payloads = [{}] * len(vectors)
+    print(f"{len(vectors)} chunks x {vectors.shape[1]} dims, k={args.k}, oversampling={args.oversampling}")
+    print(f"{'mode':>15} {'bytes/chunk':>12} {'recall@k':>10} {'ms/query':>10}")
+    print("-" * 51)
+
+    for name, method, pca_dim in MODES:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_index(tmp, vectors, payloads, quantization=method, pca_dim=pca_dim)
+            index = LocalVectorIndex(tmp, oversampling=args.oversampling)
+
+            # Bytes scanned in the first pass (what must stay hot in RAM)
+            hot = index.codes if index.codes is not None else index.vectors
+            bytes_per_chunk = hot.shape[1] * hot.itemsize
+
+            start = time.perf_counter()
+            results = [set(index.search(q, args.k)[0]) for q in queries]
+            ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        recall = np.mean([len(r & e) / args.k for r, e in zip(results, exact)])
+        print(f"{name:>15} {bytes_per_chunk:>12} {recall:>10.3f} {ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
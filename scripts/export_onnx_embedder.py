@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Exporta el modelo de embeddings a ONNX (+ versión int8) para EMBEDDING_BACKEND=onnx.
+
+Requiere torch y sentence-transformers solo en esta máquina; la imagen del
+backend únicamente necesita onnxruntime y tokenizers.
+
+Uso:
+    python scripts/export_onnx_embedder.py
+    python scripts/export_onnx_embedder.py --output backend/data/models/minilm --no-quantize
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.core.config import settings  # noqa: E402
+from app.services.embedder import export_onnx  # noqa: E402
+
+DEFAULT_OUTPUT = Path(__file__).parent.parent / "backend" / settings.EMBEDDING_ONNX_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT))
+    parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+
+    print(f"Exporting {args.model} -> {args.output}")
+    output = export_onnx(args.model, args.output, quantize=not args.no_quantize)
+    for f in sorted(output.glob("*.onnx")):
+        print(f"  {f.name}: {f.stat().st_size / 1e6:.1f} MB")
+    print("✅ Export complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,24 +3,47 @@
 Script para ingerir documentos PDF a la base de conocimientos Qdrant
 """
 
+import argparse
 import os
 import sys
 from pathlib import Path
 from typing import List
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-from sentence_transformers import SentenceTransformer
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    PointStruct,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    VectorParams,
+)
 from pypdf import PdfReader
 from tqdm import tqdm
 import hashlib
 
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.models.schemas import DocumentChunk  # noqa: E402
+from app.services.embedder import EmbedderBackend, create_embedder  # noqa: E402
+from app.services.local_index import export_collection, ingest_version, write_index  # noqa: E402
+
 # Configuration
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
 COLLECTION_NAME = os.getenv("QDRANT_COLLECTION_NAME", "lean_knowledge")
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")  # or onnx
+EMBEDDING_ONNX_PATH = os.getenv(
+    "EMBEDDING_ONNX_PATH",
+    str(Path(__file__).parent.parent / "backend" / "data" / "models" / "all-MiniLM-L6-v2-onnx"),
+)
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")  # none, int8, binary
+VECTOR_PCA_DIM = int(os.getenv("VECTOR_PCA_DIM", "0"))
+LOCAL_INDEX_PATH = Path(__file__).parent.parent / "backend" / "data" / "processed" / "local_index"
 
 def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
     """
@@ -52,14 +75,14 @@ def extract_text_from_pdf(pdf_path: Path) -> str:
 
 def process_document(
     file_path: Path, 
-    embeddings_model: SentenceTransformer,
-    client: QdrantClient
-) -> int:
+    embeddings_model: EmbedderBackend,
+    client: QdrantClient = None
+) -> List[PointStruct]:
     """
-    Process a single document and add to Qdrant
+    Process a single document and add to Qdrant (skipped when client is None)
     
     Returns:
-        Number of chunks added
+        Points created for the document
     """
     print(f"Processing: {file_path.name}")
     
@@ -68,7 +91,7 @@ def process_document(
         text = extract_text_from_pdf(file_path)
     else:
         print(f"Unsupported file type: {file_path.suffix}")
-        return 0
+        return []
     
     # Chunk text
     chunks = chunk_text(text)
@@ -86,26 +109,39 @@ def process_document(
         point = PointStruct(
             id=chunk_id,
             vector=embedding,
-            payload={
-                "text": chunk,
-                "source": file_path.name,
-                "chunk_index": i,
-                "total_chunks": len(chunks)
-            }
+            payload=DocumentChunk(
+                text=chunk,
+                source=file_path.name,
+                chunk_index=i,
+                total_chunks=len(chunks),
+            ).to_payload()
         )
         points.append(point)
     
     # Upload to Qdrant in batches
-    batch_size = 100
-    for i in range(0, len(points), batch_size):
-        batch = points[i:i + batch_size]
-        client.upsert(
-            collection_name=COLLECTION_NAME,
-            points=batch
-        )
+    if client is not None:
+        batch_size = 100
+        for i in range(0, len(points), batch_size):
+            batch = points[i:i + batch_size]
+            client.upsert(
+                collection_name=COLLECTION_NAME,
+                points=batch
+            )
     
     print(f"✅ Added {len(chunks)} chunks from {file_path.name}")
-    return len(chunks)
+    return points
+
+def quantization_config():
+    """
+    Qdrant quantization matching VECTOR_QUANTIZATION (full vectors are kept for rescoring)
+    """
+    if VECTOR_QUANTIZATION == "int8":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, always_ram=True)
+        )
+    if VECTOR_QUANTIZATION == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
 
 def setup_collection(client: QdrantClient, vector_size: int):
     """
@@ -121,30 +157,70 @@ def setup_collection(client: QdrantClient, vector_size: int):
             vectors_config=VectorParams(
                 size=vector_size,
                 distance=Distance.COSINE
-            )
+            ),
+            quantization_config=quantization_config()
         )
         print("✅ Collection created")
     else:
         print(f"Collection '{COLLECTION_NAME}' already exists")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ingest Lean PDFs into Qdrant and/or a local index")
+    parser.add_argument(
+        "--local-index",
+        nargs="?",
+        const=str(LOCAL_INDEX_PATH),
+        help="Also write a memory-mapped local index artifact (VECTOR_BACKEND=local)",
+    )
+    parser.add_argument(
+        "--skip-qdrant",
+        action="store_true",
+        help="Do not connect to Qdrant (only useful with --local-index)",
+    )
+    parser.add_argument(
+        "--export-only",
+        action="store_true",
+        help="Export the existing Qdrant collection to --local-index without re-ingesting",
+    )
+    return parser.parse_args()
+
 def main():
     """
     Main ingestion function
     """
+    args = parse_args()
+
     print("🏭 Lean AI Assistant - Document Ingestion")
     print("=" * 50)
     
     # Initialize Qdrant client
-    print(f"Connecting to Qdrant at {QDRANT_HOST}:{QDRANT_PORT}...")
-    client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+    client = None
+    if not args.skip_qdrant:
+        print(f"Connecting to Qdrant at {QDRANT_HOST}:{QDRANT_PORT}...")
+        client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+
+    if args.export_only:
+        if client is None or not args.local_index:
+            print("❌ --export-only requires Qdrant and --local-index")
+            sys.exit(1)
+        exported = export_collection(
+            client,
+            COLLECTION_NAME,
+            args.local_index,
+            quantization=VECTOR_QUANTIZATION,
+            pca_dim=VECTOR_PCA_DIM,
+        )
+        print(f"✅ Exported {exported} points to {args.local_index}")
+        return
     
     # Initialize embeddings model
-    print(f"Loading embeddings model: {EMBEDDING_MODEL}...")
-    embeddings_model = SentenceTransformer(EMBEDDING_MODEL)
-    vector_size = embeddings_model.get_sentence_embedding_dimension()
+    print(f"Loading embeddings model: {EMBEDDING_MODEL} ({EMBEDDING_BACKEND})...")
+    embeddings_model = create_embedder(EMBEDDING_BACKEND, EMBEDDING_MODEL, onnx_path=EMBEDDING_ONNX_PATH)
+    vector_size = embeddings_model.dimension
     
     # Setup collection
-    setup_collection(client, vector_size)
+    if client is not None:
+        setup_collection(client, vector_size)
     
     # Get documents directory
     data_dir = Path(__file__).parent.parent / "backend" / "data" / "knowledge_base"
@@ -170,21 +246,42 @@ def main():
     print("-" * 50)
     
     # Process each document
-    total_chunks = 0
+    all_points = []
     for pdf_file in pdf_files:
-        chunks = process_document(pdf_file, embeddings_model, client)
-        total_chunks += chunks
+        all_points.extend(process_document(pdf_file, embeddings_model, client))
         print()
+    total_chunks = len(all_points)
+
+    # Content hash of what was ingested: the backend keys its semantic cache on it,
+    # so re-ingesting edited documents (even with the same chunk count) drops stale answers
+    version = ingest_version([p.id for p in all_points], [p.payload for p in all_points])
+    if client is not None:
+        client.update_collection(COLLECTION_NAME, metadata={"ingest_version": version})
     
     print("=" * 50)
     print(f"✅ Ingestion complete!")
     print(f"Total documents: {len(pdf_files)}")
     print(f"Total chunks: {total_chunks}")
     print(f"Collection: {COLLECTION_NAME}")
+    print(f"Ingest version: {version}")
+
+    # Write local index artifact (ships inside the backend image)
+    if args.local_index:
+        write_index(
+            args.local_index,
+            [p.vector for p in all_points],
+            [p.payload for p in all_points],
+            ids=[p.id for p in all_points],
+            collection_name=COLLECTION_NAME,
+            quantization=VECTOR_QUANTIZATION,
+            pca_dim=VECTOR_PCA_DIM,
+        )
+        print(f"Local index: {args.local_index}")
     
     # Show collection stats
-    collection_info = client.get_collection(COLLECTION_NAME)
-    print(f"Points in collection: {collection_info.points_count}")
+    if client is not None:
+        collection_info = client.get_collection(COLLECTION_NAME)
+        print(f"Points in collection: {collection_info.points_count}")
 
 if __name__ == "__main__":
     main()